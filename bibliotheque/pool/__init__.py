@@ -0,0 +1,174 @@
+"""
+A small thread-safe database connection pool.
+
+Django opens one connection per thread and, with CONN_MAX_AGE, keeps it for
+that thread's lifetime, so a process holds as many connections as it has
+threads and a burst of traffic can open more than the server allows. A
+ConnectionPool caps the connections a process opens at `size`: a request that
+finds none idle waits up to `timeout` seconds for one to be released, and
+raises PoolTimeout (an OperationalError) instead of opening another.
+
+The pool knows nothing about the driver. `connect` opens a connection,
+`check` tells whether an idle one can still be used and `reset` returns one
+to a clean state before it is put back. The Django backend in
+`bibliotheque.pool.base` plugs psycopg2 into it; `stats()` reports how long
+callers waited, for the benchmark and for monitoring.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+# One pool per database alias and process, created by the backend on first use.
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class Waiter:
+    def __init__(self):
+        self.handed = threading.Event()
+        self.connection = None
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=5, timeout=10.0, check=None, reset=None):
+        if size < 1:
+            raise ValueError('A pool needs room for at least one connection.')
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check = check
+        self.reset = reset
+        self._lock = threading.Lock()
+        self._idle = deque()
+        # Callers waiting for a connection, served first come, first served.
+        self._waiters = deque()
+        # Connections that exist, idle or lent out, plus those being opened.
+        self._opened = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def acquire(self):
+        """Lend out a connection, opening one if the pool has room."""
+        started = time.monotonic()
+        waiter = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                # Newest first, so connections beyond the steady state
+                # are the ones left idle.
+                connection = self._idle.pop()
+            elif self._opened < self.size:
+                self._opened += 1
+                connection = None
+            else:
+                waiter = Waiter()
+                self._waiters.append(waiter)
+            if waiter is None:
+                self._lent(started, waited=False)
+
+        if waiter is not None:
+            # Released connections are handed to waiters in turn, so a caller
+            # that has just released one cannot take it straight back.
+            waiter.handed.wait(self.timeout)
+            with self._lock:
+                if not waiter.handed.is_set():
+                    self._waiters.remove(waiter)
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection was released within '
+                        f'{self.timeout} seconds ({self.size} in use).'
+                    )
+                self._lent(started, waited=True)
+            connection = waiter.connection
+
+        if connection is not None and self.check and not self.check(connection):
+            self._close(connection)
+            with self._lock:
+                self._discarded += 1
+            connection = None
+        if connection is None:
+            try:
+                connection = self.connect()
+            except BaseException:
+                self._give_back(None)
+                raise
+        return connection
+
+    def release(self, connection, discard=False):
+        """Take a connection back, or close it if it is broken or `discard`."""
+        if not discard and self.reset:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+        if discard:
+            self._close(connection)
+            with self._lock:
+                self._discarded += 1
+        self._give_back(None if discard else connection)
+
+    def _give_back(self, connection):
+        """Pass a connection, or with None its slot, to the next waiter."""
+        with self._lock:
+            self._in_use -= 1
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.connection = connection
+                waiter.handed.set()
+                # The waiter is counted as lent to when it wakes up.
+                self._in_use += 1
+            elif connection is None:
+                self._opened -= 1
+            else:
+                self._idle.append(connection)
+
+    def _lent(self, started, waited):
+        wait = time.monotonic() - started
+        self._acquired += 1
+        if not waited:
+            self._in_use += 1
+            return
+        self._waited += 1
+        self._wait_seconds += wait
+        self._max_wait_seconds = max(self._max_wait_seconds, wait)
+
+    def close(self):
+        """Close the idle connections; lent ones are closed when released."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'opened': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'acquired': self._acquired,
+                'waited': self._waited,
+                'wait_ms_total': round(self._wait_seconds * 1000, 3),
+                'wait_ms_max': round(self._max_wait_seconds * 1000, 3),
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+            }
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,78 @@
+"""
+PostgreSQL backend that borrows its connections from a ConnectionPool.
+
+Select it with ENGINE 'bibliotheque.pool' and configure it with a 'POOL'
+entry in the database settings:
+
+    'POOL': {'SIZE': 5, 'TIMEOUT': 10}
+
+Django closes a connection at the end of each request when CONN_MAX_AGE is 0;
+with this backend closing hands it back to the pool, still open, so set
+CONN_MAX_AGE to 0. When CONN_HEALTH_CHECKS is on, an idle connection is pinged
+before it is lent out and replaced if the server has dropped it.
+"""
+import psycopg2
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from . import ConnectionPool, pools, pools_lock
+
+
+def connection_pool(alias, settings_dict, conn_params):
+    with pools_lock:
+        if alias not in pools:
+            options = settings_dict.get('POOL', {})
+            pools[alias] = ConnectionPool(
+                connect=lambda: connect(conn_params),
+                size=int(options.get('SIZE', 5)),
+                timeout=float(options.get('TIMEOUT', 10)),
+                check=ping if settings_dict['CONN_HEALTH_CHECKS'] else is_open,
+                reset=lambda connection: connection.reset(),
+            )
+        return pools[alias]
+
+
+def connect(conn_params):
+    connection = psycopg2.connect(**conn_params)
+    # As Django's backend does, skip psycopg2's decoding of jsonb values.
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def is_open(connection):
+    return not connection.closed
+
+
+def ping(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = connection_pool(
+            self.alias, self.settings_dict, conn_params
+        ).acquire()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Closed inside atomic(), Django keeps the connection object around to
+        # report the broken transaction, so it must not be lent to anyone else.
+        pools[self.alias].release(self.connection, discard=self.in_atomic_block)
@@ -92,6 +92,60 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Cached catalog output is expired by replacing version tokens in the cache.
+# A LocMemCache is private to one process, so a change made by another
+# gunicorn worker or a manage.py command (expire_holds, import_catalog, ...)
+# would never reach it; caching is only turned on when the cache is shared.
+CATALOG_SHARED_CACHE = (
+    CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+# Seconds a rendered catalog page is kept; 0 turns page caching off. Pages are
+# also expired by signals as soon as the data they show changes.
+CATALOG_PAGE_CACHE_SECONDS = int(
+    os.environ.get('CATALOG_PAGE_CACHE_SECONDS', 0 if DEBUG else 300)
+) if CATALOG_SHARED_CACHE else 0
+
+# Seconds a rendered book card or copies section is kept. Fragments are keyed
+# on the book's version, so an edit replaces them without waiting for this;
+# like pages, they need a shared cache to see edits made by other processes.
+CATALOG_FRAGMENT_CACHE_SECONDS = int(
+    os.environ.get('CATALOG_FRAGMENT_CACHE_SECONDS', 0 if DEBUG else 86400)
+) if CATALOG_SHARED_CACHE else 0
+
+
+# Sessions
+# https://docs.djangoproject.com/en/4.1/topics/http/sessions/
+
+# With a shared cache, sessions are read from it and only written through to
+# the database when they change, so a logged in page view costs no session
+# query. A per-process cache would keep serving a session another worker has
+# logged out, so without one they stay in the database. Set SESSION_ENGINE to
+# 'django.contrib.sessions.backends.signed_cookies' to keep them off the
+# server altogether.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if CATALOG_SHARED_CACHE
+    else 'django.contrib.sessions.backends.db',
+)
+SESSION_CACHE_ALIAS = 'default'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -147,9 +201,39 @@ CSRF_TRUSTED_ORIGINS = ["https://web-production-d1c0.up.railway.app"]
 
 # Update database configuration from $DATABASE_URL.
 import dj_database_url
-db_from_env = dj_database_url.config(conn_max_age=500)
+db_from_env = dj_database_url.config(
+    conn_max_age=int(os.environ.get('DATABASE_CONN_MAX_AGE', 500)),
+    # Check a persistent connection is still alive before a request reuses it.
+    conn_health_checks=os.environ.get('DATABASE_CONN_HEALTH_CHECKS', '') != 'False',
+)
 DATABASES['default'].update(db_from_env)
 
+# Connection pooling for PostgreSQL, chosen with $DATABASE_POOL:
+# - 'threads' borrows connections from a pool of DATABASE_POOL_SIZE per
+#   process (see bibliotheque.pool). A request that finds them all in use
+#   waits up to DATABASE_POOL_TIMEOUT seconds rather than opening another, so
+#   Postgres sees at most workers x pool size connections.
+# - 'pgbouncer' is for a PgBouncer in transaction mode in front of Postgres.
+#   It pools for us, so connections are closed after each request, and
+#   server-side cursors, which cannot outlive a transaction there, are off.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', '')
+if DATABASE_POOL and DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+    DATABASE_POOL = ''
+if DATABASE_POOL == 'threads':
+    DATABASES['default'].update({
+        'ENGINE': 'bibliotheque.pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'SIZE': int(os.environ.get('DATABASE_POOL_SIZE', 5)),
+            'TIMEOUT': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        },
+    })
+elif DATABASE_POOL == 'pgbouncer':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 0,
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    })
+
 # Simplified static file serving.
 # https://pypi.org/project/whitenoise/
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
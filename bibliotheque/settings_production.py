@@ -0,0 +1,27 @@
+"""
+Production settings for bibliotheque project.
+
+Select with DJANGO_SETTINGS_MODULE=bibliotheque.settings_production. DEBUG
+defaults to off, so the cache settings in settings.py pick their production
+values too, and templates are loaded once per worker through the cached loader.
+"""
+import os
+
+os.environ.setdefault('DJANGO_DEBUG', 'False')
+
+from .settings import *  # noqa: E402,F401,F403
+
+# The cached loader is Django's default when no loaders are given, but only
+# as long as nobody adds a `loaders` option; spell it out so it stays on.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['debug'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Compile the project's templates when a worker loads the WSGI application,
+# so the first requests do not pay for parsing them.
+WARM_TEMPLATES_ON_BOOT = True
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bibliotheque.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'WARM_TEMPLATES_ON_BOOT', False):
+    from django.core.management import call_command
+
+    call_command('warm_templates', verbosity=0)
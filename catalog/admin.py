@@ -1,42 +1,231 @@
 from django.contrib import admin
-from .models import Book, BookInstance, Author, Language, Genre
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Case, Prefetch, When
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from . import circulation
+from .forms import BookForm
+from .models import (
+    Book,
+    BookInstance,
+    Author,
+    Language,
+    Genre,
+    Reservation,
+    CirculationEvent,
+)
+from .search import get_search_backend, search_terms
 from django_countries.widgets import CountrySelectWidget
 
 
+class EstimatedCountPaginator(Paginator):
+    """Count large unfiltered changelists from the planner's row estimate.
+
+    An exact COUNT(*) reads the whole table just to draw the page links. On
+    PostgreSQL the estimate from `pg_class` is used once it passes
+    `ESTIMATE_ABOVE` rows; filtered lists and other databases count exactly.
+    """
+
+    ESTIMATE_ABOVE = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.ESTIMATE_ABOVE:
+                return row[0]
+        return super().count
+
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """Edit only the first `limit` related rows, so the page has a fixed size.
+
+    The rest are reached through the changelist link the parent admin shows.
+    """
+
+    limit = 20
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self._queryset = super().get_queryset()[: self.limit]
+        return self._queryset
+
+
+class FullTextSearchMixin:
+    """Answer autocomplete from the full-text index, best matches first.
+
+    Autocomplete only shows the top `search_limit` matches; the changelist
+    keeps the complete `search_fields` search, so no match is left out there.
+    """
+
+    search_limit = 200
+
+    def get_search_results(self, request, queryset, search_term):
+        match = request.resolver_match
+        if not (match and match.url_name == "autocomplete"):
+            return super().get_search_results(request, queryset, search_term)
+        terms = search_terms(search_term)
+        if not terms:
+            return queryset, False
+        ids = self.search_ids(get_search_backend(), terms)
+        if not ids:
+            return queryset.none(), False
+        rank = Case(*(When(pk=pk, then=position) for position, pk in enumerate(ids)))
+        return queryset.filter(pk__in=ids).order_by(rank), False
+
+
+def changelist_link(model, field, obj, count, noun):
+    url = reverse(f"admin:catalog_{model}_changelist")
+    return format_html(
+        '<a href="{}?{}={}">View all {} {}</a>', url, field, obj.pk, count, noun
+    )
+
+
 class BookInstanceInline(admin.TabularInline):
     model = BookInstance
     extra = 0
+    formset = LimitedInlineFormSet
+    autocomplete_fields = ("borrower",)
+    ordering = ("status", "due_back", "id")
 
 
 class BookInline(admin.TabularInline):
     model = Book
     extra = 0
     fields = ("title", "isbn", "language")
+    formset = LimitedInlineFormSet
+    autocomplete_fields = ("language",)
 
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("last_name", "first_name", "date_of_birth", "date_of_death")
     fields = [
         "first_name",
         "last_name",
         "nationality",
         ("date_of_birth", "date_of_death"),
+        "books",
     ]
+    readonly_fields = ("books",)
+    search_fields = ("last_name", "first_name")
     widgets = {"nationality": CountrySelectWidget()}
     inlines = [BookInline]
 
+    def search_ids(self, backend, terms):
+        return backend.search_authors(terms, self.search_limit)
+
+    @admin.display(description="Books")
+    def books(self, obj):
+        if obj.pk is None:
+            return "-"
+        return changelist_link(
+            "book", "author__id__exact", obj, obj.book_set.count(), "books"
+        )
+
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    form = BookForm
     list_display = ("title", "author", "display_genre")
+    list_select_related = ("author",)
+    search_fields = ("title", "isbn")
+    autocomplete_fields = ("author", "language", "genre")
+    readonly_fields = ("copies",)
     inlines = [BookInstanceInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def search_ids(self, backend, terms):
+        return backend.search_books(terms, 0, self.search_limit)
+
+    @admin.display(description="Copies")
+    def copies(self, obj):
+        if obj.pk is None:
+            return "-"
+        return changelist_link(
+            "bookinstance", "book__id__exact", obj, obj.copy_count, "copies"
+        )
+
+    def get_queryset(self, request):
+        # `display_genre` slices the prefetched genres rather than querying.
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(
+                Prefetch("genre", queryset=Genre.objects.only("id", "name"))
+            )
+        )
+
+
+class OverdueFilter(admin.SimpleListFilter):
+    title = "overdue"
+    parameter_name = "overdue"
+
+    def lookups(self, request, model_admin):
+        return (("yes", "Overdue"), ("no", "Not overdue"))
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.overdue()
+        if self.value() == "no":
+            return queryset.exclude(pk__in=BookInstance.objects.overdue().values("pk"))
+        return queryset
+
+
+def transition_action(action, description):
+    def run(modeladmin, request, queryset):
+        moved = circulation.bulk_transition(queryset, action, request.user)
+        modeladmin.message_user(request, f"{description}: {moved} copies.")
+
+    run.__name__ = f"mark_{action.replace('-', '_')}"
+    return admin.action(
+        description=f"{description} (selected copies)",
+        permissions=["change"],
+    )(run)
+
+
+def extend_action(weeks):
+    def run(modeladmin, request, queryset):
+        extended = circulation.bulk_extend(queryset, weeks, request.user)
+        modeladmin.message_user(request, f"Extended {extended} loans by {weeks} weeks.")
+
+    run.__name__ = f"extend_by_{weeks}_weeks"
+    return admin.action(
+        description=f"Extend due date by {weeks} weeks",
+        permissions=["change"],
+    )(run)
 
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ("book", "status", "borrower", "due_back", "is_overdue", "id")
-    list_filter = ("status", "due_back")
+    list_filter = ("status", OverdueFilter, "due_back")
+    list_select_related = ("book", "borrower")
+    autocomplete_fields = ("book", "borrower")
+    # Each runs as one UPDATE however many copies are selected.
+    actions = [
+        transition_action(CirculationEvent.RETURNED, "Mark returned"),
+        transition_action(CirculationEvent.MADE_AVAILABLE, "Mark available"),
+        transition_action(CirculationEvent.MAINTENANCE, "Send to maintenance"),
+        extend_action(1),
+        extend_action(2),
+        extend_action(4),
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {"fields": ("book", "imprint", "id")}),
@@ -52,6 +241,62 @@ class BookInstanceAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overdue_flag()
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ("book", "patron", "status", "created_at", "expires_on")
+    list_filter = ("status",)
+    autocomplete_fields = ("book", "patron")
+    raw_id_fields = ("book_instance",)
+
+
+@admin.register(CirculationEvent)
+class CirculationEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "action",
+        "book_instance",
+        "from_status",
+        "to_status",
+        "user",
+    )
+    list_filter = ("action",)
+    list_select_related = ("book_instance__book", "user")
+    raw_id_fields = ("book_instance", "user")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class PatronAdmin(UserAdmin):
+    """Users, with an autocomplete that walks the username index."""
 
-admin.site.register(Language)
-admin.site.register(Genre)
+    def get_search_fields(self, request):
+        # A case-sensitive prefix can use the unique index on username;
+        # the changelist keeps the full `icontains` search.
+        match = request.resolver_match
+        if match and match.url_name == "autocomplete":
+            return ("username__startswith",)
+        return super().get_search_fields(request)
@@ -0,0 +1,295 @@
+"""Read-only JSON representations of the catalog models.
+
+Each resource lists the fields a client may ask for with `?fields=` and the
+relations it may expand with `?embed=`. Only the columns behind the chosen
+fields are loaded (`.only()`), foreign keys that are embedded are joined with
+`select_related` and many-valued relations are read with one
+`prefetch_related` query each, so a response costs the same number of
+queries whatever the page size.
+
+With a shared cache, responses are tagged with the cache version tokens of
+the rows they show (see `catalog.cache`), so an ETag can be checked before any
+query is run.
+"""
+
+import hashlib
+
+from django.db.models import Prefetch
+from django.urls import reverse
+
+from .cache import author_version, book_version, get_versions
+from .models import Author, Book, BookInstance, Genre, Language
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+class Attribute:
+    """A field of the representation: the columns it reads and how it renders."""
+
+    def __init__(self, columns, render, annotate=None):
+        self.columns = columns
+        self.render = render
+        self.annotate = annotate
+
+
+def column(name):
+    return Attribute([name], lambda obj: getattr(obj, name))
+
+
+class Relation:
+    """A related resource, rendered as ids or, when embedded, as objects.
+
+    `remote` names the foreign key on the other side of a reverse relation,
+    which the prefetch needs to match rows to their parents.
+    """
+
+    def __init__(self, target, accessor, many=False, remote=None):
+        self.target = target
+        self.accessor = accessor
+        self.many = many
+        self.remote = remote
+
+
+class Resource:
+    def __init__(
+        self,
+        model,
+        attributes,
+        relations,
+        default_fields,
+        version,
+        detail_version=None,
+        ordering=None,
+    ):
+        self.model = model
+        self.attributes = attributes
+        self.relations = relations
+        self.default_fields = default_fields
+        self.version = version
+        self.detail_version = detail_version or (lambda pk: [version])
+        self.ordering = ordering or model._meta.ordering
+
+    def select(self, params):
+        """Return the (fields, embeds) asked for in the query string."""
+        fields = split(params.get("fields")) or list(self.default_fields)
+        embeds = split(params.get("embed"))
+        unknown = [name for name in fields if name not in self.attributes]
+        unknown = [name for name in unknown if name not in self.relations]
+        if unknown:
+            raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}.")
+        unknown = [name for name in embeds if name not in self.relations]
+        if unknown:
+            raise InvalidQuery(f"Unknown relations: {', '.join(unknown)}.")
+        fields = ["id"] + [name for name in fields if name != "id"]
+        fields += [name for name in embeds if name not in fields]
+        return fields, embeds
+
+    def versions(self, fields, pk=None):
+        """Version names whose tokens change when this response would."""
+        names = self.detail_version(pk) if pk is not None else [self.version]
+        for name in fields:
+            if name in self.relations:
+                names.append(RESOURCES[self.relations[name].target].version)
+        return names
+
+    def etag(self, path, fields, pk=None):
+        tokens = get_versions(self.versions(fields, pk))
+        return hashlib.md5("|".join([path, *tokens]).encode()).hexdigest()
+
+    def nested_fields(self):
+        """Fields an embedded object shows: plain columns and foreign key ids."""
+        return ["id"] + [
+            name
+            for name in self.default_fields
+            if (name in self.attributes and not self.attributes[name].annotate)
+            or (name in self.relations and not self.relations[name].many)
+        ]
+
+    def queryset(self, fields, embeds=(), extra_columns=()):
+        queryset = self.model.objects.all()
+        columns = {self.model._meta.pk.name, *extra_columns}
+        columns.update(name.lstrip("-") for name in self.ordering)
+        for name in fields:
+            if name in self.attributes:
+                attribute = self.attributes[name]
+                columns.update(attribute.columns)
+                if attribute.annotate:
+                    queryset = attribute.annotate(queryset)
+                continue
+            relation = self.relations[name]
+            target = RESOURCES[relation.target]
+            if not relation.many:
+                columns.add(relation.accessor)
+                if name in embeds:
+                    queryset = queryset.select_related(relation.accessor)
+                    columns.update(
+                        f"{relation.accessor}__{column}"
+                        for column in target.columns(target.nested_fields())
+                    )
+                continue
+            nested = target.nested_fields() if name in embeds else []
+            remote = [relation.remote] if relation.remote else []
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    relation.accessor,
+                    queryset=target.queryset(nested, extra_columns=remote).order_by(
+                        *target.ordering
+                    ),
+                )
+            )
+        return queryset.only(*columns).order_by(*self.ordering)
+
+    def columns(self, fields):
+        columns = {self.model._meta.pk.name}
+        for name in fields:
+            if name in self.attributes:
+                columns.update(self.attributes[name].columns)
+            elif not self.relations[name].many:
+                columns.add(self.relations[name].accessor)
+        return columns
+
+    def render(self, obj, fields, embeds=()):
+        data = {}
+        for name in fields:
+            if name in self.attributes:
+                data[name] = self.attributes[name].render(obj)
+                continue
+            relation = self.relations[name]
+            target = RESOURCES[relation.target]
+            if relation.many:
+                related = getattr(obj, relation.accessor).all()
+                if name in embeds:
+                    nested = target.nested_fields()
+                    data[name] = [target.render(item, nested) for item in related]
+                else:
+                    data[name] = [item.pk for item in related]
+            elif name in embeds:
+                related = getattr(obj, relation.accessor)
+                data[name] = (
+                    target.render(related, target.nested_fields()) if related else None
+                )
+            else:
+                attname = self.model._meta.get_field(relation.accessor).attname
+                data[name] = getattr(obj, attname)
+        return data
+
+
+def split(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def page_size(params):
+    try:
+        size = int(params.get("limit", PAGE_SIZE))
+    except ValueError:
+        raise InvalidQuery("limit must be a number.")
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise InvalidQuery(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return size
+
+
+def url_attribute(name):
+    return Attribute(["id"], lambda obj: reverse(name, args=[obj.pk]))
+
+
+RESOURCES = {
+    "books": Resource(
+        Book,
+        attributes={
+            "id": column("id"),
+            "title": column("title"),
+            "isbn": column("isbn"),
+            "summary": column("summary"),
+            "copy_count": column("copy_count"),
+            "available_count": column("available_count"),
+            "on_loan_count": column("on_loan_count"),
+            "reserved_count": column("reserved_count"),
+            "maintenance_count": column("maintenance_count"),
+            "next_due_back": column("next_due_back"),
+            "url": url_attribute("book-detail"),
+        },
+        relations={
+            "author": Relation("authors", "author"),
+            "language": Relation("languages", "language"),
+            "genre": Relation("genres", "genre", many=True),
+            "copies": Relation(
+                "book-instances", "bookinstance_set", many=True, remote="book"
+            ),
+        },
+        default_fields=[
+            "title",
+            "isbn",
+            "author",
+            "language",
+            "genre",
+            "copy_count",
+            "available_count",
+            "url",
+        ],
+        version="books",
+        detail_version=lambda pk: [book_version(pk)],
+    ),
+    "authors": Resource(
+        Author,
+        attributes={
+            "id": column("id"),
+            "first_name": column("first_name"),
+            "last_name": column("last_name"),
+            "nationality": Attribute(
+                ["nationality"],
+                lambda author: [country.code for country in author.nationality],
+            ),
+            "date_of_birth": column("date_of_birth"),
+            "date_of_death": column("date_of_death"),
+            "url": url_attribute("author-detail"),
+        },
+        relations={
+            "books": Relation("books", "book_set", many=True, remote="author"),
+        },
+        default_fields=[
+            "first_name",
+            "last_name",
+            "nationality",
+            "date_of_birth",
+            "date_of_death",
+            "url",
+        ],
+        version="authors",
+        detail_version=lambda pk: [author_version(pk)],
+    ),
+    # Borrowers are deliberately left out: the API is public.
+    "book-instances": Resource(
+        BookInstance,
+        attributes={
+            "id": column("id"),
+            "imprint": column("imprint"),
+            "status": column("status"),
+            "due_back": column("due_back"),
+        },
+        relations={"book": Relation("books", "book")},
+        default_fields=["book", "imprint", "status", "due_back"],
+        # Copies change under the "books" version, along with their book's.
+        version="books",
+    ),
+    "genres": Resource(
+        Genre,
+        attributes={"id": column("id"), "name": column("name")},
+        relations={},
+        default_fields=["name"],
+        version="genres",
+        ordering=["name"],
+    ),
+    "languages": Resource(
+        Language,
+        attributes={"id": column("id"), "name": column("name")},
+        relations={},
+        default_fields=["name"],
+        version="languages",
+        ordering=["name"],
+    ),
+}
@@ -0,0 +1,262 @@
+"""Response caching for the public catalog pages.
+
+Cached pages are keyed on version tokens ("books", "book:<id>", ...) rather
+than deleted one by one: a list view has a page per cursor, so there is no
+way to know every key it was stored under. Signals replace the tokens that a
+change affects, and every page stored under an old token stops matching.
+"""
+
+import collections
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+VERSION_KEY_PREFIX = "catalog:version:"
+CACHED_HEADERS = ("ETag", "Cache-Control")
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def get_versions(names):
+    """Return the current token for every version name, creating missing ones."""
+    cache = get_cache()
+    keys = [VERSION_KEY_PREFIX + name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # An evicted token must not come back as an old value, so a fresh
+            # random one is minted rather than restarting from a fixed number.
+            token = uuid.uuid4().hex
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key, token)
+            versions[key] = token
+    return [versions[key] for key in keys]
+
+
+def _replace_versions(names):
+    get_cache().set_many(
+        {VERSION_KEY_PREFIX + name: uuid.uuid4().hex for name in names},
+        timeout=None,
+    )
+
+
+def bump_versions(*names):
+    """Invalidate everything cached under the given version names.
+
+    The tokens are replaced straight away and again once the surrounding
+    transaction commits, so a page rendered from the old rows while the
+    transaction was still open cannot outlive it.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+    _replace_versions(names)
+    transaction.on_commit(lambda: _replace_versions(names))
+
+
+def attach_versions(objects, version):
+    """Set `cache_version` on each object, for keying its template fragments."""
+    objects = list(objects)
+    tokens = get_versions([version(obj.pk) for obj in objects])
+    for obj, token in zip(objects, tokens):
+        obj.cache_version = token
+    return objects
+
+
+class VersionedLRUCache:
+    """A small in-process LRU whose entries carry the version names they depend on.
+
+    It saves the database round trip for hot keys while still expiring with
+    the shared version tokens, so no process serves a value another changed.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored for `key`, or None if missing or out of date."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+        value, names, tokens = entry
+        if get_versions(names) != tokens:
+            return None
+        return value
+
+    def set(self, key, value, names):
+        tokens = get_versions(names)
+        with self.lock:
+            self.entries[key] = (value, names, tokens)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def book_version(book_id):
+    return f"book:{book_id}" if book_id else None
+
+
+def author_version(author_id):
+    return f"author:{author_id}" if author_id else None
+
+
+def page_variant(request):
+    """What, besides the data, a catalog page's HTML depends on for this request."""
+    user = request.user
+    if not user.is_authenticated:
+        return "anonymous"
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    return f"user:{user.pk}:staff:{int(user.is_staff)}:csrf:{csrf_cookie}"
+
+
+class FragmentCacheMixin:
+    """Expose the fragment timeout used by `{% cache %}` blocks in the templates.
+
+    A timeout of 0 stores nothing, which keeps fragments fresh in development.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["fragment_cache_seconds"] = getattr(
+            settings, "CATALOG_FRAGMENT_CACHE_SECONDS", 0
+        )
+        return context
+
+
+class CachedPageMixin:
+    """Serve a view's rendered HTML from the cache until its data changes.
+
+    Views list the version names their page depends on in
+    `get_cache_versions()`. Pages are cached per URL (so per page and
+    cursor), per staff flag and, for signed in users, per user and CSRF
+    cookie, since the header shows the username and the logout form
+    carries a CSRF token.
+    """
+
+    def get_cache_versions(self):
+        raise NotImplementedError
+
+    def get_cache_variant(self, request):
+        return page_variant(request)
+
+    def get_cache_key(self, request):
+        parts = [
+            request.get_full_path(),
+            self.get_cache_variant(request),
+            *get_versions(self.get_cache_versions()),
+        ]
+        digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+        return f"catalog:page:{digest}"
+
+    def dispatch(self, request, *args, **kwargs):
+        timeout = getattr(settings, "CATALOG_PAGE_CACHE_SECONDS", 0)
+        if (
+            not timeout
+            or request.method not in ("GET", "HEAD")
+            # Flash messages are rendered into the page and must not be replayed.
+            or len(get_messages(request))
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for name, value in headers.items():
+                response.headers[name] = value
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, "render"):
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, self.cache_entry(rendered), timeout)
+            )
+        return response
+
+    def cache_entry(self, response):
+        """The page and the ETag `ConditionalGetMixin` gave it, if any."""
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if response.has_header(name)
+        }
+        return response.content, headers
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs with 304 after one small query and no rendering.
+
+    `get_page_state()` returns an aggregate over the rows a page shows: their
+    newest `updated_at` values and counts, so that deleted rows change it too;
+    None sends the request on to the view. The ETag also covers the page's
+    version tokens, for changes such as genre links that touch no
+    `updated_at`, and the per-user page variant.
+
+    No Last-Modified is sent: it has one-second resolution and deleting a row
+    can leave the newest `updated_at` as it was, so If-Modified-Since could
+    answer 304 for a page that has changed.
+
+    Requests without If-None-Match skip the query when `CachedPageMixin` has
+    the page, since it keeps the ETag with it.
+    """
+
+    def get_page_state(self):
+        raise NotImplementedError
+
+    def get_etag(self, request):
+        state = self.get_page_state()
+        if state is None:
+            return None
+        parts = [
+            page_variant(request),
+            *(f"{name}={value}" for name, value in sorted(state.items())),
+            *get_versions(self.get_cache_versions()),
+        ]
+        return quote_etag(hashlib.md5("|".join(parts).encode()).hexdigest())
+
+    def add_etag(self, response, etag):
+        response.headers["ETag"] = etag
+        # Pages differ per user and must be revalidated, not reused as they are.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or len(get_messages(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = None
+        if "HTTP_IF_NONE_MATCH" in request.META:
+            etag = self.get_etag(request)
+            if etag is None:
+                return super().dispatch(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return self.add_etag(response, etag)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or response.has_header("ETag"):
+            return response
+        etag = etag or self.get_etag(request)
+        if etag is None:
+            return response
+        return self.add_etag(response, etag)
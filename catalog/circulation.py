@@ -0,0 +1,369 @@
+"""Checking copies out to a borrower and back in, a whole cart at a time.
+
+Every copy in a batch is locked with `select_for_update`, checked and written
+with one `bulk_update`, so a batch costs the same few queries however many
+copies it holds, and two desks cannot lend the same copy. `bulk_update` sends
+no signals and skips `auto_now`, so the stats counters, the books'
+availability counters, page caches and `updated_at` are updated here instead.
+
+Holds queue up per book. A returned copy goes to the oldest waiting hold on
+its book; the queue is read with `select_for_update(skip_locked=True)`, so two
+desks returning copies of the same title serve different patrons instead of
+waiting on each other, and no hold is given two copies.
+"""
+
+import collections
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import author_version, book_version, bump_versions
+from .models import Book, BookInstance, CatalogStats, CirculationEvent, Reservation
+
+LOAN_PERIOD = datetime.timedelta(weeks=3)
+
+# How long a copy set aside for a hold waits to be collected.
+HOLD_PERIOD = datetime.timedelta(weeks=1)
+
+BOOK_BATCH_SIZE = 500
+
+# Bulk transitions: the statuses a copy may move from, and the one it moves to.
+TRANSITIONS = {
+    CirculationEvent.RETURNED: (("o",), "a"),
+    CirculationEvent.MADE_AVAILABLE: (("m",), "a"),
+    CirculationEvent.MAINTENANCE: (("a", "o"), "m"),
+}
+
+# Statuses a copy may be lent from: on the shelf, or held for the borrower.
+LENDABLE_STATUSES = ("a", "r")
+
+
+def _lock_copies(instance_ids, allowed_statuses):
+    """Lock the copies; return those that can move and errors for the rest."""
+    instance_ids = list(dict.fromkeys(instance_ids))
+    copies = BookInstance.objects.select_for_update().in_bulk(instance_ids)
+    movable, errors = [], {}
+    for instance_id in instance_ids:
+        copy = copies.get(instance_id)
+        if copy is None:
+            errors[str(instance_id)] = ["No copy with this id."]
+        elif copy.status not in allowed_statuses:
+            errors[str(instance_id)] = [f"Copy is {copy.get_status_display().lower()}."]
+        else:
+            movable.append(copy)
+    return movable, errors
+
+
+def _lock_all_copies(instance_ids, allowed_statuses):
+    """Lock the copies, in the order given, or raise for any that can't move."""
+    if not instance_ids:
+        raise ValidationError("No copies were given.")
+    copies, errors = _lock_copies(instance_ids, allowed_statuses)
+    if errors:
+        raise ValidationError(errors)
+    return copies
+
+
+def _record_changes(copies, available_delta):
+    _record_book_changes(
+        {copy.book_id for copy in copies if copy.book_id}, available_delta
+    )
+
+
+def _record_book_changes(book_ids, available_delta):
+    """Update the counters and expire the pages of the books whose copies moved."""
+    CatalogStats.bump(number_of_available_book_instances=available_delta)
+    book_ids = sorted(book_ids)
+    bump_versions("books")
+    # In slices, so a bulk action over many books stays under the query
+    # parameter limits.
+    for start in range(0, len(book_ids), BOOK_BATCH_SIZE):
+        batch = book_ids[start : start + BOOK_BATCH_SIZE]
+        Book.objects.filter(pk__in=batch).recount_availability()
+        author_ids = (
+            Book.objects.filter(pk__in=batch)
+            .order_by()
+            .values_list("author_id", flat=True)
+        )
+        bump_versions(*map(book_version, batch), *map(author_version, author_ids))
+
+
+@transaction.atomic
+def check_out(instance_ids, borrower, due_back=None):
+    """Lend every copy to `borrower`; nothing changes if any copy can't be lent."""
+    if due_back is None:
+        due_back = datetime.date.today() + LOAN_PERIOD
+    elif due_back < datetime.date.today():
+        raise ValidationError({"due_back": ["Due date is in the past."]})
+    copies = _lock_all_copies(instance_ids, LENDABLE_STATUSES)
+    held = [copy for copy in copies if copy.status == "r"]
+    errors = {
+        str(copy.id): ["Copy is held for another patron."]
+        for copy in held
+        if copy.borrower_id not in (None, borrower.pk)
+    }
+    if errors:
+        raise ValidationError(errors)
+    available = len(copies) - len(held)
+    now = timezone.now()
+    for copy in copies:
+        copy.status = "o"
+        copy.borrower = borrower
+        copy.due_back = due_back
+        copy.updated_at = now
+    BookInstance.objects.bulk_update(
+        copies, ["status", "borrower", "due_back", "updated_at"]
+    )
+    if held:
+        Reservation.objects.filter(
+            book_instance__in=held, status=Reservation.READY
+        ).update(status=Reservation.FULFILLED)
+    _record_changes(copies, -available)
+    return copies
+
+
+def _next_holds(book_id, number):
+    """Lock the `number` oldest waiting holds on a book that nobody else has locked."""
+    return list(
+        Reservation.objects.select_for_update(skip_locked=True)
+        .filter(book_id=book_id, status=Reservation.WAITING)
+        .order_by("created_at", "id")[:number]
+    )
+
+
+def _set_aside(copy, reservation, today):
+    copy.status = "r"
+    copy.borrower_id = reservation.patron_id
+    copy.due_back = None
+    reservation.status = Reservation.READY
+    reservation.book_instance = copy
+    reservation.expires_on = today + HOLD_PERIOD
+
+
+def _allocate(copies):
+    """Set copies that came free aside for the oldest holds on their books."""
+    copies_by_book = collections.defaultdict(list)
+    for copy in copies:
+        if copy.book_id:
+            copies_by_book[copy.book_id].append(copy)
+    # One query finds the books anyone waits for, so returns without holds
+    # cost nothing more.
+    waited_for = (
+        Reservation.objects.filter(
+            book_id__in=copies_by_book, status=Reservation.WAITING
+        )
+        .order_by()
+        .values_list("book_id", flat=True)
+        .distinct()
+    )
+    today = datetime.date.today()
+    served = []
+    for book_id in sorted(waited_for):
+        book_copies = copies_by_book[book_id]
+        for copy, reservation in zip(
+            book_copies, _next_holds(book_id, len(book_copies))
+        ):
+            _set_aside(copy, reservation, today)
+            served.append(reservation)
+    if served:
+        Reservation.objects.bulk_update(
+            served, ["status", "book_instance", "expires_on"]
+        )
+    return served
+
+
+def _return_to_shelf(copies):
+    """Put locked copies back on the shelf, or aside for the next holds in line."""
+    now = timezone.now()
+    freed = sum(copy.status != "a" for copy in copies)
+    for copy in copies:
+        copy.status = "a"
+        copy.borrower = None
+        copy.due_back = None
+        copy.updated_at = now
+    served = _allocate(copies)
+    BookInstance.objects.bulk_update(
+        copies, ["status", "borrower", "due_back", "updated_at"]
+    )
+    _record_changes(copies, freed - len(served))
+    return served
+
+
+@transaction.atomic
+def check_in(instance_ids):
+    """Return every copy to the shelf; nothing changes if any copy isn't on loan.
+
+    Copies of books with waiting holds are set aside for those holds instead.
+    """
+    copies = _lock_all_copies(instance_ids, ("o",))
+    _return_to_shelf(copies)
+    return copies
+
+
+@transaction.atomic
+def place_hold(book_id, patron):
+    """Queue `patron` for a copy of the book; return the reservation.
+
+    If a copy is on the shelf it is set aside straight away, skipping copies
+    another request is already taking.
+    """
+    copy = (
+        BookInstance.objects.select_for_update(skip_locked=True)
+        .filter(book_id=book_id, status__exact="a")
+        .order_by()
+        .first()
+    )
+    reservation = Reservation(book_id=book_id, patron=patron)
+    if copy is not None:
+        _set_aside(copy, reservation, datetime.date.today())
+    try:
+        with transaction.atomic():
+            reservation.save()
+    except IntegrityError:
+        raise ValidationError("You already have a hold on this book.")
+    if copy is not None:
+        copy.save(update_fields=["status", "borrower", "due_back", "updated_at"])
+    return reservation
+
+
+@transaction.atomic
+def cancel_hold(reservation_id, patron=None):
+    """Cancel an active hold, passing any copy set aside for it down the queue."""
+    reservations = Reservation.objects.select_for_update().filter(
+        pk=reservation_id, status__in=Reservation.ACTIVE_STATUSES
+    )
+    if patron is not None:
+        reservations = reservations.filter(patron=patron)
+    reservation = reservations.first()
+    if reservation is None:
+        raise ValidationError("No active hold with this id.")
+    reservation.status = Reservation.CANCELLED
+    reservation.save(update_fields=["status"])
+    if reservation.book_instance_id:
+        copies = list(
+            BookInstance.objects.select_for_update().filter(
+                pk=reservation.book_instance_id, status__exact="r"
+            )
+        )
+        _return_to_shelf(copies)
+    return reservation
+
+
+@transaction.atomic
+def expire_holds(today=None):
+    """Cancel holds whose copy was not collected in time; return how many."""
+    today = today or datetime.date.today()
+    expired = list(
+        Reservation.objects.select_for_update(skip_locked=True).filter(
+            status=Reservation.READY, expires_on__lt=today
+        )
+    )
+    if not expired:
+        return 0
+    Reservation.objects.filter(pk__in=[hold.pk for hold in expired]).update(
+        status=Reservation.CANCELLED
+    )
+    copies = list(
+        BookInstance.objects.select_for_update().filter(
+            pk__in=[hold.book_instance_id for hold in expired], status__exact="r"
+        )
+    )
+    _return_to_shelf(copies)
+    return len(expired)
+
+
+@transaction.atomic
+def renew(instance_ids, due_back):
+    """Move the due date of every copy on loan; return them and errors for the rest.
+
+    Unlike lending and returning, one bad row does not stop the batch. The date
+    is expected to have passed `forms.validate_renewal_date` already.
+    """
+    copies, errors = _lock_copies(instance_ids, ("o",))
+    now = timezone.now()
+    for copy in copies:
+        copy.due_back = due_back
+        copy.updated_at = now
+    if copies:
+        BookInstance.objects.bulk_update(copies, ["due_back", "updated_at"])
+        _record_changes(copies, 0)
+    return copies, errors
+
+
+def _log_events(rows, action, user):
+    """Write one audit row per (copy id, old status, book id, new status)."""
+    CirculationEvent.objects.bulk_create(
+        (
+            CirculationEvent(
+                book_instance_id=instance_id,
+                action=action,
+                from_status=from_status,
+                to_status=to_status,
+                user=user,
+            )
+            for instance_id, from_status, _, to_status in rows
+        ),
+        batch_size=1000,
+    )
+
+
+@transaction.atomic
+def bulk_transition(queryset, action, user=None):
+    """Move every copy in `queryset` that can make `action`; return how many moved.
+
+    Copies are changed with one UPDATE and read back only as tuples for the
+    audit rows, except copies made available for books patrons are waiting
+    for: those go through the hold queue like a check-in.
+    """
+    from_statuses, to_status = TRANSITIONS[action]
+    # Joins would put the related rows under the lock too.
+    copies = queryset.filter(status__in=from_statuses).select_related(None).order_by()
+    held = []
+    if to_status == "a":
+        waited_for = Reservation.objects.filter(status=Reservation.WAITING).values(
+            "book_id"
+        )
+        held = list(copies.filter(book_id__in=waited_for).select_for_update())
+        copies = copies.exclude(book_id__in=waited_for)
+    rows = [
+        (*row, to_status)
+        for row in copies.select_for_update().values_list("pk", "status", "book_id")
+    ]
+    copies.update(
+        status=to_status, borrower=None, due_back=None, updated_at=timezone.now()
+    )
+    _record_book_changes(
+        {book_id for _, _, book_id, _ in rows if book_id},
+        (to_status == "a") * len(rows)
+        - sum(from_status == "a" for _, from_status, _, _ in rows),
+    )
+    if held:
+        previous = [(copy.pk, copy.status, copy.book_id) for copy in held]
+        _return_to_shelf(held)
+        rows += [(*row, copy.status) for row, copy in zip(previous, held)]
+    _log_events(rows, action, user)
+    return len(rows)
+
+
+@transaction.atomic
+def bulk_extend(queryset, weeks, user=None):
+    """Push the due date of every loan in `queryset` back by `weeks`, in one UPDATE."""
+    loans = (
+        queryset.filter(status__exact="o", due_back__isnull=False)
+        .select_related(None)
+        .order_by()
+    )
+    rows = [
+        (*row, "o")
+        for row in loans.select_for_update().values_list("pk", "status", "book_id")
+    ]
+    loans.update(
+        due_back=F("due_back") + datetime.timedelta(weeks=weeks),
+        updated_at=timezone.now(),
+    )
+    _record_book_changes({book_id for _, _, book_id, _ in rows if book_id}, 0)
+    _log_events(rows, CirculationEvent.EXTENDED, user)
+    return len(rows)
@@ -1,25 +1,30 @@
 import datetime
 
+from django import forms
 from django.forms import ModelForm
 
-from .models import BookInstance
+from .isbn import InvalidISBN, to_isbn13
+from .models import Book, BookInstance
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 
+def validate_renewal_date(data):
+    """Check if date is between now and 4 weeks."""
+    if data < datetime.date.today():
+        raise ValidationError(_('Invalid date - renewal date in the past'))
+
+    if data > datetime.date.today() + datetime.timedelta(weeks=4):
+        raise ValidationError(_('Invalid date - renewal date more than 4 weeks away.'))
+
+
 class RenewBookModelForm(ModelForm):
     
     def clean_due_back(self):
         """Check if date is between now and 4 weeks."""
         data = self.cleaned_data['due_back']
-
-        if data < datetime.date.today():
-            raise ValidationError(_('Invalid date - renewal date in the past'))
-        
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_('Invalid date - renewal date more than 4 weeks away.'))
-        
+        validate_renewal_date(data)
         return data
     
 
@@ -27,4 +32,34 @@ class RenewBookModelForm(ModelForm):
         model = BookInstance
         fields = ['due_back']
         labels = {'due_back': _('Renewal Date')}
-        help_texts = {'due_back': _('Enter a date between now and 4 weeks(default 3 weeks).')}
\ No newline at end of file
+        help_texts = {'due_back': _('Enter a date between now and 4 weeks(default 3 weeks).')}
+
+
+class BulkRenewForm(forms.Form):
+    """New due date for every loan selected on the borrowed books page."""
+
+    due_back = forms.DateField(
+        label=_('Renewal Date'),
+        help_text=_('Enter a date between now and 4 weeks(default 3 weeks).'),
+        validators=[validate_renewal_date],
+    )
+
+
+class BookForm(ModelForm):
+    """Book form that takes ISBN-10 or ISBN-13, hyphenated or not, and stores the ISBN-13."""
+
+    isbn = forms.CharField(
+        label='ISBN',
+        max_length=17,
+        help_text=_('ISBN-10 or ISBN-13, with or without hyphens.'),
+    )
+
+    def clean_isbn(self):
+        try:
+            return to_isbn13(self.cleaned_data['isbn'])
+        except InvalidISBN as error:
+            raise ValidationError(str(error))
+
+    class Meta:
+        model = Book
+        fields = '__all__'
@@ -0,0 +1,286 @@
+"""Bulk import of books, authors, genres and copies from CSV, JSON lines or MARC.
+
+The input is read as a stream and written in batches, one transaction each:
+books are upserted on their unique ISBN with a single INSERT ... ON CONFLICT,
+and genre links and copies go in with `bulk_create`. Authors, genres and
+languages are looked up in maps held in memory, so each distinct name costs
+one insert for the whole import rather than a query per row.
+"""
+
+import csv
+import datetime
+import io
+import itertools
+import json
+
+from django.db import transaction
+
+from .cache import author_version, book_version, bump_versions
+from .isbn import InvalidISBN, to_isbn13
+from .models import Author, Book, BookInstance, Genre, Language
+
+try:
+    import pymarc
+except ImportError:  # MARC input is optional.
+    pymarc = None
+
+FORMATS = ("csv", "ndjson", "marc")
+BATCH_SIZE = 2000
+SUMMARY_LENGTH = Book._meta.get_field("summary").max_length
+STATUSES = {code for code, _ in BookInstance.LOAN_STATUS}
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def format_for(path):
+    """Guess the input format from a file name."""
+    suffix = path.rsplit(".", 1)[-1].lower()
+    if suffix in ("mrc", "marc"):
+        return "marc"
+    if suffix in ("ndjson", "jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def read_csv(stream):
+    yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+
+
+def read_ndjson(stream):
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_marc(stream):
+    """Map MARC 21 bibliographic records onto the fields the CSV input uses."""
+    for record in pymarc.MARCReader(stream, to_unicode=True, force_utf8=True):
+        if record is None:
+            continue
+
+        def first(tag, code):
+            for field in record.get_fields(tag):
+                values = field.get_subfields(code)
+                if values:
+                    return values[0].strip(" /:;,.")
+            return ""
+
+        yield {
+            "isbn": first("020", "a").split(" ")[0],
+            "title": first("245", "a"),
+            "summary": first("520", "a"),
+            "author": first("100", "a"),
+            "language": first("041", "a"),
+            "genres": "; ".join(
+                value.strip(" .")
+                for field in record.get_fields("650")
+                for value in field.get_subfields("a")
+            ),
+        }
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson, "marc": read_marc}
+
+
+def split_author(name):
+    """("First", "Last") from "Last, First" (as exported) or "First Last"."""
+    name = " ".join((name or "").split())
+    if not name:
+        return None
+    if "," in name:
+        last, first = (part.strip() for part in name.split(",", 1))
+    else:
+        first, _, last = name.rpartition(" ")
+    return first[:100], last[:100]
+
+
+def clean_record(row):
+    """Normalise one input row, or raise InvalidRecord."""
+    try:
+        isbn = to_isbn13(row.get("isbn") or "")
+    except InvalidISBN:
+        raise InvalidRecord(f"bad ISBN {row.get('isbn')!r}")
+    title = " ".join(str(row.get("title") or "").split())
+    if not title:
+        raise InvalidRecord("missing title")
+
+    if "first_name" in row or "last_name" in row:
+        author = tuple(
+            " ".join(str(row.get(name) or "").split())[:100]
+            for name in ("first_name", "last_name")
+        )
+        # Blank name columns mean no author, not an author with no name.
+        author = author if any(author) else None
+    else:
+        author = split_author(row.get("author"))
+    genres = row.get("genres") or []
+    if isinstance(genres, str):
+        genres = genres.split(";")
+    if not isinstance(genres, list):
+        raise InvalidRecord(f"bad genres {genres!r}")
+
+    copies = row.get("copies")
+    if not isinstance(copies, list):
+        number = row.get("copies") or row.get("copy_count") or 0
+        try:
+            number = int(number)
+        except (ValueError, TypeError):
+            raise InvalidRecord(f"bad copy count {number!r}")
+        copies = [{"imprint": row.get("imprint") or ""}] * number
+    for copy in copies:
+        if not isinstance(copy, dict):
+            raise InvalidRecord(f"bad copy {copy!r}")
+        status = copy.get("status") or "a"
+        if not isinstance(status, str) or status not in STATUSES:
+            raise InvalidRecord(f"bad copy status {status!r}")
+        due_back = copy.get("due_back") or None
+        if due_back:
+            try:
+                datetime.date.fromisoformat(str(due_back))
+            except ValueError:
+                raise InvalidRecord(f"bad due date {due_back!r}")
+
+    return {
+        "isbn": isbn,
+        "title": title[:255],
+        "summary": str(row.get("summary") or "")[:SUMMARY_LENGTH],
+        "author": author,
+        "language": " ".join(str(row.get("language") or "").split())[:200],
+        "genres": sorted(
+            {" ".join(str(genre).split())[:255] for genre in genres} - {""}
+        ),
+        "copies": copies,
+    }
+
+
+class NameMap:
+    """Name -> id for a lookup model, creating missing names a batch at a time."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.ids = {
+            values[:-1]: values[-1]
+            for values in model.objects.values_list(*fields, "id").iterator()
+        }
+
+    def resolve(self, keys):
+        # Keys whose parts are all blank name nothing; their rows get a null FK.
+        missing = {key for key in keys if key and any(key) and key not in self.ids}
+        if missing:
+            created = self.model.objects.bulk_create(
+                self.model(**dict(zip(self.fields, key))) for key in sorted(missing)
+            )
+            for key, obj in zip(sorted(missing), created):
+                self.ids[key] = obj.pk
+        return self.ids
+
+
+class CatalogImporter:
+    """Write batches of cleaned records; counters describe what was written."""
+
+    def __init__(self):
+        self.authors = NameMap(Author, ["first_name", "last_name"])
+        self.genres = NameMap(Genre, ["name"])
+        self.languages = NameMap(Language, ["name"])
+        self.counts = {"created": 0, "updated": 0, "copies": 0}
+
+    @transaction.atomic
+    def write(self, records):
+        # A batch may name an ISBN twice; the last row wins, as a later UPDATE would.
+        records = list({record["isbn"]: record for record in records}.values())
+        author_ids = self.authors.resolve(record["author"] for record in records)
+        language_ids = self.languages.resolve(
+            (record["language"],) for record in records
+        )
+        genre_ids = self.genres.resolve(
+            (genre,) for record in records for genre in record["genres"]
+        )
+
+        isbns = [record["isbn"] for record in records]
+        existing = dict(
+            Book.objects.filter(isbn__in=isbns).order_by().values_list("isbn", "id")
+        )
+        Book.objects.bulk_create(
+            (
+                Book(
+                    isbn=record["isbn"],
+                    title=record["title"],
+                    summary=record["summary"],
+                    author_id=author_ids.get(record["author"]),
+                    language_id=(
+                        language_ids.get((record["language"],))
+                        if record["language"]
+                        else None
+                    ),
+                )
+                for record in records
+            ),
+            update_conflicts=True,
+            unique_fields=["isbn"],
+            # Column names: Django 4.1 puts these into the SQL as given.
+            update_fields=[
+                "title",
+                "summary",
+                "author_id",
+                "language_id",
+                "updated_at",
+            ],
+        )
+        book_ids = dict(existing)
+        book_ids.update(
+            Book.objects.filter(isbn__in=set(isbns) - set(existing))
+            .order_by()
+            .values_list("isbn", "id")
+        )
+
+        Book.genre.through.objects.bulk_create(
+            (
+                Book.genre.through(
+                    book_id=book_ids[record["isbn"]], genre_id=genre_ids[(genre,)]
+                )
+                for record in records
+                for genre in record["genres"]
+            ),
+            ignore_conflicts=True,
+        )
+        # Copies come with new titles only, so importing a file twice does not
+        # double the stock of the books it already brought in.
+        copies = BookInstance.objects.bulk_create(
+            BookInstance(
+                book_id=book_ids[record["isbn"]],
+                imprint=copy.get("imprint") or "",
+                status=copy.get("status") or "a",
+                due_back=copy.get("due_back") or None,
+            )
+            for record in records
+            if record["isbn"] not in existing
+            for copy in record["copies"]
+        )
+        Book.objects.filter(
+            pk__in=[book_ids[isbn] for isbn in set(isbns) - set(existing)]
+        ).recount_availability()
+
+        bump_versions(
+            "books",
+            "authors",
+            "genres",
+            "languages",
+            *(book_version(book_id) for book_id in existing.values()),
+            *(
+                author_version(author_ids[record["author"]])
+                for record in records
+                if record["author"]
+            ),
+        )
+        self.counts["created"] += len(records) - len(existing)
+        self.counts["updated"] += len(existing)
+        self.counts["copies"] += len(copies)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
@@ -0,0 +1,68 @@
+"""ISBN normalisation and checksum validation.
+
+Books are stored under their 13 digit ISBN. `to_isbn13` accepts what people
+and barcode scanners actually type: hyphens and spaces, a lower case check
+character "x", and the older 10 character ISBN, which it converts.
+"""
+
+import re
+
+from django.core.exceptions import ValidationError
+
+SEPARATORS = re.compile(r"[\s-]+")
+ISBN10 = re.compile(r"^\d{9}[\dX]$")
+ISBN13 = re.compile(r"^97[89]\d{10}$")
+
+
+class InvalidISBN(ValueError):
+    pass
+
+
+def normalize(value):
+    """Drop separators and upper case the check character."""
+    return SEPARATORS.sub("", str(value)).upper()
+
+
+def isbn10_check_digit(body):
+    """Check character for the first nine digits of an ISBN-10."""
+    total = sum(int(digit) * (10 - index) for index, digit in enumerate(body))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def isbn13_check_digit(body):
+    """Check digit for the first twelve digits of an ISBN-13."""
+    total = sum(
+        int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(body)
+    )
+    return str((10 - total % 10) % 10)
+
+
+def to_isbn13(value):
+    """Return the ISBN-13 for an ISBN-10 or ISBN-13, or raise InvalidISBN."""
+    isbn = normalize(value)
+    if ISBN13.match(isbn):
+        if isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise InvalidISBN(f"{value} has a bad check digit.")
+        return isbn
+    if ISBN10.match(isbn):
+        if isbn10_check_digit(isbn[:9]) != isbn[9]:
+            raise InvalidISBN(f"{value} has a bad check digit.")
+        body = "978" + isbn[:9]
+        return body + isbn13_check_digit(body)
+    raise InvalidISBN(f"{value} is not an ISBN-10 or ISBN-13.")
+
+
+def to_isbn10(isbn13):
+    """The ISBN-10 form of a 978 ISBN-13, or None; 979 ISBNs have no ISBN-10."""
+    if not isbn13.startswith("978"):
+        return None
+    return isbn13[3:12] + isbn10_check_digit(isbn13[3:12])
+
+
+def validate_isbn(value):
+    """Validator for `Book.isbn`: accepts ISBN-10 and ISBN-13 input."""
+    try:
+        to_isbn13(value)
+    except InvalidISBN as error:
+        raise ValidationError(str(error), code="invalid_isbn")
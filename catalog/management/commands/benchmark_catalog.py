@@ -0,0 +1,255 @@
+import datetime
+import json
+import sys
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import circulation
+from catalog.models import Author, Book, BookInstance, Genre, Language, Reservation
+from catalog.urls import urlpatterns
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    rank = max(int(round(percent / 100 * len(samples))) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class Probe:
+    """How to request one catalog URL.
+
+    `url` is called before every request, so a probe can set up the row the
+    request acts on. Views that only take POST are sent `data` (JSON when
+    `json` is set), and `undo` reverses what the request changed, outside the
+    measurement, so every iteration starts from the same catalog.
+    """
+
+    def __init__(self, url, data=None, json=False, undo=None):
+        self.url = url if callable(url) else lambda: url
+        self.data = data
+        self.json = json
+        self.undo = undo
+
+    def send(self, client, url):
+        if self.data is None:
+            return client.get(url)
+        if self.json:
+            return client.post(url, self.data, content_type="application/json")
+        return client.post(url, self.data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every catalog URL through the test client and print latency "
+        "percentiles, queries per request and peak memory as JSON. Fails if "
+        "any URL answers with an error status."
+    )
+
+    # URLs that need more than a sample row's pk, and the method building them.
+    SPECIAL = {
+        "search": "search_probe",
+        "isbn-lookup": "isbn_probe",
+        "book-reserve": "reserve_probe",
+        "reservation-cancel": "cancel_probe",
+        "circulation": "circulation_probe",
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--username",
+            help="Log in as this user, so the permission protected views render.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        client = Client(raise_request_exception=False, HTTP_HOST="127.0.0.1")
+        user = None
+        if options["username"]:
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['username']!r}.")
+            client.force_login(user)
+
+        results = {}
+        for name, probe in self.catalog_probes(user):
+            results[name] = self.measure(client, probe, options["iterations"])
+            self.stderr.write(f"{name}: p50 {results[name]['p50_ms']} ms")
+        errors = sorted(name for name, result in results.items() if not result["ok"])
+
+        report = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "catalog": {
+                "books": Book.objects.count(),
+                "book_instances": BookInstance.objects.count(),
+                "authors": Author.objects.count(),
+            },
+            "peak_rss_kb": peak_rss_kb(),
+            "errors": errors,
+            "urls": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+        if errors:
+            raise CommandError(
+                "Error responses from: "
+                + ", ".join(
+                    f"{name} {results[name]['status_codes']}" for name in errors
+                )
+            )
+
+    def catalog_probes(self, user):
+        """Yield (name, probe) for every named catalog URL, using sample rows."""
+        samples = {
+            "book": Book.objects.order_by("pk").first(),
+            "author": Author.objects.order_by("pk").first(),
+            "book_instance": BookInstance.objects.order_by("pk").first(),
+            "genre": Genre.objects.order_by("pk").first(),
+            "language": Language.objects.order_by("pk").first(),
+        }
+        book = samples["book"]
+        for pattern in urlpatterns:
+            name = pattern.name
+            if not name:
+                continue
+            if name in self.SPECIAL:
+                probe = getattr(self, self.SPECIAL[name])(samples, user)
+                if probe is not None:
+                    yield name, probe
+                continue
+            if not pattern.pattern.converters:
+                yield name, Probe(reverse(name))
+                continue
+            if "uuid" in str(pattern.pattern):
+                sample = samples["book_instance"]
+            elif "author" in name:
+                sample = samples["author"]
+            elif "genre" in name:
+                sample = samples["genre"]
+            elif "language" in name:
+                sample = samples["language"]
+            else:
+                sample = book
+            if sample is not None:
+                yield name, Probe(reverse(name, args=[sample.pk]))
+
+    def search_probe(self, samples, user):
+        if samples["book"] is None:
+            return None
+        query = urlencode({"q": samples["book"].title})
+        return Probe(f"{reverse('search')}?{query}")
+
+    def isbn_probe(self, samples, user):
+        if samples["book"] is None:
+            return None
+        return Probe(reverse("isbn-lookup", args=[samples["book"].isbn]))
+
+    def reserve_probe(self, samples, user):
+        book = samples["book"]
+        if book is None:
+            return None
+
+        def undo():
+            if user is not None:
+                for reservation in Reservation.objects.filter(
+                    book=book, patron=user, status__in=Reservation.ACTIVE_STATUSES
+                ):
+                    circulation.cancel_hold(reservation.pk)
+
+        return Probe(reverse("book-reserve", args=[book.pk]), data={}, undo=undo)
+
+    def cancel_probe(self, samples, user):
+        book = samples["book"]
+        if book is None:
+            return None
+
+        def url():
+            # Each iteration cancels a hold placed for it; signed out, the
+            # view only redirects to the login page.
+            pk = 0
+            if user is not None:
+                Reservation.objects.filter(
+                    book=book, patron=user, status__in=Reservation.ACTIVE_STATUSES
+                ).update(status=Reservation.CANCELLED)
+                pk = circulation.place_hold(book.pk, user).pk
+            return reverse("reservation-cancel", args=[pk])
+
+        return Probe(url, data={})
+
+    def circulation_probe(self, samples, user):
+        copy = BookInstance.objects.filter(status__exact="a").order_by("pk").first()
+        if copy is None:
+            return None
+        payload = {
+            "action": "check-out",
+            "book_instances": [str(copy.pk)],
+            "borrower": user.pk if user else None,
+        }
+
+        def undo():
+            # Signed out, or without the permission, nothing was checked out.
+            if BookInstance.objects.filter(pk=copy.pk, status__exact="o").exists():
+                circulation.check_in([copy.pk])
+
+        return Probe(reverse("circulation"), data=payload, json=True, undo=undo)
+
+    def measure(self, client, probe, iterations):
+        timings = []
+        queries = []
+        status_codes = set()
+        for _ in range(iterations):
+            url = probe.url()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = probe.send(client, url)
+                if response.streaming:
+                    # Streamed rows are only read from the database as they
+                    # are sent, so the body is part of the request's cost.
+                    b"".join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            status_codes.add(response.status_code)
+            if probe.undo:
+                probe.undo()
+        timings.sort()
+        return {
+            "url": url,
+            "method": "GET" if probe.data is None else "POST",
+            "status_codes": sorted(status_codes),
+            "ok": all(code < 400 for code in status_codes),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "queries_per_request": round(sum(queries) / len(queries), 2),
+        }
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import OperationalError
+
+from bibliotheque.pool import ConnectionPool
+
+from .benchmark_catalog import percentile
+
+
+class StandInServer:
+    """A Postgres stand-in: slow to connect to, and with a connection limit.
+
+    Opening a connection costs `connect_ms` (TCP, TLS and authentication, plus
+    forking a backend) and a statement `query_ms`. Past `max_connections` it
+    refuses new ones, as Postgres does with "too many clients already".
+    """
+
+    def __init__(self, max_connections, connect_ms, query_ms):
+        self.max_connections = max_connections
+        self.connect_seconds = connect_ms / 1000
+        self.query_seconds = query_ms / 1000
+        self.lock = threading.Lock()
+        self.open = 0
+        self.peak = 0
+        self.opened = 0
+        self.refused = 0
+
+    def connect(self):
+        time.sleep(self.connect_seconds)
+        with self.lock:
+            if self.open >= self.max_connections:
+                self.refused += 1
+                raise OperationalError("sorry, too many clients already")
+            self.open += 1
+            self.opened += 1
+            self.peak = max(self.peak, self.open)
+        return StandInConnection(self)
+
+    def disconnect(self):
+        with self.lock:
+            self.open -= 1
+
+
+class StandInConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def execute(self):
+        time.sleep(self.server.query_seconds)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.server.disconnect()
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a burst of simulated requests against a Postgres stand-in, "
+        "opening a connection per request and borrowing one from a "
+        "ConnectionPool, and print latency, refused connections and pool wait "
+        "times as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Requests served at once, like gunicorn workers times threads.",
+        )
+        parser.add_argument("--queries", type=int, default=5)
+        parser.add_argument("--max-connections", type=int, default=20)
+        parser.add_argument("--pool-size", type=int, default=8)
+        parser.add_argument("--pool-timeout", type=float, default=10.0)
+        parser.add_argument("--connect-ms", type=float, default=20.0)
+        parser.add_argument("--query-ms", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        for name in ("requests", "concurrency", "queries", "pool_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1.")
+        report = {
+            option: options[option]
+            for option in (
+                "requests",
+                "concurrency",
+                "queries",
+                "max_connections",
+                "pool_size",
+                "connect_ms",
+                "query_ms",
+            )
+        }
+        report["unpooled"] = self.run(options, pooled=False)
+        report["pooled"] = self.run(options, pooled=True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, options, pooled):
+        server = StandInServer(
+            options["max_connections"], options["connect_ms"], options["query_ms"]
+        )
+        pool = None
+        if pooled:
+            pool = ConnectionPool(
+                server.connect,
+                size=options["pool_size"],
+                timeout=options["pool_timeout"],
+                check=lambda connection: not connection.closed,
+            )
+
+        def serve(_):
+            started = time.perf_counter()
+            try:
+                connection = pool.acquire() if pool else server.connect()
+            except OperationalError:
+                return None
+            try:
+                for _ in range(options["queries"]):
+                    connection.execute()
+            finally:
+                if pool:
+                    pool.release(connection)
+                else:
+                    connection.close()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            timings = list(executor.map(serve, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+        if pool:
+            pool.close()
+
+        served = sorted(timing for timing in timings if timing is not None)
+        result = {
+            "served": len(served),
+            "failed": len(timings) - len(served),
+            "requests_per_second": round(len(served) / elapsed, 1),
+            "p50_ms": round(percentile(served, 50), 3) if served else None,
+            "p95_ms": round(percentile(served, 95), 3) if served else None,
+            "p99_ms": round(percentile(served, 99), 3) if served else None,
+            "connections_opened": server.opened,
+            "connections_refused": server.refused,
+            "peak_server_connections": server.peak,
+        }
+        if pool:
+            result["pool"] = pool.stats()
+        return result
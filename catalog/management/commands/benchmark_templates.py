@@ -0,0 +1,116 @@
+import copy
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from catalog.models import Book
+from catalog.pagination import CursorPaginator
+from catalog.views import BookListView
+
+from .benchmark_catalog import percentile
+from .warm_templates import warm_templates
+
+FILE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+
+def template_backend(name, cached):
+    """A copy of the configured Django engine, with or without the cached loader."""
+    config = copy.deepcopy(settings.TEMPLATES[0])
+    config.pop("BACKEND")
+    config["NAME"] = name
+    config["APP_DIRS"] = False
+    config.setdefault("OPTIONS", {})["loaders"] = (
+        [("django.template.loaders.cached.Loader", FILE_LOADERS)]
+        if cached
+        else FILE_LOADERS
+    )
+    return DjangoTemplates(config)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render book_detail.html and book_list.html with templates parsed from "
+        "disk on every render and with warmed cached templates, and print the "
+        "timings as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        contexts = self.sample_contexts()
+
+        backends = {
+            "uncached": template_backend("uncached", cached=False),
+            "cached": template_backend("cached", cached=True),
+        }
+        warm_templates(backends["cached"].engine)
+
+        results = {}
+        for template_name, context in contexts.items():
+            results[template_name] = {
+                mode: self.measure(
+                    backend, template_name, context, request, options["iterations"]
+                )
+                for mode, backend in backends.items()
+            }
+        report = {"iterations": options["iterations"], "templates": results}
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def sample_contexts(self):
+        """Contexts like the views build, loaded up front so only rendering is timed."""
+        book = (
+            Book.objects.select_related("author", "language")
+            .prefetch_related("genre", "bookinstance_set")
+            .order_by("pk")
+            .first()
+        )
+        if book is None:
+            raise CommandError("There are no books to render; run seed_catalog.")
+        book.cache_version = ""
+        view = BookListView()
+        queryset = view.get_queryset()
+        page = CursorPaginator(
+            queryset, view.get_cursor_ordering(queryset), view.paginate_by
+        ).page()
+        for listed_book in page:
+            listed_book.cache_version = ""
+        return {
+            "catalog/book_detail.html": {
+                "object": book,
+                "book": book,
+                "fragment_cache_seconds": 0,
+            },
+            "catalog/book_list.html": {
+                "object_list": page.object_list,
+                "book_list": page.object_list,
+                "page_obj": page,
+                "is_paginated": page.has_other_pages(),
+                "fragment_cache_seconds": 0,
+            },
+        }
+
+    def measure(self, backend, template_name, context, request, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            backend.get_template(template_name).render(context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+        }
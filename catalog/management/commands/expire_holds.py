@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from catalog.circulation import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Cancel holds whose copy was not collected and pass the copies on."
+
+    def handle(self, *args, **options):
+        expired = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} holds."))
@@ -0,0 +1,119 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from catalog import views
+from catalog.models import Author, Book, BookInstance, CatalogStats
+from catalog.pagination import CursorPaginator
+
+LIST_VIEWS = [
+    ("books", views.BookListView),
+    ("authors", views.AuthorListView),
+    ("my-borrowed", views.LoanedBooksByUserListView),
+    ("borrowed", views.BorrowedListView),
+]
+
+
+SQLITE_SCAN = re.compile(r"\bSCAN (?P<detail>.*)")
+
+
+def sequential_scans(plan):
+    """Return the lines of a query plan that read a whole table."""
+    flagged = []
+    for line in plan.splitlines():
+        if connection.vendor == "postgresql":
+            if "Seq Scan" in line:
+                flagged.append(line.strip())
+        elif connection.vendor == "sqlite":
+            # "SCAN table" without an index reads every row. FTS5 lookups are
+            # reported as a SCAN of the virtual table and are fine.
+            match = SQLITE_SCAN.search(line)
+            if match and not re.search(r"\bUSING\b|VIRTUAL TABLE", match["detail"]):
+                flagged.append(match.group(0))
+    return flagged
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the queries behind each catalog view and flag the ones "
+        "that fall back to a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            help="Borrower whose loans the my-borrowed query is explained for.",
+        )
+        parser.add_argument(
+            "--fail-on-scan",
+            action="store_true",
+            help="Exit with an error if any query does a sequential scan.",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["username"])
+        flagged = 0
+        for name, queryset in self.view_querysets(user):
+            plan = queryset.explain()
+            scans = sequential_scans(plan)
+            flagged += bool(scans)
+            status = (
+                self.style.WARNING("SEQUENTIAL SCAN")
+                if scans
+                else self.style.SUCCESS("ok")
+            )
+            self.stdout.write(f"{name}: {status}")
+            self.stdout.write("    " + plan.replace("\n", "\n    "))
+        if flagged and options["fail_on_scan"]:
+            raise CommandError(f"{flagged} queries use a sequential scan.")
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {username!r}.")
+        borrower_id = (
+            BookInstance.objects.filter(status__exact="o", borrower__isnull=False)
+            .values_list("borrower", flat=True)
+            .first()
+        )
+        return User.objects.filter(pk=borrower_id).first() or User.objects.first()
+
+    def view_querysets(self, user):
+        """Yield (label, queryset) for the queries each catalog view runs."""
+        request = RequestFactory().get("/")
+        request.user = user
+        yield "index", CatalogStats.objects.filter(pk=1)
+
+        for name, view_class in LIST_VIEWS:
+            if view_class is views.LoanedBooksByUserListView and user is None:
+                continue
+            view = view_class()
+            view.setup(request)
+            queryset = view.get_queryset()
+            paginator = CursorPaginator(
+                queryset, view.get_cursor_ordering(queryset), view.paginate_by
+            )
+            first_page = paginator.order_by()[: view.paginate_by + 1]
+            yield f"{name} (first page)", first_page
+            rows = list(first_page)
+            if rows:
+                next_page = paginator.order_by().filter(
+                    paginator.after(paginator.values_of(rows[-1]), backwards=False)
+                )
+                yield f"{name} (cursor page)", next_page[: view.paginate_by + 1]
+
+        book = Book.objects.order_by("pk").first()
+        if book is not None:
+            view = views.BookDetailView()
+            view.setup(request, pk=book.pk)
+            yield "book-detail", view.get_queryset().filter(pk=book.pk)
+            yield "book-detail copies", BookInstance.objects.filter(book=book)
+        author = Author.objects.order_by("pk").first()
+        if author is not None:
+            yield "author-detail", Author.objects.filter(pk=author.pk)
+            yield "author-detail books", author.book_set.all()
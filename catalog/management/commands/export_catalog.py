@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.export import CHUNK_SIZE, FORMATS, TABLES, export_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the catalog as CSV or JSON lines: books with author, language, "
+        "genres and copy counts, and the individual copies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument(
+            "--table",
+            action="append",
+            choices=TABLES,
+            dest="tables",
+            help="Table to export; repeat for more. Defaults to every table for "
+            "JSON lines and to books for CSV.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        tables = options["tables"] or (
+            ["books"] if options["format"] == "csv" else list(TABLES)
+        )
+        try:
+            lines = export_lines(options["format"], tables, options["chunk_size"])
+        except ValueError as error:
+            raise CommandError(error)
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from catalog.visits import batches_in_cache, flush_visits
+
+
+class Command(BaseCommand):
+    help = "Move the visits counted in the cache into the catalog statistics."
+
+    def handle(self, *args, **options):
+        if not batches_in_cache():
+            self.stdout.write(
+                "The cache is not shared, so each worker writes its own visits; "
+                "there is nothing to flush from here."
+            )
+            return
+        flushed = flush_visits()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} visits."))
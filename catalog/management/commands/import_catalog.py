@@ -0,0 +1,131 @@
+import itertools
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import (
+    BATCH_SIZE,
+    FORMATS,
+    READERS,
+    CatalogImporter,
+    InvalidRecord,
+    clean_record,
+    format_for,
+    pymarc,
+)
+from catalog.models import CatalogStats
+from catalog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books, authors, genres and copies from CSV, JSON lines (as written "
+        "by export_catalog) or MARC. Books are upserted on their ISBN; an import "
+        "that fails part way resumes from its last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="Defaults to a guess from the file name."
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording how far the import got. Defaults to the input "
+            "path with .checkpoint appended.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and import from the first row.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        input_format = options["format"] or format_for(path)
+        if input_format == "marc" and pymarc is None:
+            raise CommandError("Importing MARC needs the pymarc package.")
+        read = READERS[input_format]
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        start = 0 if options["restart"] else self.load_checkpoint(checkpoint, path)
+        if start:
+            self.stdout.write(f"Resuming after row {start}.")
+
+        importer = CatalogImporter()
+        started = time.perf_counter()
+        position = start
+        skipped = 0
+        batch = []
+        try:
+            with open(path, "rb") as stream:
+                for position, row in enumerate(
+                    itertools.islice(read(stream), start, None), start + 1
+                ):
+                    # JSON lines exports also hold the copies table, keyed by
+                    # database ids that mean nothing here; copy counts do.
+                    if row.get("table", "books") != "books":
+                        continue
+                    try:
+                        batch.append(clean_record(row))
+                    except InvalidRecord as error:
+                        skipped += 1
+                        self.stderr.write(f"Row {position}: {error}")
+                    if len(batch) == batch_size:
+                        self.write_batch(importer, batch, checkpoint, path, position)
+                        batch = []
+                        self.report(importer, position - start, started)
+                if batch:
+                    self.write_batch(importer, batch, checkpoint, path, position)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Import stopped after row {position}: {error}")
+
+        CatalogStats.rebuild()
+        get_search_backend().rebuild()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.perf_counter() - started
+        counts = importer.counts
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {counts['created']} new and {counts['updated']} updated "
+                f"books with {counts['copies']} copies, skipped {skipped} rows, "
+                f"in {elapsed:.1f}s ({(position - start) / (elapsed or 1):.0f} rows/s)."
+            )
+        )
+
+    def write_batch(self, importer, batch, checkpoint, path, position):
+        importer.write(batch)
+        # Only written once the batch has committed, so a resumed import never
+        # skips rows that did not make it into the database.
+        temporary = f"{checkpoint}.tmp"
+        with open(temporary, "w") as output:
+            json.dump({"path": os.path.abspath(path), "rows": position}, output)
+        os.replace(temporary, checkpoint)
+
+    def load_checkpoint(self, checkpoint, path):
+        try:
+            with open(checkpoint) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f"Unreadable checkpoint {checkpoint}; use --restart.")
+        if state.get("path") != os.path.abspath(path):
+            raise CommandError(
+                f"Checkpoint {checkpoint} belongs to {state.get('path')}; use --restart."
+            )
+        return state["rows"]
+
+    def report(self, importer, rows, started):
+        elapsed = time.perf_counter() - started
+        counts = importer.counts
+        self.stdout.write(
+            f"{rows} rows, {counts['created'] + counts['updated']} books, "
+            f"{counts['copies']} copies ({rows / (elapsed or 1):.0f} rows/s)"
+        )
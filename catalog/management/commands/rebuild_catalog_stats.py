@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import CatalogStats
+
+
+class Command(BaseCommand):
+    help = "Recount the home page catalog statistics from scratch."
+
+    def handle(self, *args, **options):
+        stats = CatalogStats.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt catalog stats: {stats.number_of_books} books, "
+                f"{stats.number_of_book_instances} copies "
+                f"({stats.number_of_available_book_instances} available), "
+                f"{stats.number_of_authors} authors."
+            )
+        )
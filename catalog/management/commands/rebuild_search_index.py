@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for books and authors."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt search index with {type(backend).__name__}.")
+        )
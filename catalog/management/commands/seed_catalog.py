@@ -0,0 +1,265 @@
+import datetime
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from catalog.isbn import isbn13_check_digit
+from catalog.models import Author, Book, BookInstance, CatalogStats, Genre, Language
+from catalog.search import get_search_backend
+
+GENRES = [
+    "Fiction",
+    "Science Fiction",
+    "Fantasy",
+    "Mystery",
+    "Thriller",
+    "Romance",
+    "Historical Fiction",
+    "Horror",
+    "Biography",
+    "History",
+    "Poetry",
+    "Children's",
+    "Young Adult",
+    "Self-help",
+    "Science",
+    "Travel",
+    "Philosophy",
+    "Graphic Novel",
+]
+
+# Share of titles per language, loosely based on a European public library.
+LANGUAGES = [
+    ("English", 60),
+    ("French", 12),
+    ("Spanish", 8),
+    ("German", 6),
+    ("Italian", 4),
+    ("Portuguese", 3),
+    ("Japanese", 2),
+    ("Russian", 2),
+    ("Arabic", 1),
+    ("Twi", 1),
+    ("Swahili", 1),
+]
+
+# Copy status mix of a library with most stock on the shelves.
+STATUSES = [("a", 60), ("o", 28), ("m", 7), ("r", 5)]
+
+# Number of copies a title has: most have one or two, a few popular ones many.
+COPIES = [(0, 5), (1, 40), (2, 25), (3, 15), (4, 8), (5, 4), (8, 2), (12, 1)]
+
+FIRST_NAMES = """Ama Kofi Yaw Akosua Kwame Abena Kenneth Chinua Toni Jane George Mary
+Leo Anna Gabriel Isabel Haruki Albert Simone Victor Emile Marguerite Italo Elena
+Fyodor Olga Naguib Ngugi Wole Chimamanda Jorge Clarice Jose Virginia Zadie James
+Octavia Ursula Arthur Agatha Terry Neil Ray Frank Doris Margaret Salman Kazuo""".split()
+
+LAST_NAMES = """Obeng Mensah Asante Boateng Achebe Morrison Austen Orwell Shelley
+Tolstoy Akhmatova Garcia Allende Murakami Camus Beauvoir Hugo Zola Duras Calvino
+Ferrante Dostoevsky Tokarczuk Mahfouz Thiong'o Soyinka Adichie Borges Lispector
+Saramago Woolf Smith Baldwin Butler Le-Guin Clarke Christie Pratchett Gaiman
+Bradbury Herbert Lessing Atwood Rushdie Ishiguro Aidoo Armah Darko Nkrumah""".split()
+
+TITLE_WORDS = """River Night House Garden Silence Memory Stone Light Shadow City
+Winter Kingdom Song Fire Sea Mountain Dream Harvest Storm Bridge Crown Island
+Letter Clock Forest Mirror Journey Road Door Voice Star Ash Salt Glass Rain""".split()
+
+ADJECTIVES = """Last Hidden Quiet Broken Golden Long Secret Lost Distant Burning
+Silver Forgotten Bright Wild Empty Endless Little Hollow Crimson Second""".split()
+
+SUMMARY_WORDS = """the a an of and in to with from for by on at river night
+family war love city memory journey village letter secret island winter empire
+daughter son friend stranger house garden promise betrayal discovery revolution
+mystery history sea mountain storm kingdom dream years life death hope""".split()
+
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def isbn13(number):
+    """Return a valid ISBN-13 in the 978 prefix for a sequence number."""
+    body = f"978{number:09d}"
+    return body + isbn13_check_digit(body)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk generate a synthetic catalog of authors, books and copies with a "
+        "deterministic random seed, for load testing and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=10000)
+        parser.add_argument(
+            "--authors",
+            type=int,
+            help="Number of authors to create. Defaults to one per eight books.",
+        )
+        parser.add_argument(
+            "--patrons",
+            type=int,
+            default=100,
+            help="Number of borrower accounts that loans are spread over.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        number_of_books = options["books"]
+        batch_size = options["batch_size"]
+        if number_of_books < 0 or batch_size < 1:
+            raise CommandError("--books must be positive and --batch-size at least 1.")
+        number_of_authors = options["authors"] or max(number_of_books // 8, 1)
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        genre_ids = sorted(self.get_or_create_names(Genre, GENRES).values())
+        language_ids = self.get_or_create_names(
+            Language, [name for name, _ in LANGUAGES]
+        )
+        language_choices = [(language_ids[name], weight) for name, weight in LANGUAGES]
+        patron_ids = self.create_patrons(
+            options["patrons"], options["seed"], batch_size
+        )
+        author_ids = self.create_authors(number_of_authors, rng, batch_size)
+        # Zipf-like weights: a handful of authors write a large share of the books.
+        author_weights = list(
+            itertools.accumulate(
+                1 / (rank + 1) ** 0.8 for rank in range(len(author_ids))
+            )
+        )
+
+        def pick_author():
+            return rng.choices(author_ids, cum_weights=author_weights)[0]
+
+        isbn_start = Book.objects.count()
+        today = datetime.date.today()
+        totals = {"books": 0, "copies": 0}
+        for batch_start in range(0, number_of_books, batch_size):
+            batch_end = min(batch_start + batch_size, number_of_books)
+            with transaction.atomic():
+                books = Book.objects.bulk_create(
+                    Book(
+                        title=self.make_title(rng),
+                        summary=self.make_summary(rng),
+                        isbn=isbn13(isbn_start + number),
+                        author_id=pick_author(),
+                        language_id=weighted(rng, language_choices),
+                    )
+                    for number in range(batch_start, batch_end)
+                )
+                Book.genre.through.objects.bulk_create(
+                    Book.genre.through(book_id=book.id, genre_id=genre_id)
+                    for book in books
+                    for genre_id in rng.sample(
+                        genre_ids,
+                        weighted(rng, [(1, 6), (2, 3), (3, 1)]),
+                    )
+                )
+                copies = BookInstance.objects.bulk_create(
+                    self.make_copy(rng, book, patron_ids, today)
+                    for book in books
+                    for _ in range(weighted(rng, COPIES))
+                )
+                Book.objects.filter(
+                    pk__in=[book.id for book in books]
+                ).recount_availability()
+            totals["books"] += len(books)
+            totals["copies"] += len(copies)
+            self.stdout.write(
+                f"{totals['books']}/{number_of_books} books, {totals['copies']} copies"
+            )
+
+        CatalogStats.rebuild()
+        get_search_backend().rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {totals['books']} books, {totals['copies']} copies and "
+                f"{len(author_ids)} authors in {elapsed:.1f}s."
+            )
+        )
+
+    def get_or_create_names(self, model, names):
+        existing = dict(model.objects.filter(name__in=names).values_list("name", "id"))
+        model.objects.bulk_create(
+            model(name=name) for name in names if name not in existing
+        )
+        return dict(model.objects.filter(name__in=names).values_list("name", "id"))
+
+    def create_patrons(self, number_of_patrons, seed, batch_size):
+        usernames = [
+            f"patron{seed}-{number:06d}" for number in range(number_of_patrons)
+        ]
+        User.objects.bulk_create(
+            (
+                User(username=username, password=make_password(None))
+                for username in usernames
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        return list(
+            User.objects.filter(username__in=usernames).values_list("id", flat=True)
+        )
+
+    def create_authors(self, number_of_authors, rng, batch_size):
+        author_ids = []
+        for batch_start in range(0, number_of_authors, batch_size):
+            batch_end = min(batch_start + batch_size, number_of_authors)
+            authors = Author.objects.bulk_create(
+                self.make_author(rng) for _ in range(batch_start, batch_end)
+            )
+            author_ids.extend(author.id for author in authors)
+        return author_ids
+
+    def make_author(self, rng):
+        born = datetime.date(1800, 1, 1) + datetime.timedelta(days=rng.randrange(72000))
+        died = None
+        if rng.random() < 0.4:
+            died = born + datetime.timedelta(days=rng.randrange(9000, 36000))
+        return Author(
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            nationality=rng.choice(["GH", "NG", "GB", "FR", "US", "JP", "ES", "DE"]),
+            date_of_birth=born,
+            date_of_death=died,
+        )
+
+    def make_title(self, rng):
+        pattern = rng.randrange(4)
+        noun, other = rng.sample(TITLE_WORDS, 2)
+        if pattern == 0:
+            return f"The {rng.choice(ADJECTIVES)} {noun}"
+        if pattern == 1:
+            return f"The {noun} of {other}"
+        if pattern == 2:
+            return f"{noun} and {other}"
+        return f"A {noun} in the {other}"
+
+    def make_summary(self, rng):
+        words = rng.choices(SUMMARY_WORDS, k=rng.randint(20, 150))
+        return (" ".join(words).capitalize() + ".")[:1000]
+
+    def make_copy(self, rng, book, patron_ids, today):
+        status = weighted(rng, STATUSES)
+        due_back = None
+        borrower_id = None
+        if status in ("o", "r") and patron_ids:
+            borrower_id = rng.choice(patron_ids)
+        if status == "o":
+            due_back = today + datetime.timedelta(days=rng.randint(-21, 28))
+        return BookInstance(
+            book=book,
+            imprint=rng.choice(["Penguin", "Heinemann", "Gallimard", "Vintage"]),
+            status=status,
+            due_back=due_back,
+            borrower_id=borrower_id,
+        )
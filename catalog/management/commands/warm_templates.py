@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+# Other files in template directories, such as editor backups, are not compiled.
+TEMPLATE_SUFFIXES = {".html", ".txt"}
+
+
+def project_template_dirs(engine):
+    """The engine's DIRS plus the template directories of this project's apps."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    app_dirs = [
+        directory
+        for directory in get_app_template_dirs("templates")
+        if base_dir in Path(directory).resolve().parents
+    ]
+    return [Path(directory) for directory in [*engine.dirs, *app_dirs]]
+
+
+def project_template_names(engine):
+    names = set()
+    for directory in project_template_dirs(engine):
+        if directory.is_dir():
+            names.update(
+                path.relative_to(directory).as_posix()
+                for path in directory.rglob("*")
+                if path.suffix in TEMPLATE_SUFFIXES and path.is_file()
+            )
+    return sorted(names)
+
+
+def warm_templates(engine=None):
+    """Compile every project template, filling the cached loader; return the names."""
+    engine = engine or engines["django"].engine
+    names = project_template_names(engine)
+    for name in names:
+        engine.get_template(name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every template in the project's template directories so the "
+        "cached template loader holds them before the first request."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            names = warm_templates()
+        except TemplateSyntaxError as error:
+            raise CommandError(f"Template failed to compile: {error}")
+        if options["verbosity"]:
+            self.stdout.write(f"Compiled {len(names)} templates.")
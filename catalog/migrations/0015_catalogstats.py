@@ -0,0 +1,35 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0014_alter_author_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number_of_books", models.IntegerField(default=0)),
+                ("number_of_book_instances", models.IntegerField(default=0)),
+                ("number_of_available_book_instances", models.IntegerField(default=0)),
+                ("number_of_authors", models.IntegerField(default=0)),
+                ("books_containing_of", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "catalog stats",
+            },
+        ),
+    ]
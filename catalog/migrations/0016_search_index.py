@@ -0,0 +1,56 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if ("ENABLE_FTS5",) not in cursor.fetchall():
+                # The search view falls back to icontains lookups without FTS5.
+                return
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE catalog_book_fts USING fts5(title, summary, isbn)"
+        )
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE catalog_author_fts USING fts5(first_name, last_name)"
+        )
+        schema_editor.execute(
+            "INSERT INTO catalog_book_fts(rowid, title, summary, isbn) "
+            "SELECT id, title, summary, isbn FROM catalog_book"
+        )
+        schema_editor.execute(
+            "INSERT INTO catalog_author_fts(rowid, first_name, last_name) "
+            "SELECT id, first_name, last_name FROM catalog_author"
+        )
+    elif connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX catalog_book_search_idx ON catalog_book USING gin (("
+            "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, isbn), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, summary), 'C')))"
+        )
+        schema_editor.execute(
+            "CREATE INDEX catalog_author_search_idx ON catalog_author USING gin (("
+            "to_tsvector('simple'::regconfig, first_name || ' ' || last_name)))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS catalog_book_fts")
+        schema_editor.execute("DROP TABLE IF EXISTS catalog_author_fts")
+    elif schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS catalog_book_search_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS catalog_author_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0015_catalogstats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
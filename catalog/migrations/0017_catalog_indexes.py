@@ -0,0 +1,37 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0016_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="author",
+            index=models.Index(
+                fields=["last_name", "first_name", "id"], name="author_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["title", "id"], name="book_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bookinstance",
+            index=models.Index(
+                fields=["status", "due_back", "id"], name="bookinstance_status_due_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookinstance",
+            index=models.Index(
+                condition=models.Q(("status", "o")),
+                fields=["borrower", "due_back", "id"],
+                name="bookinstance_on_loan_idx",
+            ),
+        ),
+    ]
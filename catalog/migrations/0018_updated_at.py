@@ -0,0 +1,28 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0017_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="author",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="bookinstance",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
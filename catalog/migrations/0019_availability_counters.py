@@ -0,0 +1,75 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+STATUS_COUNTERS = {
+    "a": "available_count",
+    "o": "on_loan_count",
+    "r": "reserved_count",
+    "m": "maintenance_count",
+}
+
+
+def count_copies(apps, schema_editor):
+    Book = apps.get_model("catalog", "Book")
+    BookInstance = apps.get_model("catalog", "BookInstance")
+
+    def copies(**filters):
+        return (
+            BookInstance.objects.filter(book=models.OuterRef("pk"), **filters)
+            .order_by()
+            .values("book")
+        )
+
+    def count(**filters):
+        counts = copies(**filters).annotate(count=models.Count("pk"))
+        return Coalesce(models.Subquery(counts.values("count")), 0)
+
+    next_due_back = copies(status="o").annotate(next_due_back=models.Min("due_back"))
+    Book.objects.update(
+        copy_count=count(),
+        next_due_back=models.Subquery(next_due_back.values("next_due_back")),
+        **{field: count(status=status) for status, field in STATUS_COUNTERS.items()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0018_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="available_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="copy_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="maintenance_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="next_due_back",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="on_loan_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="reserved_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_copies, migrations.RunPython.noop),
+    ]
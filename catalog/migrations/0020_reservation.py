@@ -0,0 +1,100 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("catalog", "0019_availability_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Reservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("w", "Waiting"),
+                            ("h", "Ready for pickup"),
+                            ("f", "Fulfilled"),
+                            ("c", "Cancelled"),
+                        ],
+                        default="w",
+                        max_length=1,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "expires_on",
+                    models.DateField(
+                        blank=True,
+                        help_text="Last day to collect a copy that is ready.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="catalog.book"
+                    ),
+                ),
+                (
+                    "book_instance",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="The copy set aside for the patron, once one is ready.",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="catalog.bookinstance",
+                    ),
+                ),
+                (
+                    "patron",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at", "id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(("status", "w")),
+                fields=["book", "created_at", "id"],
+                name="reservation_queue_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["patron", "status"], name="reservation_patron_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["w", "h"])),
+                fields=("book", "patron"),
+                name="reservation_one_active_per_patron",
+            ),
+        ),
+    ]
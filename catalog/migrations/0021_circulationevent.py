@@ -0,0 +1,96 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("catalog", "0020_reservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CirculationEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("return", "Marked returned"),
+                            ("make-available", "Marked available"),
+                            ("maintenance", "Sent to maintenance"),
+                            ("extend", "Due date extended"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("m", "Maintainance"),
+                            ("o", "On loan"),
+                            ("a", "Available"),
+                            ("r", "Reserved"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("m", "Maintainance"),
+                            ("o", "On loan"),
+                            ("a", "Available"),
+                            ("r", "Reserved"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "book_instance",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="catalog.bookinstance",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="circulationevent",
+            index=models.Index(
+                fields=["book_instance", "created_at"],
+                name="circulation_event_copy_idx",
+            ),
+        ),
+    ]
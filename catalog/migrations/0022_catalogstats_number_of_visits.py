@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0021_circulationevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="catalogstats",
+            name="number_of_visits",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
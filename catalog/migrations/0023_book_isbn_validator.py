@@ -0,0 +1,25 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:52
+
+import catalog.isbn
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0022_catalogstats_number_of_visits"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="book",
+            name="isbn",
+            field=models.CharField(
+                help_text="13 Character <a href='https://www.isbn-international.org/content/what-isbn'>ISBN number</a>",
+                max_length=13,
+                unique=True,
+                validators=[catalog.isbn.validate_isbn],
+                verbose_name="ISBN",
+            ),
+        ),
+    ]
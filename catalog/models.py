@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib import admin
@@ -6,6 +7,8 @@ from django.contrib import admin
 from django_countries.fields import CountryField
 from django_countries.widgets import CountrySelectWidget
 
+from .isbn import InvalidISBN, to_isbn13, validate_isbn
+
 import uuid
 from datetime import date
 
@@ -21,6 +24,41 @@ class Genre(models.Model):
         return self.name
 
 
+class BookQuerySet(models.QuerySet):
+    """Queryset helpers for the per-book availability counters.
+
+    The counters are stored on `Book` so lists and detail pages render them
+    without touching `BookInstance`; `recount_availability` refreshes them from
+    the copies with correlated subqueries, in a single UPDATE.
+    """
+
+    @staticmethod
+    def _copies(**filters):
+        return (
+            BookInstance.objects.filter(book=models.OuterRef("pk"), **filters)
+            .order_by()
+            .values("book")
+        )
+
+    def _count_copies(self, **filters):
+        count = self._copies(**filters).annotate(count=models.Count("pk"))
+        return Coalesce(models.Subquery(count.values("count")), 0)
+
+    def recount_availability(self):
+        """Recount the copies of every book in the queryset; return the rows updated."""
+        next_due_back = self._copies(status__exact="o").annotate(
+            next_due_back=models.Min("due_back")
+        )
+        return self.update(
+            copy_count=self._count_copies(),
+            next_due_back=models.Subquery(next_due_back.values("next_due_back")),
+            **{
+                field: self._count_copies(status__exact=status)
+                for status, field in Book.STATUS_COUNTERS.items()
+            },
+        )
+
+
 class Book(models.Model):
     """A model for Book"""
 
@@ -33,14 +71,59 @@ class Book(models.Model):
         "ISBN",
         max_length=13,
         unique=True,
+        validators=[validate_isbn],
         help_text="13 Character <a href='https://www.isbn-international.org/content/what-isbn'>ISBN number</a>",
     )
     genre = models.ManyToManyField(Genre, help_text="Select a book genre")
     language = models.ForeignKey("Language", on_delete=models.SET_NULL, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Availability of the copies, kept up to date by `catalog.signals` and
+    # `catalog.circulation`; `manage.py recount_availability` repairs them.
+    copy_count = models.PositiveIntegerField(default=0, editable=False)
+    available_count = models.PositiveIntegerField(default=0, editable=False)
+    on_loan_count = models.PositiveIntegerField(default=0, editable=False)
+    reserved_count = models.PositiveIntegerField(default=0, editable=False)
+    maintenance_count = models.PositiveIntegerField(default=0, editable=False)
+    next_due_back = models.DateField(null=True, blank=True, editable=False)
+
+    # The counter each copy status is tallied in.
+    STATUS_COUNTERS = {
+        "a": "available_count",
+        "o": "on_loan_count",
+        "r": "reserved_count",
+        "m": "maintenance_count",
+    }
+
+    AVAILABILITY_FIELDS = (
+        "copy_count",
+        *STATUS_COUNTERS.values(),
+        "next_due_back",
+    )
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Leave the copy counters alone, so a stale form cannot overwrite them."""
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.AVAILABILITY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        # The validator takes ISBN-10 and hyphenated input, but lookups and the
+        # unique check need the ISBN-13, which every form saves through here.
+        try:
+            self.isbn = to_isbn13(self.isbn)
+        except InvalidISBN:
+            pass  # Already reported by the field validator.
+
     def display_genre(self):
         """Create a list of the book's genre required for display in the Admin interface."""
         return ", ".join(genre.name for genre in self.genre.all()[:3])
@@ -51,6 +134,24 @@ class Book(models.Model):
     class Meta:
         ordering = ["title"]
         permissions = (("can_add_book", "Can add new book"),)
+        indexes = [models.Index(fields=["title", "id"], name="book_title_idx")]
+
+
+class BookInstanceQuerySet(models.QuerySet):
+    """Overdue loans found in SQL, on the (status, due_back, id) index."""
+
+    def overdue(self, today=None):
+        """Copies on loan whose due date has passed."""
+        return self.filter(status__exact="o", due_back__lt=today or date.today())
+
+    def with_overdue_flag(self, today=None):
+        """Annotate each copy with whether it is overdue, as `overdue`."""
+        return self.annotate(
+            overdue=models.ExpressionWrapper(
+                models.Q(due_back__lt=today or date.today()),
+                output_field=models.BooleanField(),
+            )
+        )
 
 
 class BookInstance(models.Model):
@@ -78,20 +179,132 @@ class BookInstance(models.Model):
         help_text="Book availability",
     )
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
 
     class Meta:
         ordering = ["due_back"]
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            models.Index(
+                fields=["status", "due_back", "id"], name="bookinstance_status_due_idx"
+            ),
+            models.Index(
+                fields=["borrower", "due_back", "id"],
+                condition=models.Q(status="o"),
+                name="bookinstance_on_loan_idx",
+            ),
+        ]
 
     @admin.display(boolean=True, ordering="due_back", description="Over Due?")
     def is_overdue(self):
-        """Check if book instance is overdue."""
+        """Check if book instance is overdue, using `with_overdue_flag` if it ran."""
+        if hasattr(self, "overdue"):
+            return bool(self.overdue)
         return bool(self.due_back and (date.today() > self.due_back))
 
     def __str__(self):
         return f"{self.id} ({self.book.title})"
 
 
+class Reservation(models.Model):
+    """A patron's place in the hold queue of a book.
+
+    Holds are served first come, first served: a returned copy goes to the
+    oldest waiting hold on its book, read through a partial index that only
+    holds the waiting rows.
+    """
+
+    WAITING = "w"
+    READY = "h"
+    FULFILLED = "f"
+    CANCELLED = "c"
+    STATUS = (
+        (WAITING, "Waiting"),
+        (READY, "Ready for pickup"),
+        (FULFILLED, "Fulfilled"),
+        (CANCELLED, "Cancelled"),
+    )
+    ACTIVE_STATUSES = (WAITING, READY)
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=1, choices=STATUS, default=WAITING)
+    book_instance = models.ForeignKey(
+        BookInstance,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        help_text="The copy set aside for the patron, once one is ready.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_on = models.DateField(
+        null=True, blank=True, help_text="Last day to collect a copy that is ready."
+    )
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["book", "created_at", "id"],
+                condition=models.Q(status="w"),
+                name="reservation_queue_idx",
+            ),
+            models.Index(fields=["patron", "status"], name="reservation_patron_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "patron"],
+                condition=models.Q(status__in=["w", "h"]),
+                name="reservation_one_active_per_patron",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.patron} for {self.book} ({self.get_status_display()})"
+
+
+class CirculationEvent(models.Model):
+    """An audit row for a copy moved by a bulk admin action."""
+
+    RETURNED = "return"
+    MADE_AVAILABLE = "make-available"
+    MAINTENANCE = "maintenance"
+    EXTENDED = "extend"
+    ACTIONS = (
+        (RETURNED, "Marked returned"),
+        (MADE_AVAILABLE, "Marked available"),
+        (MAINTENANCE, "Sent to maintenance"),
+        (EXTENDED, "Due date extended"),
+    )
+
+    book_instance = models.ForeignKey(
+        BookInstance, on_delete=models.SET_NULL, null=True
+    )
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    from_status = models.CharField(
+        max_length=1, choices=BookInstance.LOAN_STATUS, blank=True
+    )
+    to_status = models.CharField(
+        max_length=1, choices=BookInstance.LOAN_STATUS, blank=True
+    )
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["book_instance", "created_at"],
+                name="circulation_event_copy_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()}: {self.book_instance_id}"
+
+
 class Author(models.Model):
     """A model for Auther."""
 
@@ -106,9 +319,15 @@ class Author(models.Model):
     date_of_death = models.DateField(
         "died", null=True, blank=True, help_text="YYYY-MM-DD"
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["last_name", "first_name"]
+        indexes = [
+            models.Index(
+                fields=["last_name", "first_name", "id"], name="author_name_idx"
+            )
+        ]
 
     def get_absolute_url(self):
         return reverse("author-detail", args=[str(self.id)])
@@ -131,3 +350,63 @@ class Language(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class CatalogStats(models.Model):
+    """A single-row summary of the catalog counts shown on the home page."""
+
+    TITLE_FACT_SUBSTRING = "of"
+
+    number_of_books = models.IntegerField(default=0)
+    number_of_book_instances = models.IntegerField(default=0)
+    number_of_available_book_instances = models.IntegerField(default=0)
+    number_of_authors = models.IntegerField(default=0)
+    books_containing_of = models.IntegerField(default=0)
+    # Home page views, flushed in batches by `catalog.visits`; not rebuilt.
+    number_of_visits = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "catalog stats"
+
+    def __str__(self):
+        return "Catalog statistics"
+
+    @classmethod
+    def load(cls):
+        """Return the summary row, building it from scratch if it is missing."""
+        return cls.objects.filter(pk=1).first() or cls.rebuild()
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every statistic from the catalog tables and store the result."""
+        stats, _ = cls.objects.update_or_create(
+            pk=1,
+            defaults={
+                "number_of_books": Book.objects.count(),
+                "number_of_book_instances": BookInstance.objects.count(),
+                "number_of_available_book_instances": BookInstance.objects.filter(
+                    status__exact="a"
+                ).count(),
+                "number_of_authors": Author.objects.count(),
+                "books_containing_of": Book.objects.filter(
+                    title__icontains=cls.TITLE_FACT_SUBSTRING
+                ).count(),
+            },
+        )
+        return stats
+
+    @classmethod
+    def bump(cls, **deltas):
+        """Apply counter deltas in a single UPDATE, rebuilding if the row is missing."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=1).update(
+            **{field: models.F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            cls.rebuild()
+            # rebuild() recounts the catalog counters but cannot recount
+            # visits, so those deltas still have to be added to the new row.
+            if deltas.get("number_of_visits"):
+                cls.bump(number_of_visits=deltas["number_of_visits"])
@@ -0,0 +1,209 @@
+"""Keyset (cursor) pagination for the catalog list views.
+
+Pages are found by filtering on the ordering columns of the last row shown,
+so deep pages cost the same as the first one and no COUNT(*) is run.
+"""
+
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, backwards=False):
+    payload = json.dumps([values, backwards], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, fields):
+    """Return the values and direction in `cursor`, as `fields` store them.
+
+    Cursors come from the query string, so each value is checked against its
+    model field here rather than failing later in the query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(cursor)
+    cleaned = []
+    for field, value in zip(fields, values):
+        if value is None:
+            if not field.null:
+                raise InvalidCursor(cursor)
+        else:
+            try:
+                value = field.to_python(value)
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor(cursor)
+        cleaned.append(value)
+    return cleaned, bool(backwards)
+
+
+class CursorPage:
+    """A page of rows with opaque cursors to the pages either side of it."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginate a queryset on `ordering` plus the primary key as a tiebreak.
+
+    Rows are ordered the database's own way, so plain b-tree indexes on the
+    ordering columns can serve each page. For a nullable column such as
+    `due_back` that means NULLs come first on SQLite and last on PostgreSQL,
+    and the cursor filters follow suit.
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        self.keys = []
+        self.fields = []
+        for name in ordering:
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            if name == "pk":
+                name = pk_name
+            if name not in (key[0] for key in self.keys):
+                field = model._meta.get_field(name)
+                self.keys.append((name, descending, field.null))
+                self.fields.append(field)
+        if pk_name not in (key[0] for key in self.keys):
+            self.keys.append((pk_name, False, False))
+            self.fields.append(model._meta.pk)
+
+    def order_by(self, backwards=False):
+        return self.queryset.order_by(
+            *(
+                f"-{name}" if descending != backwards else name
+                for name, descending, _ in self.keys
+            )
+        )
+
+    def beyond(self, name, descending, null, value, backwards):
+        """Q for rows strictly past `value` in the direction being paged."""
+        larger = descending == backwards
+        if value is None:
+            # Only non-NULL values lie on the far side of a NULL, if any do.
+            if larger == self.nulls_largest:
+                return None
+            return Q(**{f"{name}__isnull": False})
+        condition = Q(**{f"{name}__gt" if larger else f"{name}__lt": value})
+        if null and larger == self.nulls_largest:
+            condition |= Q(**{f"{name}__isnull": True})
+        return condition
+
+    def after(self, values, backwards):
+        """Q for the rows after (or before, if `backwards`) the row with `values`."""
+        branches = []
+        equal = Q()
+        for (name, descending, null), value in zip(self.keys, values):
+            condition = self.beyond(name, descending, null, value, backwards)
+            if condition is not None:
+                branches.append(equal & condition)
+            if value is None:
+                equal &= Q(**{f"{name}__isnull": True})
+            else:
+                equal &= Q(**{name: value})
+        return reduce(or_, branches) if branches else Q(pk__in=[])
+
+    def values_of(self, obj):
+        return [getattr(obj, name) for name, _, _ in self.keys]
+
+    def page(self, cursor=None, number=None):
+        """Return the page after `cursor`, or page `number` when no cursor is given."""
+        size = self.page_size
+        if cursor:
+            values, backwards = decode_cursor(cursor, self.fields)
+            queryset = self.order_by(backwards).filter(self.after(values, backwards))
+            rows = list(queryset[: size + 1])
+            more = len(rows) > size
+            rows = rows[:size]
+            if backwards:
+                rows.reverse()
+            has_previous, has_next = (more, True) if backwards else (True, more)
+        else:
+            # Offset pages keep old `?page=` links working; they also hand out
+            # cursors, so following them moves on to keyset pages.
+            offset = (max(number or 1, 1) - 1) * size
+            rows = list(self.order_by()[offset : offset + size + 1])
+            has_next = len(rows) > size
+            rows = rows[:size]
+            has_previous = offset > 0
+        if not rows:
+            return CursorPage(rows)
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(self.values_of(rows[-1])) if has_next else None,
+            previous_cursor=(
+                encode_cursor(self.values_of(rows[0]), backwards=True)
+                if has_previous
+                else None
+            ),
+        )
+
+
+class CursorPaginationMixin:
+    """Drop-in replacement for `paginate_by` pagination on a ListView.
+
+    Pages are addressed with `?cursor=`; there is no paginator or page count
+    in the context, only `page_obj` with `next_cursor` and `previous_cursor`.
+    """
+
+    cursor_kwarg = "cursor"
+
+    def get_cursor_ordering(self, queryset):
+        ordering = self.get_ordering() or queryset.query.order_by
+        if not ordering:
+            ordering = queryset.model._meta.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, self.get_cursor_ordering(queryset), page_size
+        )
+        number = self.request.GET.get(self.page_kwarg)
+        try:
+            page = paginator.page(
+                cursor=self.request.GET.get(self.cursor_kwarg),
+                number=int(number) if number else None,
+            )
+        except (InvalidCursor, ValidationError, ValueError):
+            raise Http404("Invalid page.")
+        return (None, page, page.object_list, page.has_other_pages())
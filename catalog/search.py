@@ -0,0 +1,258 @@
+"""Full-text search over books and authors.
+
+The backend is picked from the database vendor. SQLite uses FTS5 tables that
+are kept in sync by signals, PostgreSQL ranks against GIN indexed `tsvector`
+expressions, and any other database falls back to `icontains` lookups.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Author, Book
+
+TOKEN = re.compile(r"\w+")
+HYPHENATED_NUMBER = re.compile(r"(?<=\d)[- ](?=\d)")
+
+
+def search_terms(query):
+    """Split a user query into plain word tokens, joining hyphenated ISBNs."""
+    return TOKEN.findall(HYPHENATED_NUMBER.sub("", query or ""))
+
+
+class DatabaseSearchBackend:
+    """Unranked fallback using `icontains`, for databases without full-text search."""
+
+    def search_books(self, terms, offset, limit):
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term)
+                | Q(summary__icontains=term)
+                | Q(isbn__icontains=term)
+                | Q(author__first_name__icontains=term)
+                | Q(author__last_name__icontains=term)
+            )
+        return list(
+            Book.objects.filter(condition).values_list("id", flat=True)[
+                offset : offset + limit
+            ]
+        )
+
+    def search_authors(self, terms, limit):
+        condition = Q()
+        for term in terms:
+            condition &= Q(first_name__icontains=term) | Q(last_name__icontains=term)
+        return list(
+            Author.objects.filter(condition).values_list("id", flat=True)[:limit]
+        )
+
+    def update_book(self, book):
+        pass
+
+    def delete_book(self, book_id):
+        pass
+
+    def update_author(self, author):
+        pass
+
+    def delete_author(self, author_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SqliteSearchBackend(DatabaseSearchBackend):
+    """FTS5 tables ranked with bm25; see migration 0016 for the table layout."""
+
+    # Each branch is cut to the rows the page can need before the two are merged,
+    # so the final grouping never sorts more than two pages of candidates.
+    BOOK_QUERY = """
+        SELECT id FROM (
+            SELECT * FROM (
+                SELECT rowid AS id, bm25(catalog_book_fts, 10.0, 1.0, 10.0) AS rank
+                FROM catalog_book_fts WHERE catalog_book_fts MATCH %s
+                ORDER BY rank LIMIT %s
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT book.id, bm25(catalog_author_fts) * 5.0 AS rank
+                FROM catalog_author_fts
+                JOIN catalog_book AS book ON book.author_id = catalog_author_fts.rowid
+                WHERE catalog_author_fts MATCH %s
+                ORDER BY rank LIMIT %s
+            )
+        )
+        GROUP BY id ORDER BY MIN(rank), id LIMIT %s OFFSET %s
+    """
+    AUTHOR_QUERY = """
+        SELECT rowid FROM catalog_author_fts WHERE catalog_author_fts MATCH %s
+        ORDER BY bm25(catalog_author_fts) LIMIT %s
+    """
+
+    @staticmethod
+    def match_expression(terms):
+        # Quote every term so FTS5 operators typed by users are matched literally,
+        # and allow prefix matches so partial words still find results.
+        return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    def search_books(self, terms, offset, limit):
+        match = self.match_expression(terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self.BOOK_QUERY,
+                [match, offset + limit, match, offset + limit, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_authors(self, terms, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(self.AUTHOR_QUERY, [self.match_expression(terms), limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def update_book(self, book):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM catalog_book_fts WHERE rowid = %s", [book.id])
+            cursor.execute(
+                "INSERT INTO catalog_book_fts(rowid, title, summary, isbn) "
+                "VALUES (%s, %s, %s, %s)",
+                [book.id, book.title, book.summary, book.isbn],
+            )
+
+    def delete_book(self, book_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM catalog_book_fts WHERE rowid = %s", [book_id])
+
+    def update_author(self, author):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM catalog_author_fts WHERE rowid = %s", [author.id]
+            )
+            cursor.execute(
+                "INSERT INTO catalog_author_fts(rowid, first_name, last_name) "
+                "VALUES (%s, %s, %s)",
+                [author.id, author.first_name, author.last_name],
+            )
+
+    def delete_author(self, author_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM catalog_author_fts WHERE rowid = %s", [author_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM catalog_book_fts")
+            cursor.execute(
+                "INSERT INTO catalog_book_fts(rowid, title, summary, isbn) "
+                "SELECT id, title, summary, isbn FROM catalog_book"
+            )
+            cursor.execute("DELETE FROM catalog_author_fts")
+            cursor.execute(
+                "INSERT INTO catalog_author_fts(rowid, first_name, last_name) "
+                "SELECT id, first_name, last_name FROM catalog_author"
+            )
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    """`tsvector` expressions matching the GIN indexes created in migration 0016.
+
+    The indexes are on expressions of the row itself, so PostgreSQL keeps them
+    current and there is nothing to update on save.
+    """
+
+    BOOK_VECTOR = (
+        "(setweight(to_tsvector('simple'::regconfig, book.title), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, book.isbn), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, book.summary), 'C'))"
+    )
+    AUTHOR_VECTOR = (
+        "to_tsvector('simple'::regconfig, "
+        "author.first_name || ' ' || author.last_name)"
+    )
+    BOOK_QUERY = f"""
+        WITH search AS (SELECT to_tsquery('simple', %s) AS query)
+        SELECT id FROM (
+            SELECT book.id, ts_rank({BOOK_VECTOR}, search.query) AS rank
+            FROM catalog_book AS book, search
+            WHERE {BOOK_VECTOR} @@ search.query
+            UNION ALL
+            SELECT book.id, ts_rank({AUTHOR_VECTOR}, search.query) * 0.5 AS rank
+            FROM catalog_author AS author
+            JOIN catalog_book AS book ON book.author_id = author.id, search
+            WHERE {AUTHOR_VECTOR} @@ search.query
+        ) AS matches
+        GROUP BY id ORDER BY MAX(rank) DESC, id LIMIT %s OFFSET %s
+    """
+    AUTHOR_QUERY = f"""
+        SELECT author.id FROM catalog_author AS author,
+            to_tsquery('simple', %s) AS query
+        WHERE {AUTHOR_VECTOR} @@ query
+        ORDER BY ts_rank({AUTHOR_VECTOR}, query) DESC LIMIT %s
+    """
+
+    @staticmethod
+    def tsquery(terms):
+        return " & ".join(f"{term}:*" for term in terms)
+
+    def search_books(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(self.BOOK_QUERY, [self.tsquery(terms), limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_authors(self, terms, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(self.AUTHOR_QUERY, [self.tsquery(terms), limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+_fts_tables_by_database = {}
+
+
+def sqlite_has_fts_tables():
+    """Whether migration 0016 could create the FTS5 tables, checked once per database."""
+    name = connection.settings_dict["NAME"]
+    if name not in _fts_tables_by_database:
+        _fts_tables_by_database[name] = (
+            "catalog_book_fts" in connection.introspection.table_names()
+        )
+    return _fts_tables_by_database[name]
+
+
+def get_search_backend():
+    """Return the configured backend, or the best one for the current database."""
+    backend_path = getattr(settings, "CATALOG_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite" and sqlite_has_fts_tables():
+        return SqliteSearchBackend()
+    return DatabaseSearchBackend()
+
+
+def search_catalog(query, page=1, page_size=10, number_of_authors=5):
+    """Return ranked books for one page, whether a next page exists, and authors.
+
+    One extra row is fetched instead of counting every match, so a page costs
+    the same however many books match.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False, []
+    backend = get_search_backend()
+    book_ids = backend.search_books(terms, (page - 1) * page_size, page_size + 1)
+    has_next = len(book_ids) > page_size
+    book_ids = book_ids[:page_size]
+    author_ids = backend.search_authors(terms, number_of_authors)
+    books = Book.objects.select_related("author").in_bulk(book_ids)
+    authors = Author.objects.in_bulk(author_ids)
+    return (
+        [books[book_id] for book_id in book_ids if book_id in books],
+        has_next,
+        [authors[author_id] for author_id in author_ids if author_id in authors],
+    )
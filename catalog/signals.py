@@ -0,0 +1,204 @@
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+
+from .cache import author_version, book_version, bump_versions
+from .models import Book, BookInstance, Author, Genre, Language, CatalogStats
+from .search import get_search_backend
+
+
+def _contains_of(title):
+    return CatalogStats.TITLE_FACT_SUBSTRING in (title or "").lower()
+
+
+def _is_available(status):
+    return status == "a"
+
+
+@receiver(pre_save, sender=Book)
+def remember_previous_title(sender, instance, **kwargs):
+    """Keep the stored title and author so a change can adjust counters and caches."""
+    instance._previous_title, instance._previous_author_id = (
+        (None, None)
+        if instance._state.adding
+        else Book.objects.filter(pk=instance.pk)
+        .values_list("title", "author_id")
+        .first()
+        or (None, None)
+    )
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, created, **kwargs):
+    if created:
+        CatalogStats.bump(
+            number_of_books=1, books_containing_of=int(_contains_of(instance.title))
+        )
+    else:
+        CatalogStats.bump(
+            books_containing_of=int(_contains_of(instance.title))
+            - int(_contains_of(instance._previous_title))
+        )
+
+
+@receiver(post_delete, sender=Book)
+def count_deleted_book(sender, instance, **kwargs):
+    CatalogStats.bump(
+        number_of_books=-1, books_containing_of=-int(_contains_of(instance.title))
+    )
+
+
+@receiver(pre_save, sender=BookInstance)
+def remember_previous_status(sender, instance, **kwargs):
+    """Keep the stored status and book so a change can adjust counters and caches."""
+    instance._previous_status, instance._previous_book_id = (
+        (None, None)
+        if instance._state.adding
+        else BookInstance.objects.filter(pk=instance.pk)
+        .values_list("status", "book_id")
+        .first()
+        or (None, None)
+    )
+
+
+@receiver(post_save, sender=BookInstance)
+def count_saved_book_instance(sender, instance, created, **kwargs):
+    available = int(_is_available(instance.status))
+    if created:
+        CatalogStats.bump(
+            number_of_book_instances=1, number_of_available_book_instances=available
+        )
+    else:
+        CatalogStats.bump(
+            number_of_available_book_instances=available
+            - int(_is_available(instance._previous_status))
+        )
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_deleted_book_instance(sender, instance, **kwargs):
+    CatalogStats.bump(
+        number_of_book_instances=-1,
+        number_of_available_book_instances=-int(_is_available(instance.status)),
+    )
+
+
+@receiver(post_save, sender=Author)
+def count_saved_author(sender, instance, created, **kwargs):
+    if created:
+        CatalogStats.bump(number_of_authors=1)
+
+
+@receiver(post_delete, sender=Author)
+def count_deleted_author(sender, instance, **kwargs):
+    CatalogStats.bump(number_of_authors=-1)
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, **kwargs):
+    get_search_backend().update_book(instance)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    get_search_backend().delete_book(instance.id)
+
+
+@receiver(post_save, sender=Author)
+def index_saved_author(sender, instance, **kwargs):
+    get_search_backend().update_author(instance)
+
+
+@receiver(post_delete, sender=Author)
+def unindex_deleted_author(sender, instance, **kwargs):
+    get_search_backend().delete_author(instance.id)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def expire_book_pages(sender, instance, **kwargs):
+    bump_versions(
+        "books",
+        book_version(instance.pk),
+        author_version(instance.author_id),
+        author_version(getattr(instance, "_previous_author_id", None)),
+    )
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def recount_book_availability(sender, instance, **kwargs):
+    """Refresh the copy counters of the book, and of the previous one if it moved."""
+    book_ids = {instance.book_id, getattr(instance, "_previous_book_id", None)}
+    book_ids.discard(None)
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).recount_availability()
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def expire_book_instance_pages(sender, instance, **kwargs):
+    """Copy counts show on the book list, the book page and the author page."""
+    book_ids = {instance.book_id, getattr(instance, "_previous_book_id", None)}
+    book_ids.discard(None)
+    author_ids = (
+        Book.objects.filter(pk__in=book_ids)
+        .order_by()
+        .values_list("author_id", flat=True)
+    )
+    bump_versions(
+        "books",
+        *map(book_version, book_ids),
+        *map(author_version, author_ids),
+    )
+
+
+@receiver(pre_delete, sender=Author)
+def remember_author_books(sender, instance, **kwargs):
+    """Deleting an author nulls `Book.author` without sending Book signals."""
+    instance._book_ids = list(instance.book_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def expire_author_pages(sender, instance, created=False, **kwargs):
+    """Book pages show the author's name, so they expire along with the author's."""
+    book_ids = getattr(instance, "_book_ids", None)
+    if book_ids is None:
+        book_ids = [] if created else instance.book_set.values_list("pk", flat=True)
+    bump_versions(
+        "authors",
+        author_version(instance.pk),
+        *map(book_version, book_ids),
+    )
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def expire_genre_pages(sender, instance, **kwargs):
+    bump_versions("genres")
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def expire_language_pages(sender, instance, **kwargs):
+    bump_versions("languages")
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def expire_book_genre_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    # "books" too: the API lists each book's genre ids.
+    if not reverse:
+        bump_versions("books", book_version(instance.pk))
+    elif pk_set:
+        bump_versions("books", *map(book_version, pk_set))
+    else:
+        # Clearing a genre's books does not say which books they were.
+        bump_versions("genres")
@@ -0,0 +1,45 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql):
+    """Replace literals in a statement so repeated lookups compare equal."""
+    return LITERAL.sub("?", sql)
+
+
+def duplicated_statements(queries):
+    """Return (statement, count) pairs for statements issued more than once."""
+    counts = Counter(normalize_sql(query["sql"]) for query in queries)
+    return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+
+def format_report(queries, limit):
+    lines = [f"{len(queries)} queries executed, budget is {limit}."]
+    duplicates = duplicated_statements(queries)
+    if duplicates:
+        lines.append("Duplicated statements:")
+        lines.extend(f"  {count}x {sql}" for sql, count in duplicates)
+    lines.append("Queries:")
+    lines.extend(
+        f"  {number}. {query['sql']}" for number, query in enumerate(queries, 1)
+    )
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_budget(limit, using=DEFAULT_DB_ALIAS):
+    """Fail if the wrapped block runs more than `limit` queries.
+
+    Works as a context manager or a decorator. On failure the message lists
+    duplicated statements first, since they are usually an N+1 lookup.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context.captured_queries) > limit:
+        raise AssertionError(format_report(context.captured_queries, limit))
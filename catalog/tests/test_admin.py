@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from catalog.admin import BookAdmin, EstimatedCountPaginator
+from catalog.management.commands.seed_catalog import isbn13
+from catalog.models import Author, Book, BookInstance, CirculationEvent, Genre, Language
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="x")
+        cls.genres = [
+            Genre.objects.create(name=f"Genre{number}") for number in range(4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_books(self, number):
+        start = Book.objects.count()
+        for offset in range(number):
+            author = Author.objects.create(first_name="Ama", last_name=f"Ata{offset}")
+            book = Book.objects.create(
+                title=f"Book{start + offset}",
+                summary="Summary",
+                isbn=isbn13(start + offset),
+                author=author,
+            )
+            book.genre.set(self.genres)
+            BookInstance.objects.create(
+                book=book, imprint="Disney", status="o", borrower=self.admin
+            )
+
+    def count_queries(self, name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(f"admin:catalog_{name}_changelist"))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        for name in ("book", "bookinstance"):
+            with self.subTest(name=name):
+                self.add_books(2)
+                few = self.count_queries(name)
+                self.add_books(20)
+                self.assertEqual(self.count_queries(name), few)
+
+    def test_genres_show_the_first_three(self):
+        self.add_books(1)
+        response = self.client.get(reverse("admin:catalog_book_changelist"))
+        self.assertContains(response, "Genre0, Genre1, Genre2<")
+
+    def test_changelist_search_is_not_capped(self):
+        self.add_books(3)
+        with mock.patch.object(BookAdmin, "search_limit", 1):
+            response = self.client.get(
+                reverse("admin:catalog_book_changelist"), {"q": "Book"}
+            )
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+
+    def test_paginator_counts_exactly_outside_postgresql(self):
+        self.add_books(3)
+        paginator = EstimatedCountPaginator(Book.objects.all(), 100)
+        self.assertEqual(paginator.count, 3)
+
+
+class AdminChangeFormTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="x")
+        cls.author = Author.objects.create(first_name="Ama", last_name="Ata Aidoo")
+        cls.book = Book.objects.create(
+            title="Our Sister Killjoy",
+            summary="Summary",
+            isbn=isbn13(1),
+            author=cls.author,
+            language=Language.objects.create(name="English"),
+        )
+        cls.book.genre.add(Genre.objects.create(name="Fiction"))
+        BookInstance.objects.bulk_create(
+            BookInstance(book=cls.book, imprint="Longman", status="a")
+            for _ in range(30)
+        )
+        Book.objects.recount_availability()
+        User.objects.bulk_create(
+            User(username=f"patron{number:03d}") for number in range(50)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_book_form_does_not_list_every_row(self):
+        response = self.client.get(
+            reverse("admin:catalog_book_change", args=[self.book.pk])
+        )
+        self.assertEqual(
+            response.context["inline_admin_formsets"][0].formset.total_form_count(), 20
+        )
+        self.assertNotContains(response, "patron049")
+        self.assertContains(response, "View all 30 copies")
+
+    def test_author_form_links_to_its_books(self):
+        response = self.client.get(
+            reverse("admin:catalog_author_change", args=[self.author.pk])
+        )
+        self.assertContains(response, "View all 1 books")
+
+    def autocomplete(self, model_name, field_name, term):
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "app_label": "catalog",
+                "model_name": model_name,
+                "field_name": field_name,
+                "term": term,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return [result["text"] for result in response.json()["results"]]
+
+    def test_book_autocomplete_uses_full_text_search(self):
+        self.assertEqual(
+            self.autocomplete("bookinstance", "book", "killjoy"),
+            ["Our Sister Killjoy"],
+        )
+        self.assertEqual(
+            self.autocomplete("book", "author", "aidoo"), [str(self.author)]
+        )
+
+    def test_borrower_autocomplete_matches_username_prefix(self):
+        self.assertEqual(
+            self.autocomplete("bookinstance", "borrower", "patron04"),
+            [f"patron04{number}" for number in range(10)],
+        )
+        self.assertEqual(self.autocomplete("bookinstance", "borrower", "atron"), [])
+
+    def test_saving_the_book_keeps_copies_past_the_limit(self):
+        url = reverse("admin:catalog_book_change", args=[self.book.pk])
+        formset = self.client.get(url).context["inline_admin_formsets"][0].formset
+        data = {
+            "title": "Our Sister Killjoy",
+            "summary": "Summary",
+            "isbn": self.book.isbn,
+            "author": self.author.pk,
+            "language": self.book.language_id,
+            "genre": [genre.pk for genre in self.book.genre.all()],
+            f"{formset.prefix}-TOTAL_FORMS": 20,
+            f"{formset.prefix}-INITIAL_FORMS": 20,
+        }
+        for index, form in enumerate(formset.forms):
+            data.update(
+                {
+                    f"{formset.prefix}-{index}-id": form.instance.pk,
+                    f"{formset.prefix}-{index}-book": self.book.pk,
+                    f"{formset.prefix}-{index}-imprint": "Heinemann",
+                    f"{formset.prefix}-{index}-status": "a",
+                }
+            )
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BookInstance.objects.filter(imprint="Heinemann").count(), 20)
+        self.assertEqual(BookInstance.objects.count(), 30)
+
+
+class BookInstanceActionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="x")
+        book = Book.objects.create(title="Cell", summary="Phones", isbn=isbn13(1))
+        BookInstance.objects.bulk_create(
+            BookInstance(book=book, imprint="Disney", status="o", borrower=cls.admin)
+            for _ in range(25)
+        )
+
+    def test_select_all_marks_every_copy_returned(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("admin:catalog_bookinstance_changelist"),
+            {
+                "action": "mark_return",
+                "select_across": 1,
+                "index": 0,
+                "_selected_action": [
+                    str(BookInstance.objects.values_list("pk", flat=True)[0])
+                ],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 25)
+        self.assertEqual(CirculationEvent.objects.filter(user=self.admin).count(), 25)
@@ -0,0 +1,140 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.pagination import encode_cursor
+
+
+class CatalogAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        cls.language = Language.objects.create(name="English")
+        cls.genre = Genre.objects.create(name="Fiction")
+        cls.books = []
+        for number in range(3):
+            book = Book.objects.create(
+                title=f"Cell{number}",
+                summary="See ee el el, Cell",
+                isbn=f"978000000000{number}",
+                author=cls.author,
+                language=cls.language,
+            )
+            book.genre.add(cls.genre)
+            cls.books.append(book)
+        cls.borrower = User.objects.create_user(
+            username="testuser1", password="adamu1234"
+        )
+        cls.copy = BookInstance.objects.create(
+            book=cls.books[0], imprint="Disney", status="o", borrower=cls.borrower
+        )
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_lists_books_with_default_fields(self):
+        with self.assertNumQueries(2):
+            response = self.get("api-books")
+        self.assertEqual(response.status_code, 200)
+        first = response.json()["results"][0]
+        self.assertEqual(
+            first,
+            {
+                "id": self.books[0].id,
+                "title": "Cell0",
+                "isbn": "9780000000000",
+                "author": self.author.id,
+                "language": self.language.id,
+                "genre": [self.genre.id],
+                "copy_count": 1,
+                "available_count": 0,
+                "url": reverse("book-detail", args=[self.books[0].id]),
+            },
+        )
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(1):
+            response = self.get("api-books", fields="title")
+        self.assertEqual(
+            response.json()["results"][0], {"id": self.books[0].id, "title": "Cell0"}
+        )
+        response = self.get("api-books", fields="title,borrower")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Unknown fields: borrower."})
+
+    def test_embeds_cost_one_query_each(self):
+        with self.assertNumQueries(3):
+            response = self.get("api-books", embed="author,language,genre,copies")
+        book = response.json()["results"][0]
+        self.assertEqual(book["author"]["last_name"], "Obeng")
+        self.assertEqual(book["language"], {"id": self.language.id, "name": "English"})
+        self.assertEqual(book["genre"], [{"id": self.genre.id, "name": "Fiction"}])
+        self.assertEqual(book["copies"][0]["status"], "o")
+
+    def test_copies_do_not_expose_borrowers(self):
+        response = self.get("api-book-instance-detail", self.copy.id)
+        self.assertNotIn("borrower", response.json())
+        self.assertEqual(response.json()["book"], self.books[0].id)
+
+    def test_cursor_pagination(self):
+        response = self.get("api-books", limit=2)
+        page = response.json()
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIsNone(page["previous"])
+        page = self.client.get(page["next"]).json()
+        self.assertEqual([book["title"] for book in page["results"]], ["Cell2"])
+        self.assertIsNone(page["next"])
+        self.assertEqual(self.get("api-books", cursor="junk").status_code, 400)
+        self.assertEqual(self.get("api-books", limit=0).status_code, 400)
+
+    def test_tampered_cursor_is_rejected(self):
+        for values in (["Cell1", "not-an-id"], ["Cell1", {"id": 1}], [None, None]):
+            with self.subTest(values=values):
+                response = self.get("api-books", cursor=encode_cursor(values))
+                self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        response = self.get("api-author-detail", self.author.id, embed="books")
+        self.assertEqual(
+            [book["title"] for book in response.json()["books"]],
+            ["Cell0", "Cell1", "Cell2"],
+        )
+        self.assertEqual(self.get("api-genre-detail", 999).status_code, 404)
+
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_unchanged_resources_are_not_modified(self):
+        response = self.get("api-book-detail", self.books[0].id)
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("api-book-detail", args=[self.books[0].id]),
+                HTTP_IF_NONE_MATCH=etag,
+            )
+        self.assertEqual(response.status_code, 304)
+
+        # Returning the copy changes the book's availability, so its ETag.
+        self.copy.status = "a"
+        self.copy.save()
+        response = self.client.get(
+            reverse("api-book-detail", args=[self.books[0].id]),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["available_count"], 1)
+
+    def test_no_etag_without_a_shared_cache(self):
+        response = self.get("api-book-detail", self.books[0].id)
+        self.assertFalse(response.has_header("ETag"))
+
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_list_etag_follows_embedded_resources(self):
+        etag = self.get("api-books", embed="author")["ETag"]
+        self.assertNotEqual(self.get("api-books")["ETag"], etag)
+        self.author.first_name = "Ken"
+        self.author.save()
+        response = self.client.get(
+            reverse("api-books"), {"embed": "author"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["author"]["first_name"], "Ken")
@@ -0,0 +1,313 @@
+import datetime
+import json
+import uuid
+
+from django.contrib.auth.models import Permission, User
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import circulation
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    CirculationEvent,
+    Reservation,
+)
+
+
+class CirculationTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.borrower = User.objects.create_user(
+            username="testuser1", password="adamu1234"
+        )
+        author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        cls.book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="123sdf123asd7",
+            author=author,
+        )
+        cls.copies = [
+            BookInstance.objects.create(book=cls.book, imprint="Disney", status="a")
+            for _ in range(5)
+        ]
+
+    def ids(self, copies=None):
+        return [copy.id for copy in copies or self.copies]
+
+
+class CirculationServiceTest(CirculationTestMixin, TestCase):
+    def test_check_out_lends_every_copy(self):
+        due_back = datetime.date.today() + datetime.timedelta(weeks=1)
+        circulation.check_out(self.ids(), self.borrower, due_back)
+        self.assertEqual(
+            BookInstance.objects.filter(
+                status="o", borrower=self.borrower, due_back=due_back
+            ).count(),
+            5,
+        )
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 0)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 0)
+        self.assertEqual(self.book.on_loan_count, 5)
+        self.assertEqual(self.book.next_due_back, due_back)
+
+    def test_check_out_defaults_to_the_loan_period(self):
+        copies = circulation.check_out(self.ids(), self.borrower)
+        self.assertEqual(
+            copies[0].due_back, datetime.date.today() + circulation.LOAN_PERIOD
+        )
+
+    def test_check_out_uses_a_fixed_number_of_queries(self):
+        # One of them recounts the books' availability counters.
+        with self.assertNumQueries(7):
+            circulation.check_out(self.ids(), self.borrower)
+
+    def test_batch_with_an_unavailable_copy_changes_nothing(self):
+        BookInstance.objects.filter(pk=self.copies[2].pk).update(status="m")
+        with self.assertRaises(ValidationError) as raised:
+            circulation.check_out(self.ids(), self.borrower)
+        self.assertEqual(list(raised.exception.message_dict), [str(self.copies[2].id)])
+        self.assertFalse(BookInstance.objects.filter(status="o").exists())
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 5)
+
+    def test_unknown_copy_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            circulation.check_out([uuid.uuid4()], self.borrower)
+
+    def test_due_date_in_the_past_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            circulation.check_out(
+                self.ids(),
+                self.borrower,
+                datetime.date.today() - datetime.timedelta(days=1),
+            )
+
+    def test_check_in_returns_copies_to_the_shelf(self):
+        circulation.check_out(self.ids(), self.borrower)
+        circulation.check_in(self.ids(self.copies[:2]))
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 2)
+        self.assertFalse(
+            BookInstance.objects.filter(status="a", borrower__isnull=False).exists()
+        )
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 2)
+
+    def test_check_in_requires_copies_on_loan(self):
+        with self.assertRaises(ValidationError):
+            circulation.check_in(self.ids())
+
+    def test_renew_skips_copies_that_are_not_on_loan(self):
+        circulation.check_out(self.ids(self.copies[:3]), self.borrower)
+        due_back = datetime.date.today() + datetime.timedelta(weeks=4)
+        # The recount picks up the books' new next due date.
+        with self.assertNumQueries(6):
+            renewed, errors = circulation.renew(self.ids(), due_back)
+        self.assertEqual(len(renewed), 3)
+        self.assertEqual(set(errors), {str(copy.id) for copy in self.copies[3:]})
+        self.assertEqual(BookInstance.objects.filter(due_back=due_back).count(), 3)
+
+
+class CirculationViewTest(CirculationTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.librarian = User.objects.create_user(
+            username="librarian", password="1X<ISRUkw+tuK"
+        )
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename="can_mark_returned")
+        )
+
+    def post(self, payload):
+        return self.client.post(
+            reverse("circulation"), json.dumps(payload), content_type="application/json"
+        )
+
+    def test_requires_permission(self):
+        self.client.force_login(self.borrower)
+        response = self.post({"action": "check-in", "book_instances": []})
+        self.assertEqual(response.status_code, 403)
+
+    def test_only_accepts_post(self):
+        self.client.force_login(self.librarian)
+        self.assertEqual(self.client.get(reverse("circulation")).status_code, 405)
+
+    def test_check_out_and_check_in(self):
+        self.client.force_login(self.librarian)
+        ids = [str(copy_id) for copy_id in self.ids()]
+        response = self.post(
+            {"action": "check-out", "book_instances": ids, "borrower": self.borrower.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [copy["status"] for copy in response.json()["book_instances"]], ["o"] * 5
+        )
+        response = self.post({"action": "check-in", "book_instances": ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 5)
+
+    def test_invalid_batches_are_reported(self):
+        self.client.force_login(self.librarian)
+        response = self.post({"action": "check-in", "book_instances": ["not-a-uuid"]})
+        self.assertEqual(response.status_code, 400)
+        response = self.post(
+            {"action": "check-out", "book_instances": [str(self.copies[0].id)]}
+        )
+        self.assertEqual(response.json()["errors"], {"borrower": ["No such borrower."]})
+        response = self.post(
+            {"action": "check-in", "book_instances": [str(self.copies[0].id)]}
+        )
+        self.assertIn(str(self.copies[0].id), response.json()["errors"])
+
+
+class ReservationTest(CirculationTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.patrons = [
+            User.objects.create_user(username=f"patron{number}", password="adamu1234")
+            for number in range(3)
+        ]
+
+    def lend_every_copy(self):
+        circulation.check_out(self.ids(), self.borrower)
+
+    def test_hold_on_a_book_on_the_shelf_sets_a_copy_aside(self):
+        reservation = circulation.place_hold(self.book.pk, self.patrons[0])
+        self.assertEqual(reservation.status, Reservation.READY)
+        copy = BookInstance.objects.get(pk=reservation.book_instance_id)
+        self.assertEqual((copy.status, copy.borrower), ("r", self.patrons[0]))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_count, 1)
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 4)
+
+    def test_returned_copies_go_to_the_oldest_holds(self):
+        self.lend_every_copy()
+        for patron in self.patrons:
+            circulation.place_hold(self.book.pk, patron)
+        circulation.check_in(self.ids(self.copies[:2]))
+        ready = Reservation.objects.filter(status=Reservation.READY)
+        self.assertEqual(
+            [reservation.patron for reservation in ready], self.patrons[:2]
+        )
+        self.assertEqual(
+            set(ready.values_list("book_instance", flat=True)),
+            set(self.ids(self.copies[:2])),
+        )
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 0)
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 0)
+
+    def test_returns_without_holds_only_check_the_queue(self):
+        self.lend_every_copy()
+        # As many as lending, plus the query for books with waiting holds.
+        with self.assertNumQueries(8):
+            circulation.check_in(self.ids())
+
+    def test_one_active_hold_per_patron_and_book(self):
+        self.lend_every_copy()
+        circulation.place_hold(self.book.pk, self.patrons[0])
+        with self.assertRaises(ValidationError):
+            circulation.place_hold(self.book.pk, self.patrons[0])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_held_copy_is_only_lent_to_its_patron(self):
+        reservation = circulation.place_hold(self.book.pk, self.patrons[0])
+        copy_ids = [reservation.book_instance_id]
+        with self.assertRaises(ValidationError):
+            circulation.check_out(copy_ids, self.patrons[1])
+        circulation.check_out(copy_ids, self.patrons[0])
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.FULFILLED)
+
+    def test_cancelling_a_ready_hold_passes_the_copy_on(self):
+        self.lend_every_copy()
+        first = circulation.place_hold(self.book.pk, self.patrons[0])
+        second = circulation.place_hold(self.book.pk, self.patrons[1])
+        circulation.check_in(self.ids(self.copies[:1]))
+        circulation.cancel_hold(first.pk, patron=self.patrons[0])
+        second.refresh_from_db()
+        self.assertEqual(second.status, Reservation.READY)
+        self.assertEqual(second.book_instance_id, self.copies[0].id)
+        with self.assertRaises(ValidationError):
+            circulation.cancel_hold(first.pk, patron=self.patrons[0])
+
+    def test_expired_holds_return_the_copy_to_the_shelf(self):
+        reservation = circulation.place_hold(self.book.pk, self.patrons[0])
+        today = reservation.expires_on + datetime.timedelta(days=1)
+        self.assertEqual(circulation.expire_holds(today), 1)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.CANCELLED)
+        self.assertEqual(BookInstance.objects.filter(status="a").count(), 5)
+
+    def test_views(self):
+        self.client.force_login(self.patrons[0])
+        response = self.client.post(reverse("book-reserve", args=[self.book.pk]))
+        self.assertRedirects(response, reverse("my-reservations"))
+        response = self.client.get(reverse("my-reservations"))
+        self.assertContains(response, "Ready to collect")
+        reservation = response.context["reservation_list"][0]
+        self.client.post(reverse("reservation-cancel", args=[reservation.pk]))
+        response = self.client.get(reverse("my-reservations"))
+        self.assertContains(response, "You have no holds.")
+
+
+class BulkTransitionTest(CirculationTestMixin, TestCase):
+    def test_mark_returned_moves_loans_only_and_logs_them(self):
+        circulation.check_out(self.ids(self.copies[:3]), self.borrower)
+        moved = circulation.bulk_transition(
+            BookInstance.objects.all(), CirculationEvent.RETURNED, self.borrower
+        )
+        self.assertEqual(moved, 3)
+        self.assertFalse(BookInstance.objects.exclude(status="a").exists())
+        self.assertFalse(BookInstance.objects.filter(borrower__isnull=False).exists())
+        self.assertEqual(
+            set(CirculationEvent.objects.values_list("from_status", "to_status")),
+            {("o", "a")},
+        )
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 5)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 5)
+
+    def test_queries_do_not_grow_with_the_selection(self):
+        BookInstance.objects.bulk_create(
+            BookInstance(book=self.book, imprint="Disney", status="a")
+            for _ in range(50)
+        )
+        # Read, update, stats, recount, authors and audit, inside a savepoint.
+        with self.assertNumQueries(8):
+            moved = circulation.bulk_transition(
+                BookInstance.objects.all(), CirculationEvent.MAINTENANCE
+            )
+        self.assertEqual(moved, 55)
+        self.assertEqual(CirculationEvent.objects.count(), 55)
+
+    def test_copies_made_available_serve_waiting_holds(self):
+        circulation.check_out(self.ids(), self.borrower)
+        patron = User.objects.create_user(username="patron", password="adamu1234")
+        reservation = circulation.place_hold(self.book.pk, patron)
+        circulation.bulk_transition(
+            BookInstance.objects.filter(pk=self.copies[0].pk),
+            CirculationEvent.RETURNED,
+        )
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.book_instance_id, self.copies[0].id)
+        self.assertEqual(CirculationEvent.objects.get().to_status, "r")
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 0)
+
+    def test_extend_moves_due_dates(self):
+        due_back = datetime.date.today() + datetime.timedelta(days=2)
+        circulation.check_out(self.ids(self.copies[:2]), self.borrower, due_back)
+        extended = circulation.bulk_extend(BookInstance.objects.all(), 2)
+        self.assertEqual(extended, 2)
+        self.assertEqual(
+            set(
+                BookInstance.objects.filter(status="o").values_list(
+                    "due_back", flat=True
+                )
+            ),
+            {due_back + datetime.timedelta(weeks=2)},
+        )
@@ -0,0 +1,423 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from catalog import visits
+from catalog.management.commands.benchmark_templates import template_backend
+from catalog.management.commands.explain_catalog import sequential_scans
+from catalog.management.commands.seed_catalog import isbn13
+from catalog.management.commands.warm_templates import warm_templates
+from catalog.models import (
+    Author,
+    Book,
+    BookInstance,
+    CatalogStats,
+    Genre,
+    Language,
+    Reservation,
+)
+
+
+class RebuildCatalogStatsCommandTest(TestCase):
+    def test_rebuild_fixes_stale_counts(self):
+        Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        CatalogStats.objects.update(number_of_authors=7)
+        call_command("rebuild_catalog_stats", stdout=StringIO())
+        self.assertEqual(CatalogStats.load().number_of_authors, 1)
+
+
+class FlushVisitsCommandTest(TestCase):
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_flushes_pending_visits(self):
+        cache.clear()
+        visits.record_visit()
+        visits.record_visit()
+        stdout = StringIO()
+        call_command("flush_visits", stdout=stdout)
+        self.assertIn("Flushed 2 visits", stdout.getvalue())
+        self.assertEqual(CatalogStats.load().number_of_visits, 2)
+
+    def test_nothing_to_flush_without_a_shared_cache(self):
+        stdout = StringIO()
+        call_command("flush_visits", stdout=stdout)
+        self.assertIn("nothing to flush", stdout.getvalue())
+
+
+class RecountAvailabilityCommandTest(TestCase):
+    def test_recount_fixes_stale_counters(self):
+        author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        book = Book.objects.create(
+            title="Cell", summary="Phones", isbn=isbn13(1), author=author
+        )
+        BookInstance.objects.create(book=book, imprint="Disney", status="a")
+        Book.objects.update(copy_count=7, available_count=0)
+        stdout = StringIO()
+        call_command("recount_availability", batch_size=1, stdout=stdout)
+        book.refresh_from_db()
+        self.assertEqual((book.copy_count, book.available_count), (1, 1))
+        self.assertIn("1 were out of date", stdout.getvalue())
+
+
+class SeedCatalogCommandTest(TestCase):
+    def seed(self, **options):
+        call_command("seed_catalog", stdout=StringIO(), **options)
+
+    def test_creates_requested_rows(self):
+        self.seed(books=50, authors=5, patrons=3, batch_size=20)
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(Author.objects.count(), 5)
+        self.assertTrue(Genre.objects.exists())
+        self.assertTrue(Language.objects.exists())
+        self.assertTrue(BookInstance.objects.exists())
+        self.assertFalse(Book.objects.filter(genre=None).exists())
+
+    def test_updates_catalog_stats(self):
+        self.seed(books=20, batch_size=7)
+        stats = CatalogStats.load()
+        self.assertEqual(stats.number_of_books, 20)
+        self.assertEqual(stats.number_of_book_instances, BookInstance.objects.count())
+
+    def test_same_seed_gives_same_catalog(self):
+        self.seed(books=30, seed=7)
+        first = list(Book.objects.order_by("isbn").values_list("isbn", "title"))
+        Book.genre.through.objects.all().delete()
+        BookInstance.objects.all().delete()
+        Book.objects.all().delete()
+        self.seed(books=30, seed=7)
+        second = list(Book.objects.order_by("isbn").values_list("isbn", "title"))
+        self.assertEqual(first, second)
+
+
+class BenchmarkCatalogCommandTest(TestCase):
+    def setUp(self):
+        call_command("seed_catalog", books=5, stdout=StringIO())
+
+    def test_reports_every_catalog_url(self):
+        User.objects.create_superuser(username="librarian", password="x")
+        on_loan = BookInstance.objects.filter(status__exact="o").count()
+        stdout = StringIO()
+        call_command(
+            "benchmark_catalog",
+            iterations=3,
+            username="librarian",
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["errors"], [])
+        self.assertEqual(report["catalog"]["books"], 5)
+        self.assertIn("p99_ms", report["urls"]["book-detail"])
+        self.assertEqual(report["urls"]["book-detail"]["status_codes"], [200])
+        self.assertEqual(report["urls"]["isbn-lookup"]["status_codes"], [200])
+        for name in ("book-reserve", "reservation-cancel"):
+            self.assertEqual(report["urls"][name]["method"], "POST")
+            self.assertEqual(report["urls"][name]["status_codes"], [302])
+        self.assertEqual(report["urls"]["circulation"]["status_codes"], [200])
+        # The streamed export is read, so its queries are counted.
+        self.assertGreater(report["urls"]["export-catalog"]["queries_per_request"], 1)
+        # Every change a request made was undone.
+        self.assertEqual(
+            BookInstance.objects.filter(status__exact="o").count(), on_loan
+        )
+        self.assertFalse(
+            Reservation.objects.filter(status__in=Reservation.ACTIVE_STATUSES).exists()
+        )
+
+    def test_fails_on_error_responses(self):
+        User.objects.create_user(username="patron", password="x")
+        stdout = StringIO()
+        with self.assertRaisesMessage(CommandError, "borrowed [403]"):
+            call_command(
+                "benchmark_catalog",
+                iterations=1,
+                username="patron",
+                stdout=stdout,
+                stderr=StringIO(),
+            )
+        self.assertIn("borrowed", json.loads(stdout.getvalue())["errors"])
+
+
+class BenchmarkPoolCommandTest(TestCase):
+    def test_pool_caps_server_connections(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_pool",
+            requests=40,
+            concurrency=8,
+            max_connections=4,
+            pool_size=3,
+            connect_ms=1,
+            query_ms=0,
+            stdout=stdout,
+        )
+        report = json.loads(stdout.getvalue())
+        pooled = report["pooled"]
+        self.assertEqual(pooled["served"], 40)
+        self.assertLessEqual(pooled["peak_server_connections"], 3)
+        self.assertEqual(pooled["pool"]["acquired"], 40)
+        self.assertEqual(
+            report["unpooled"]["connections_opened"], report["unpooled"]["served"]
+        )
+
+
+class BenchmarkTemplatesCommandTest(TestCase):
+    def test_reports_both_loaders_for_each_template(self):
+        call_command("seed_catalog", books=5, stdout=StringIO())
+        stdout = StringIO()
+        call_command("benchmark_templates", iterations=2, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        for name in ("catalog/book_detail.html", "catalog/book_list.html"):
+            self.assertIn("p50_ms", report["templates"][name]["uncached"])
+            self.assertIn("p50_ms", report["templates"][name]["cached"])
+
+    def test_requires_books(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_templates", iterations=1, stdout=StringIO())
+
+
+class WarmTemplatesCommandTest(TestCase):
+    def test_compiles_project_templates_into_the_cached_loader(self):
+        backend = template_backend("warm", cached=True)
+        names = warm_templates(backend.engine)
+        self.assertIn("catalog/book_detail.html", names)
+        self.assertIn("registration/login.html", names)
+        self.assertNotIn("admin/base.html", names)
+        cached = backend.engine.template_loaders[0].get_template_cache
+        self.assertIn("catalog/base_generic.html", cached)
+
+    def test_skips_files_that_are_not_templates(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, content in [
+            ("page.html", b"{{ title }}"),
+            ("page.html~", b"{% if %}"),
+            ("logo.png", b"\x89PNG\r\n\x1a\n\xff"),
+        ]:
+            with open(os.path.join(directory.name, name), "wb") as output:
+                output.write(content)
+        templates = [dict(settings.TEMPLATES[0], DIRS=[directory.name])]
+        with self.settings(TEMPLATES=templates):
+            names = warm_templates(template_backend("warm", cached=True).engine)
+        self.assertIn("page.html", names)
+        self.assertNotIn("page.html~", names)
+        self.assertNotIn("logo.png", names)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("warm_templates", stdout=stdout)
+        self.assertIn("Compiled", stdout.getvalue())
+
+
+class ExportCatalogCommandTest(TestCase):
+    def setUp(self):
+        call_command("seed_catalog", books=12, stdout=StringIO())
+
+    def export(self, **options):
+        stdout = StringIO()
+        call_command("export_catalog", stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_json_lines_hold_books_and_copies(self):
+        rows = [json.loads(line) for line in self.export(chunk_size=5).splitlines()]
+        books = [row for row in rows if row["table"] == "books"]
+        copies = [row for row in rows if row["table"] == "book_instances"]
+        self.assertEqual(len(books), 12)
+        self.assertEqual(len(copies), BookInstance.objects.count())
+        book = Book.objects.get(pk=books[0]["id"])
+        self.assertEqual(books[0]["copy_count"], book.copy_count)
+        self.assertEqual(
+            books[0]["genres"], "; ".join(genre.name for genre in book.genre.all())
+        )
+
+    def test_csv_has_one_table(self):
+        lines = self.export(format="csv", tables=["book_instances"]).splitlines()
+        self.assertEqual(lines[0], "id,book_id,imprint,status,due_back,borrower")
+        self.assertEqual(len(lines), BookInstance.objects.count() + 1)
+        with self.assertRaises(CommandError):
+            self.export(format="csv", tables=["books", "book_instances"])
+
+    def test_queries_grow_with_chunks_not_rows(self):
+        # One query per table, plus a genre prefetch for each chunk of 5 books.
+        with self.assertNumQueries(5):
+            self.export(chunk_size=5)
+
+
+class ImportCatalogCommandTest(TestCase):
+    rows = [
+        {
+            "isbn": "978-0-00-000001-9",
+            "title": "Cell",
+            "author": "Obeng, Kenneth",
+            "language": "English",
+            "genres": "Fiction; Horror",
+            "copies": "2",
+        },
+        {
+            "isbn": "9780000000026",
+            "title": "Dust",
+            "author": "Ama Mensah",
+            "language": "Twi",
+            "genres": "Fiction",
+            "copies": "1",
+        },
+        {"isbn": "", "title": "No ISBN", "copies": "1"},
+        {
+            "isbn": "9780000000033",
+            "title": "Salt",
+            "author": "Obeng, Kenneth",
+            "language": "English",
+            "genres": "",
+            "copies": "0",
+        },
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "catalog.csv")
+        self.write_csv(self.rows)
+
+    def write_csv(self, rows, fieldnames=None):
+        with open(self.path, "w", newline="") as output:
+            writer = csv.DictWriter(output, fieldnames=fieldnames or list(self.rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def run_import(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_catalog", self.path, *args, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_books_with_deduplicated_names(self):
+        stdout, stderr = self.run_import(batch_size=2)
+        self.assertIn("rows/s", stdout)
+        self.assertIn("Row 3: bad ISBN", stderr)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Language.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+        book = Book.objects.get(isbn="9780000000019")
+        self.assertEqual(str(book.author), "Obeng, Kenneth")
+        self.assertEqual(book.genre.count(), 2)
+        self.assertEqual(book.bookinstance_set.count(), 2)
+        self.assertEqual(CatalogStats.load().number_of_books, 3)
+        self.assertFalse(os.path.exists(f"{self.path}.checkpoint"))
+
+    def test_reimport_updates_books_without_adding_copies(self):
+        self.run_import()
+        rows = [dict(self.rows[0], title="Cell (2nd edition)", genres="Mystery")]
+        self.write_csv(rows)
+        stdout, _ = self.run_import()
+        self.assertIn("0 new and 1 updated", stdout)
+        book = Book.objects.get(isbn="9780000000019")
+        self.assertEqual(book.title, "Cell (2nd edition)")
+        self.assertEqual(book.genre.count(), 3)
+        self.assertEqual(BookInstance.objects.count(), 3)
+
+    def test_blank_author_and_language_are_left_empty(self):
+        # An existing nameless language must not be picked up either.
+        Language.objects.create(name="")
+        row = {
+            "isbn": "9780000000019",
+            "title": "Cell",
+            "first_name": " ",
+            "last_name": "",
+            "language": "",
+            "copies": "1",
+        }
+        self.write_csv([row], fieldnames=list(row))
+        self.run_import()
+        book = Book.objects.get()
+        self.assertIsNone(book.author_id)
+        self.assertIsNone(book.language_id)
+        self.assertEqual(Author.objects.count(), 0)
+        self.assertEqual(Language.objects.count(), 1)
+
+    def test_malformed_json_records_are_skipped(self):
+        records = [
+            {"isbn": "9780000000019", "title": "Cell", "copies": {"status": "a"}},
+            {"isbn": "9780000000026", "title": "Dust", "copies": ["a"]},
+            {"isbn": "9780000000033", "title": "Salt", "copies": [{"status": ["a"]}]},
+            {"isbn": "9780000000040", "title": "Sand", "genres": 3},
+            {"isbn": "9780000000057", "title": "Rain", "copies": [{"status": "o"}]},
+        ]
+        self.path = self.path.replace(".csv", ".ndjson")
+        with open(self.path, "w") as output:
+            output.writelines(json.dumps(record) + "\n" for record in records)
+        _, stderr = self.run_import()
+        self.assertIn("Row 1: bad copy count", stderr)
+        self.assertIn("Row 2: bad copy 'a'", stderr)
+        self.assertIn("Row 3: bad copy status", stderr)
+        self.assertIn("Row 4: bad genres", stderr)
+        self.assertEqual(list(Book.objects.values_list("title", flat=True)), ["Rain"])
+
+    def test_resumes_after_the_last_committed_batch(self):
+        with open(f"{self.path}.checkpoint", "w") as checkpoint:
+            json.dump({"path": os.path.abspath(self.path), "rows": 2}, checkpoint)
+        stdout, _ = self.run_import()
+        self.assertIn("Resuming after row 2", stdout)
+        self.assertEqual(list(Book.objects.values_list("title", flat=True)), ["Salt"])
+        self.run_import(restart=True)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_round_trips_an_export(self):
+        call_command("seed_catalog", books=12, stdout=StringIO())
+        self.path = self.path.replace(".csv", ".ndjson")
+        call_command("export_catalog", output=self.path)
+        books = {
+            book.isbn: (book.title, str(book.author), book.copy_count)
+            for book in Book.objects.select_related("author")
+        }
+        BookInstance.objects.all().delete()
+        Book.objects.all().delete()
+        self.run_import(batch_size=5)
+        self.assertEqual(
+            {
+                book.isbn: (book.title, str(book.author), book.copy_count)
+                for book in Book.objects.select_related("author")
+            },
+            books,
+        )
+
+    def test_queries_grow_with_batches_not_rows(self):
+        rows = [
+            dict(self.rows[0], isbn=isbn13(number), title=f"Book {number}")
+            for number in range(20)
+        ]
+        self.write_csv(rows)
+        self.run_import(batch_size=10)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import(batch_size=10, restart=True)
+        self.write_csv(rows * 3)
+        with CaptureQueriesContext(connection) as more_queries:
+            self.run_import(batch_size=30, restart=True)
+        self.assertEqual(len(queries), len(more_queries))
+
+
+class ExplainCatalogCommandTest(TestCase):
+    def test_explains_every_list_view(self):
+        call_command("seed_catalog", books=20, stdout=StringIO())
+        stdout = StringIO()
+        call_command("explain_catalog", stdout=stdout)
+        output = stdout.getvalue()
+        for name in ("books", "authors", "my-borrowed", "borrowed"):
+            self.assertIn(f"{name} (first page)", output)
+            self.assertIn(f"{name} (cursor page)", output)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite plan format")
+    def test_flags_sqlite_table_scans(self):
+        plan = "5 0 0 SCAN catalog_book\n9 0 0 SCAN catalog_author USING INDEX x"
+        self.assertEqual(sequential_scans(plan), ["SCAN catalog_book"])
@@ -1,9 +1,11 @@
 import datetime
 
 from django.utils import timezone
+from django.forms import modelform_factory
 from django.test import TestCase
 
-from catalog.forms import RenewBookModelForm
+from catalog.forms import BookForm, RenewBookModelForm
+from catalog.models import Book
 
 
 class RenewBookModelFormTests(TestCase):
@@ -37,3 +39,43 @@ class RenewBookModelFormTests(TestCase):
         date = datetime.date.today() + datetime.timedelta(weeks=4)
         form = RenewBookModelForm({"due_back": date})
         self.assertTrue(form.is_valid())
+
+
+class BookFormTests(TestCase):
+    def data(self, isbn):
+        return {"title": "Cell", "summary": "See ee el el, Cell", "isbn": isbn}
+
+    def test_isbn_is_stored_as_isbn13(self):
+        form = BookForm(self.data("0-306-40615-2"))
+        form.is_valid()
+        self.assertNotIn("isbn", form.errors)
+        self.assertEqual(form.cleaned_data["isbn"], "9780306406157")
+
+    def test_isbn_with_bad_check_digit_is_rejected(self):
+        form = BookForm(self.data("978-0-306-40615-8"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("isbn", form.errors)
+
+    def test_model_forms_check_the_isbn(self):
+        # Forms built from the model, such as the author admin's book inline,
+        # get the field's checksum validator too.
+        BookIsbnForm = modelform_factory(Book, fields=["title", "summary", "isbn"])
+        form = BookIsbnForm(self.data("9780306406158"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("isbn", form.errors)
+        self.assertTrue(BookIsbnForm(self.data("9780306406157")).is_valid())
+
+    def test_model_forms_store_the_isbn13(self):
+        BookIsbnForm = modelform_factory(Book, fields=["title", "summary", "isbn"])
+        form = BookIsbnForm(self.data("0-306-40615-2"))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().isbn, "9780306406157")
+        form = BookIsbnForm(self.data("0306406152"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("isbn", form.errors)
+
+    def test_isbn_is_unique_once_normalized(self):
+        Book.objects.create(title="Cell", summary="Cell", isbn="9780306406157")
+        form = BookForm(self.data("0306406152"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("isbn", form.errors)
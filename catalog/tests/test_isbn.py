@@ -0,0 +1,22 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from catalog import isbn
+
+
+class ISBNTest(SimpleTestCase):
+    def test_normalizes_separators_and_check_character(self):
+        self.assertEqual(isbn.normalize(" 0-8044-2957-x "), "080442957X")
+        self.assertEqual(isbn.to_isbn13("978-0-306-40615-7"), "9780306406157")
+
+    def test_converts_isbn10(self):
+        self.assertEqual(isbn.to_isbn13("0-306-40615-2"), "9780306406157")
+        self.assertEqual(isbn.to_isbn13("080442957X"), "9780804429573")
+        self.assertEqual(isbn.to_isbn10("9780306406157"), "0306406152")
+        self.assertIsNone(isbn.to_isbn10("9791034304568"))
+
+    def test_rejects_bad_check_digits_and_shapes(self):
+        for value in ("9780306406158", "0306406153", "123sdf123asd7", "", "97803064"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValidationError):
+                    isbn.validate_isbn(value)
@@ -1,6 +1,6 @@
 from django.test import TestCase
 
-from catalog.models import Author, Book, Genre, Language, BookInstance
+from catalog.models import Author, Book, Genre, Language, BookInstance, CatalogStats
 
 import datetime
 
@@ -237,3 +237,144 @@ class LanguageModelTest(TestCase):
     def test_object_name_is_id_title_in_brackets(self):
         language = Language.objects.get(pk=1)
         self.assertEqual(str(language), "French")
+
+
+class CatalogStatsModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        cls.book = Book.objects.create(
+            title="Heart of Darkness",
+            author=author,
+            summary="Up the river.",
+            isbn="9780141441672",
+        )
+        cls.copy = BookInstance.objects.create(
+            book=cls.book, imprint="Penguin", status="a"
+        )
+        BookInstance.objects.create(book=cls.book, imprint="Penguin", status="o")
+
+    def test_counts_follow_saves(self):
+        stats = CatalogStats.load()
+        self.assertEqual(stats.number_of_books, 1)
+        self.assertEqual(stats.number_of_book_instances, 2)
+        self.assertEqual(stats.number_of_available_book_instances, 1)
+        self.assertEqual(stats.number_of_authors, 1)
+        self.assertEqual(stats.books_containing_of, 1)
+
+    def test_status_change_updates_available_count(self):
+        self.copy.status = "o"
+        self.copy.save()
+        self.assertEqual(CatalogStats.load().number_of_available_book_instances, 0)
+
+    def test_title_change_updates_of_count(self):
+        self.book.title = "Darkness"
+        self.book.save()
+        self.assertEqual(CatalogStats.load().books_containing_of, 0)
+
+    def test_delete_updates_counts(self):
+        self.copy.delete()
+        stats = CatalogStats.load()
+        self.assertEqual(stats.number_of_book_instances, 1)
+        self.assertEqual(stats.number_of_available_book_instances, 0)
+
+    def test_rebuild_matches_tables(self):
+        CatalogStats.objects.update(number_of_books=42)
+        self.assertEqual(CatalogStats.rebuild().number_of_books, 1)
+
+
+class BookAvailabilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(
+            title="Heart of Darkness", summary="Up the river.", isbn="9780141441672"
+        )
+        cls.other_book = Book.objects.create(
+            title="Nostromo", summary="Silver.", isbn="9780141441634"
+        )
+        cls.due_back = datetime.date.today() + datetime.timedelta(days=3)
+        cls.copy = BookInstance.objects.create(
+            book=cls.book, imprint="Penguin", status="a"
+        )
+        BookInstance.objects.create(
+            book=cls.book, imprint="Penguin", status="o", due_back=cls.due_back
+        )
+        BookInstance.objects.create(book=cls.book, imprint="Penguin", status="m")
+
+    def counters(self, book):
+        book.refresh_from_db()
+        return {field: getattr(book, field) for field in Book.AVAILABILITY_FIELDS}
+
+    def test_counters_follow_saves(self):
+        self.assertEqual(
+            self.counters(self.book),
+            {
+                "copy_count": 3,
+                "available_count": 1,
+                "on_loan_count": 1,
+                "reserved_count": 0,
+                "maintenance_count": 1,
+                "next_due_back": self.due_back,
+            },
+        )
+
+    def test_status_change_moves_the_copy_between_counters(self):
+        self.copy.status = "r"
+        self.copy.save()
+        counters = self.counters(self.book)
+        self.assertEqual(
+            (counters["available_count"], counters["reserved_count"]), (0, 1)
+        )
+
+    def test_moving_a_copy_recounts_both_books(self):
+        self.copy.book = self.other_book
+        self.copy.save()
+        self.assertEqual(self.counters(self.book)["copy_count"], 2)
+        self.assertEqual(self.counters(self.other_book)["available_count"], 1)
+
+    def test_delete_updates_counters(self):
+        self.copy.delete()
+        self.assertEqual(self.counters(self.book)["copy_count"], 2)
+
+    def test_saving_a_stale_book_keeps_the_counters(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        self.copy.delete()
+        stale.title = "Heart of Darkness and Other Tales"
+        stale.save()
+        self.assertEqual(self.counters(self.book)["copy_count"], 2)
+
+    def test_recount_matches_copies(self):
+        Book.objects.update(copy_count=42, next_due_back=None)
+        self.assertEqual(Book.objects.recount_availability(), 2)
+        self.assertEqual(self.counters(self.book)["copy_count"], 3)
+        self.assertEqual(self.counters(self.book)["next_due_back"], self.due_back)
+        self.assertEqual(self.counters(self.other_book)["copy_count"], 0)
+
+
+class OverdueQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title="Cell", summary="Phones", isbn="9780000000019")
+        cls.today = datetime.date(2026, 3, 10)
+        for days, status in ((-3, "o"), (0, "o"), (4, "o"), (-2, "r")):
+            BookInstance.objects.create(
+                book=book,
+                imprint="Disney",
+                status=status,
+                due_back=cls.today + datetime.timedelta(days=days),
+            )
+        BookInstance.objects.create(book=book, imprint="Disney", status="a")
+
+    def test_overdue_only_returns_late_loans(self):
+        overdue = BookInstance.objects.overdue(self.today)
+        self.assertEqual(
+            list(overdue.values_list("due_back", flat=True)),
+            [self.today - datetime.timedelta(days=3)],
+        )
+
+    def test_flag_matches_is_overdue(self):
+        copies = BookInstance.objects.with_overdue_flag()
+        with self.assertNumQueries(1):
+            flags = [(copy.is_overdue(), copy.due_back) for copy in copies]
+        for flag, due_back in flags:
+            self.assertEqual(flag, bool(due_back and due_back < datetime.date.today()))
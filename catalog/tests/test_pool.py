@@ -0,0 +1,104 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from bibliotheque.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.resets = 0
+
+    def reset(self):
+        if self.closed:
+            raise RuntimeError("connection already closed")
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.connections = []
+
+    def connect(self):
+        connection = FakeConnection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+    def pool(self, **options):
+        options.setdefault("size", 2)
+        options.setdefault("timeout", 0.05)
+        return ConnectionPool(
+            self.connect,
+            check=lambda connection: not connection.closed,
+            reset=FakeConnection.reset,
+            **options,
+        )
+
+    def test_reuses_released_connections(self):
+        pool = self.pool()
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(first.resets, 1)
+
+    def test_times_out_when_every_connection_is_lent(self):
+        pool = self.pool(size=1)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        stats = pool.stats()
+        self.assertEqual((stats["timeouts"], stats["in_use"]), (1, 1))
+
+    def test_waiter_gets_the_released_connection(self):
+        pool = self.pool(size=1, timeout=5)
+        lent = pool.acquire()
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+        waiter.start()
+        while not pool._waiters:
+            time.sleep(0.001)
+        pool.release(lent)
+        waiter.join()
+        self.assertEqual(borrowed, [lent])
+        stats = pool.stats()
+        self.assertEqual((stats["waited"], stats["in_use"]), (1, 1))
+        self.assertGreater(stats["wait_ms_max"], 0)
+
+    def test_replaces_broken_connections(self):
+        pool = self.pool(size=1)
+        first = pool.acquire()
+        pool.release(first)
+        first.close()
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        # A connection that cannot be reset is dropped, freeing its slot.
+        second.closed = True
+        pool.release(second)
+        self.assertEqual(pool.stats()["opened"], 0)
+        self.assertEqual(pool.stats()["discarded"], 2)
+        self.assertFalse(pool.acquire().closed)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(self.fail, size=1, timeout=0.05)
+        with self.assertRaises(ConnectionError):
+            pool.acquire()
+        self.assertEqual(pool.stats()["opened"], 0)
+
+    def fail(self):
+        raise ConnectionError("server is down")
+
+    def test_close_closes_idle_connections(self):
+        pool = self.pool()
+        lent, idle = pool.acquire(), pool.acquire()
+        pool.release(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        self.assertFalse(lent.closed)
+        self.assertEqual(pool.stats()["opened"], 1)
@@ -0,0 +1,228 @@
+import datetime
+import math
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import export
+from catalog.management.commands.seed_catalog import isbn13
+from catalog.models import Author, Book, BookInstance, Genre, Language, Reservation
+from catalog.tests.query_budget import duplicated_statements, query_budget
+from catalog.urls import urlpatterns
+from catalog.views import ISBN_LOOKUPS
+
+# Maximum queries per request for every named catalog URL, for a logged in
+# librarian (session and user lookups included). The budget must not depend on
+# the size of the catalog, so the same numbers apply to each size.
+QUERY_BUDGETS = {
+    # Tests run on LocMemCache, so sessions are read from the database.
+    "index": 3,
+    "search": 6,
+    "books": 3,
+    # Detail pages first read the newest updated_at to answer conditional GETs.
+    "book-detail": 6,
+    "authors": 3,
+    "author-detail": 5,
+    "my-borrowed": 3,
+    "borrowed": 5,
+    "overdue": 5,
+    "renew-book-librarian": 5,
+    "author-create": 4,
+    "author-update": 5,
+    "author-delete": 5,
+    "book-create": 7,
+    "book-update": 9,
+    "book-delete": 6,
+    "circulation": 12,
+    # Measured repeating a hold, and cancelling one that is already cancelled.
+    "book-reserve": 11,
+    "my-reservations": 3,
+    "reservation-cancel": 6,
+    "isbn-lookup": 1,
+    # The API needs no session; books also prefetch their genre ids.
+    "api-books": 2,
+    "api-book-detail": 2,
+    "api-authors": 1,
+    "api-author-detail": 1,
+    "api-book-instances": 1,
+    "api-book-instance-detail": 1,
+    "api-genres": 1,
+    "api-genre-detail": 1,
+    "api-languages": 1,
+    "api-language-detail": 1,
+    # The export reads genres once per chunk of books, by design.
+    "export-catalog": lambda books: 4 + math.ceil(books / export.CHUNK_SIZE),
+}
+
+# Views whose repeated statements are one per chunk of rows, not one per row.
+CHUNKED = {"export-catalog"}
+
+# Views that only accept POST: circulation is measured checking out one copy,
+# holds are placed on and cancelled for the librarian.
+POST_ONLY = {"circulation", "book-reserve", "reservation-cancel"}
+
+# Views that answer with a redirect.
+REDIRECTS = {"book-reserve", "reservation-cancel"}
+
+
+def seed_catalog(number_of_books, borrower):
+    """Bulk create a catalog with two copies per book, one of them on loan."""
+    language = Language.objects.create(name="English")
+    genre = Genre.objects.create(name="Adventure")
+    authors = Author.objects.bulk_create(
+        Author(first_name=f"Author{number}", last_name=f"Green{number}")
+        for number in range(max(number_of_books // 10, 1))
+    )
+    books = Book.objects.bulk_create(
+        Book(
+            title=f"Book{number}",
+            summary="See ee el el, Cell",
+            isbn=isbn13(number),
+            author=authors[number % len(authors)],
+            language=language,
+        )
+        for number in range(number_of_books)
+    )
+    Book.genre.through.objects.bulk_create(
+        Book.genre.through(book_id=book.id, genre_id=genre.id) for book in books
+    )
+    due_back = datetime.date.today() + datetime.timedelta(weeks=1)
+    BookInstance.objects.bulk_create(
+        (
+            BookInstance(book=book, imprint="Disney", status=status, due_back=due_back)
+            if status == "a"
+            else BookInstance(
+                book=book,
+                imprint="Disney",
+                status=status,
+                due_back=due_back,
+                borrower=borrower,
+            )
+        )
+        for book in books
+        for status in ("a", "o")
+    )
+    Book.objects.recount_availability()
+
+
+class QueryBudgetMixin:
+    """Request every catalog URL and check it stays inside its query budget."""
+
+    number_of_books = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(
+            username="librarian", password="adamu1234", is_staff=True
+        )
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename="can_mark_returned"),
+            Permission.objects.get(codename="can_add_book"),
+        )
+        seed_catalog(cls.number_of_books, cls.librarian)
+        cls.book = Book.objects.first()
+        cls.author = Author.objects.first()
+        cls.book_instance = BookInstance.objects.filter(status__exact="o").first()
+        cls.reservation = Reservation.objects.create(
+            book=Book.objects.last(), patron=cls.librarian
+        )
+
+    def setUp(self):
+        ISBN_LOOKUPS.clear()
+        self.client.force_login(self.librarian)
+        self.available_copies = list(
+            BookInstance.objects.filter(status__exact="a").values_list("pk", flat=True)
+        )
+
+    def request(self, name, url):
+        if name not in POST_ONLY:
+            response = self.client.get(url)
+            if response.streaming:
+                # Streamed rows are only read from the database as they are sent.
+                b"".join(response.streaming_content)
+            return response
+        if name in REDIRECTS:
+            return self.client.post(url)
+        payload = {
+            "action": "check-out",
+            "book_instances": [str(self.available_copies.pop())],
+            "borrower": self.librarian.pk,
+        }
+        return self.client.post(url, payload, content_type="application/json")
+
+    def url_for(self, name):
+        if name in ("book-detail", "book-update", "book-delete", "api-book-detail"):
+            return reverse(name, args=[self.book.id])
+        if name in (
+            "author-detail",
+            "author-update",
+            "author-delete",
+            "api-author-detail",
+        ):
+            return reverse(name, args=[self.author.id])
+        if name == "book-reserve":
+            return reverse(name, args=[self.book.id])
+        if name == "reservation-cancel":
+            return reverse(name, args=[self.reservation.id])
+        if name in ("renew-book-librarian", "api-book-instance-detail"):
+            return reverse(name, args=[self.book_instance.id])
+        if name == "api-genre-detail":
+            return reverse(name, args=[Genre.objects.get().id])
+        if name == "api-language-detail":
+            return reverse(name, args=[Language.objects.get().id])
+        if name == "isbn-lookup":
+            return reverse(name, args=[self.book.isbn])
+        if name == "search":
+            return reverse(name) + "?q=Book"
+        return reverse(name)
+
+    def test_every_catalog_url_has_a_budget(self):
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_catalog_urls_stay_within_budget(self):
+        for name, limit in QUERY_BUDGETS.items():
+            if callable(limit):
+                limit = limit(self.number_of_books)
+            url = self.url_for(name)
+            # Prime the session and permission caches so every size measures
+            # the same steady-state request.
+            self.request(name, url)
+            with self.subTest(url=url):
+                with query_budget(limit) as context:
+                    response = self.request(name, url)
+                self.assertEqual(
+                    response.status_code, 302 if name in REDIRECTS else 200
+                )
+                if name not in CHUNKED:
+                    self.assertEqual(
+                        duplicated_statements(context.captured_queries), []
+                    )
+
+
+class QueryBudgetTenBooksTest(QueryBudgetMixin, TestCase):
+    number_of_books = 10
+
+
+class QueryBudgetHundredBooksTest(QueryBudgetMixin, TestCase):
+    number_of_books = 100
+
+
+class QueryBudgetThousandBooksTest(QueryBudgetMixin, TestCase):
+    number_of_books = 1000
+
+
+class QueryBudgetHarnessTest(TestCase):
+    def test_budget_exceeded_reports_duplicates(self):
+        with self.assertRaisesMessage(AssertionError, "Duplicated statements"):
+            with query_budget(1):
+                Author.objects.filter(pk=1).exists()
+                Author.objects.filter(pk=2).exists()
+
+    def test_budget_as_decorator(self):
+        @query_budget(1)
+        def count_authors():
+            return Author.objects.count()
+
+        self.assertEqual(count_authors(), 0)
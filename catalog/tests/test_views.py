@@ -1,13 +1,23 @@
 import datetime
+import json
+import time
 import uuid
 
 from django.utils import timezone
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils.http import http_date
 from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
 
-from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog import visits
+from catalog.models import Author, Book, BookInstance, CatalogStats, Genre, Language
+from catalog.views import ISBN_LOOKUPS
+from catalog.pagination import encode_cursor
 
 
 class IndexViewTest(TestCase):
@@ -27,6 +37,22 @@ class IndexViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "catalog/index.html")
 
+    def test_view_shows_catalog_counts(self):
+        test_author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        test_book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="123sdf123asd7",
+            author=test_author,
+        )
+        BookInstance.objects.create(book=test_book, imprint="Disney", status="a")
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.context["number_of_books"], 1)
+        self.assertEqual(response.context["number_of_book_instances"], 1)
+        self.assertEqual(response.context["number_of_available_book_instances"], 1)
+        self.assertEqual(response.context["number_of_authors"], 1)
+        self.assertEqual(response.context["books_containing_of"], 0)
+
     def test_view_session_counts_number_of_visits(self):
         response = self.client.get(reverse("index"))
         self.assertEqual(response.status_code, 200)
@@ -37,6 +63,148 @@ class IndexViewTest(TestCase):
         response = self.client.get(reverse("index"))
         self.assertEqual(response.context["number_of_visits"], 3)
 
+    def test_visits_do_not_create_sessions(self):
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_visits_are_batched_in_process_without_a_shared_cache(self):
+        visits.local_batch.take()
+        CatalogStats.load()
+        # Anonymous browsing only reads the stats row.
+        with self.assertNumQueries(1):
+            self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+        self.assertEqual(CatalogStats.load().number_of_visits, 0)
+        self.assertEqual(visits.flush_visits(), 2)
+        self.assertEqual(CatalogStats.load().number_of_visits, 2)
+        for _ in range(visits.FLUSH_EVERY):
+            visits.record_visit()
+        self.assertEqual(CatalogStats.load().number_of_visits, visits.FLUSH_EVERY + 2)
+
+    def test_visits_survive_a_missing_stats_row(self):
+        visits.local_batch.take()
+        CatalogStats.objects.all().delete()
+        visits.record_visit()
+        self.assertEqual(visits.flush_visits(), 1)
+        self.assertEqual(CatalogStats.load().number_of_visits, 1)
+
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_visits_are_flushed_in_batches(self):
+        cache.clear()
+        for _ in range(visits.FLUSH_EVERY - 1):
+            visits.record_visit()
+        self.assertEqual(CatalogStats.load().number_of_visits, 0)
+        self.client.get(reverse("index"))
+        self.assertEqual(CatalogStats.load().number_of_visits, visits.FLUSH_EVERY)
+        visits.record_visit()
+        self.assertEqual(visits.flush_visits(), 1)
+        self.assertEqual(visits.flush_visits(), 0)
+        self.assertEqual(CatalogStats.load().number_of_visits, visits.FLUSH_EVERY + 1)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        achebe = Author.objects.create(first_name="Chinua", last_name="Achebe")
+        conrad = Author.objects.create(first_name="Joseph", last_name="Conrad")
+        cls.falling = Book.objects.create(
+            title="Things Fall Apart",
+            summary="Okonkwo and the village of Umuofia.",
+            isbn="9780385474542",
+            author=achebe,
+        )
+        cls.darkness = Book.objects.create(
+            title="Heart of Darkness",
+            summary="A journey up the Congo river.",
+            isbn="9780141441672",
+            author=conrad,
+        )
+        cls.arrow = Book.objects.create(
+            title="Arrow of God",
+            summary="A chief priest in a changing village.",
+            isbn="9780385014809",
+            author=achebe,
+        )
+
+    def search(self, query, **params):
+        return self.client.get(reverse("search"), {"q": query, **params})
+
+    def test_view_url_exists_at_desired_location(self):
+        response = self.client.get("/catalog/search/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "catalog/search.html")
+
+    def test_matches_title(self):
+        response = self.search("darkness")
+        self.assertEqual(response.context["book_list"], [self.darkness])
+
+    def test_matches_word_prefix(self):
+        response = self.search("dark")
+        self.assertEqual(response.context["book_list"], [self.darkness])
+
+    def test_matches_summary(self):
+        response = self.search("village")
+        self.assertCountEqual(response.context["book_list"], [self.falling, self.arrow])
+
+    def test_title_match_ranks_before_summary_match(self):
+        Book.objects.create(
+            title="The Village",
+            summary="Nothing much happens.",
+            isbn="9780000000002",
+        )
+        response = self.search("village")
+        self.assertEqual(response.context["book_list"][0].title, "The Village")
+
+    def test_matches_hyphenated_isbn(self):
+        response = self.search("978-0-14-144167-2")
+        self.assertEqual(response.context["book_list"], [self.darkness])
+
+    def test_matches_author_name(self):
+        response = self.search("achebe")
+        self.assertCountEqual(response.context["book_list"], [self.falling, self.arrow])
+        self.assertEqual(
+            [author.last_name for author in response.context["author_list"]],
+            ["Achebe"],
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.darkness.title = "Lord Jim"
+        self.darkness.save()
+        self.assertEqual(self.search("darkness").context["book_list"], [])
+        self.assertEqual(self.search("jim").context["book_list"], [self.darkness])
+        self.darkness.delete()
+        self.assertEqual(self.search("jim").context["book_list"], [])
+
+    def test_search_operators_are_treated_as_text(self):
+        response = self.search('"fall*" (')
+        self.assertEqual(response.context["book_list"], [self.falling])
+
+    def test_pagination(self):
+        response = self.search("a", page=1)
+        self.assertFalse(response.context["has_previous"])
+        for number in range(12):
+            Book.objects.create(
+                title=f"Village tale {number}",
+                summary="Told again.",
+                isbn=f"97800000001{number:02d}",
+            )
+        response = self.search("village")
+        self.assertEqual(len(response.context["book_list"]), 10)
+        self.assertTrue(response.context["has_next"])
+        response = self.search("village", page=2)
+        self.assertEqual(len(response.context["book_list"]), 4)
+        self.assertFalse(response.context["has_next"])
+
+    @override_settings(CATALOG_SEARCH_BACKEND="catalog.search.DatabaseSearchBackend")
+    def test_fallback_backend(self):
+        response = self.search("darkness")
+        self.assertEqual(response.context["book_list"], [self.darkness])
+
+    def test_empty_query_returns_nothing(self):
+        response = self.search("")
+        self.assertEqual(response.context["book_list"], [])
+
 
 class BookListViewTest(TestCase):
     @classmethod
@@ -85,6 +253,61 @@ class BookListViewTest(TestCase):
         self.assertTrue(response.context["is_paginated"] == True)
         self.assertEqual(len(response.context["book_list"]), 5)
 
+    def test_copy_counts_are_annotated(self):
+        book = Book.objects.get(title="Cell0")
+        BookInstance.objects.create(book=book, imprint="Disney", status="a")
+        response = self.client.get(reverse("books"))
+        counts = {book.title: book.copy_count for book in response.context["book_list"]}
+        self.assertEqual(counts["Cell0"], 1)
+        self.assertEqual(counts["Cell1"], 0)
+
+    def test_number_of_queries_does_not_grow_with_page_size(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse("books"))
+
+    def test_cursors_walk_every_book_in_order(self):
+        titles = []
+        url = reverse("books")
+        while url:
+            response = self.client.get(url)
+            titles.extend(book.title for book in response.context["book_list"])
+            page = response.context["page_obj"]
+            url = page.has_next() and f"{reverse('books')}?cursor={page.next_cursor}"
+        self.assertEqual(titles, sorted(f"Cell{book}" for book in range(15)))
+
+    def test_previous_cursor_returns_first_page(self):
+        response = self.client.get(reverse("books"))
+        first_page = list(response.context["book_list"])
+        next_cursor = response.context["page_obj"].next_cursor
+        response = self.client.get(reverse("books"), {"cursor": next_cursor})
+        previous_cursor = response.context["page_obj"].previous_cursor
+        response = self.client.get(reverse("books"), {"cursor": previous_cursor})
+        self.assertEqual(list(response.context["book_list"]), first_page)
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_duplicate_titles_are_not_skipped(self):
+        author = Author.objects.get()
+        for number in range(10):
+            Book.objects.create(
+                title="Cell0", summary="Again", isbn=f"dup{number}", author=author
+            )
+        ids = []
+        url = reverse("books")
+        while url:
+            response = self.client.get(url)
+            ids.extend(book.id for book in response.context["book_list"])
+            page = response.context["page_obj"]
+            url = page.has_next() and f"{reverse('books')}?cursor={page.next_cursor}"
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("books"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+        bad_values = encode_cursor(["Cell1", "not-an-id"])
+        response = self.client.get(reverse("books"), {"cursor": bad_values})
+        self.assertEqual(response.status_code, 404)
+
 
 class BookDetailViewTest(TestCase):
     def setUp(self):
@@ -131,6 +354,18 @@ class BookDetailViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "catalog/book_detail.html")
 
+    def test_availability_is_annotated(self):
+        response = self.client.get(
+            reverse("book-detail", kwargs={"pk": self.test_book.id})
+        )
+        self.assertEqual(response.context["book"].copy_count, 30)
+        self.assertEqual(response.context["book"].available_count, 0)
+
+    def test_number_of_queries_does_not_grow_with_copies(self):
+        # One query for the ETag, the book, its genres and its copies.
+        with self.assertNumQueries(4):
+            self.client.get(reverse("book-detail", kwargs={"pk": self.test_book.id}))
+
 
 class AuthorListViewTests(TestCase):
     @classmethod
@@ -194,6 +429,283 @@ class AuthorDetailViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "catalog/author_detail.html")
 
+    def test_number_of_queries_does_not_grow_with_books(self):
+        for number in range(5):
+            Book.objects.create(
+                title=f"Cell{number}",
+                summary="See ee el el, Cell",
+                isbn=f"123sdf123asd{number}",
+                author=self.test_author,
+            )
+        # One query for the ETag, the author and their books.
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("author-detail", kwargs={"pk": self.test_author.id})
+            )
+        self.assertEqual(len(response.context["book_list"]), 5)
+
+
+@override_settings(CATALOG_PAGE_CACHE_SECONDS=300)
+class CachedPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        self.genre = Genre.objects.create(name="Adventure")
+        self.book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="123sdf123asd7",
+            author=self.author,
+        )
+        self.urls = {
+            "books": reverse("books"),
+            "book-detail": reverse("book-detail", kwargs={"pk": self.book.pk}),
+            "authors": reverse("authors"),
+            "author-detail": reverse("author-detail", kwargs={"pk": self.author.pk}),
+        }
+
+    def assertCached(self, url):
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                self.assertCached(url)
+
+    def test_cache_is_disabled_by_default(self):
+        with self.settings(CATALOG_PAGE_CACHE_SECONDS=0):
+            self.client.get(self.urls["books"])
+            response = self.client.get(self.urls["books"])
+        self.assertTemplateUsed(response, "catalog/book_list.html")
+
+    def test_saving_a_book_expires_its_pages(self):
+        for name in ("books", "book-detail", "author-detail"):
+            self.assertCached(self.urls[name])
+        self.book.title = "Cellar"
+        self.book.save()
+        for name in ("books", "book-detail", "author-detail"):
+            with self.subTest(name):
+                self.assertContains(self.client.get(self.urls[name]), "Cellar")
+
+    def test_adding_a_copy_expires_copy_counts(self):
+        self.assertCached(self.urls["books"])
+        self.assertCached(self.urls["author-detail"])
+        BookInstance.objects.create(book=self.book, imprint="Disney", status="a")
+        self.assertContains(self.client.get(self.urls["books"]), "1 copies in total")
+        self.assertEqual(
+            self.client.get(self.urls["author-detail"])
+            .context["book_list"][0]
+            .copy_count,
+            1,
+        )
+
+    def test_renaming_an_author_expires_their_book_pages(self):
+        self.assertCached(self.urls["book-detail"])
+        self.assertCached(self.urls["authors"])
+        self.author.first_name = "Kwame"
+        self.author.save()
+        self.assertContains(self.client.get(self.urls["book-detail"]), "Kwame")
+        self.assertContains(self.client.get(self.urls["authors"]), "Kwame")
+
+    def test_deleting_an_author_expires_their_book_pages(self):
+        self.assertCached(self.urls["book-detail"])
+        self.author.delete()
+        self.assertNotContains(self.client.get(self.urls["book-detail"]), "Obeng")
+
+    def test_changing_genres_expires_the_book_page(self):
+        self.assertCached(self.urls["book-detail"])
+        self.book.genre.add(self.genre)
+        self.assertContains(self.client.get(self.urls["book-detail"]), "Adventure")
+        self.genre.name = "Mystery"
+        self.genre.save()
+        self.assertContains(self.client.get(self.urls["book-detail"]), "Mystery")
+        self.genre.book_set.clear()
+        self.assertNotContains(self.client.get(self.urls["book-detail"]), "Mystery")
+
+    def test_changing_a_language_expires_the_book_page(self):
+        language = Language.objects.create(name="English")
+        self.book.language = language
+        self.book.save()
+        self.assertCached(self.urls["book-detail"])
+        language.delete()
+        self.assertNotContains(self.client.get(self.urls["book-detail"]), "English")
+
+    def test_unrelated_pages_stay_cached(self):
+        other = Author.objects.create(first_name="Ama", last_name="Ata")
+        other_url = reverse("author-detail", kwargs={"pk": other.pk})
+        self.assertCached(other_url)
+        self.book.title = "Cellar"
+        self.book.save()
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_pages_of_a_list_are_cached_separately(self):
+        for number in range(12):
+            Book.objects.create(
+                title=f"Book {number:02}", summary="Summary", isbn=f"isbn{number}"
+            )
+        first = self.client.get(self.urls["books"])
+        cursor = first.context["page_obj"].next_cursor
+        second = self.client.get(self.urls["books"] + f"?cursor={cursor}")
+        self.assertNotEqual(first.content, second.content)
+        self.assertEqual(
+            self.assertCached(self.urls["books"] + f"?cursor={cursor}").content,
+            second.content,
+        )
+
+    def test_staff_and_anonymous_users_get_their_own_copies(self):
+        staff = User.objects.create_user(
+            username="librarian", password="1X<ISRUkw+tuK", is_staff=True
+        )
+        self.assertNotContains(self.assertCached(self.urls["books"]), "Add book")
+        self.client.force_login(staff)
+        self.assertContains(self.client.get(self.urls["books"]), "Add book")
+        self.client.logout()
+        self.assertNotContains(self.client.get(self.urls["books"]), "Add book")
+
+    def test_anonymous_pages_carry_no_csrf_token(self):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                self.assertNotContains(self.client.get(url), "csrfmiddlewaretoken")
+
+
+@override_settings(CATALOG_FRAGMENT_CACHE_SECONDS=300)
+class CachedFragmentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        self.books = [
+            Book.objects.create(
+                title=f"Cell{number}",
+                summary="See ee el el, Cell",
+                isbn=f"123sdf123asd{number}",
+                author=self.author,
+            )
+            for number in range(3)
+        ]
+        self.book = self.books[0]
+        BookInstance.objects.create(book=self.book, imprint="Disney", status="a")
+
+    def fragment_key(self, name, book):
+        response = self.client.get(reverse("books"))
+        versions = {b.pk: b.cache_version for b in response.context["book_list"]}
+        return make_template_fragment_key(name, [book.pk, versions[book.pk]])
+
+    def test_book_cards_are_cached(self):
+        self.client.get(reverse("books"))
+        for book in self.books:
+            self.assertIsNotNone(cache.get(self.fragment_key("book_list_card", book)))
+
+    def test_copies_section_is_cached(self):
+        url = reverse("book-detail", kwargs={"pk": self.book.pk})
+        self.client.get(url)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, "Disney")
+
+    def test_editing_a_book_replaces_only_its_own_cards(self):
+        other_key = self.fragment_key("book_list_card", self.books[1])
+        self.book.title = "Cellar"
+        self.book.save()
+        self.assertContains(self.client.get(reverse("books")), "Cellar")
+        self.assertEqual(other_key, self.fragment_key("book_list_card", self.books[1]))
+
+    def test_saving_a_copy_replaces_the_book_fragments(self):
+        detail_url = reverse("book-detail", kwargs={"pk": self.book.pk})
+        author_url = reverse("author-detail", kwargs={"pk": self.author.pk})
+        for url in (reverse("books"), detail_url, author_url):
+            self.client.get(url)
+        copy = BookInstance.objects.create(
+            book=self.book, imprint="Penguin", status="m"
+        )
+        self.assertContains(self.client.get(detail_url), "Penguin")
+        self.assertContains(self.client.get(author_url), "2 copies in total")
+        self.assertContains(self.client.get(reverse("books")), "2 copies in total")
+        copy.imprint = "Puffin"
+        copy.save()
+        self.assertContains(self.client.get(detail_url), "Puffin")
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        self.book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="123sdf123asd7",
+            author=self.author,
+        )
+        self.copy = BookInstance.objects.create(
+            book=self.book, imprint="Disney", status="a"
+        )
+        self.urls = [
+            reverse("book-detail", kwargs={"pk": self.book.pk}),
+            reverse("author-detail", kwargs={"pk": self.author.pk}),
+        ]
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertIn("no-cache", response["Cache-Control"])
+                self.assertNotModified(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_if_modified_since_is_not_answered(self):
+        # A deleted copy can leave every updated_at as it was.
+        response = self.client.get(self.urls[0])
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.copy.delete()
+        response = self.client.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_changed_copies_change_the_etag(self):
+        etags = [self.client.get(url)["ETag"] for url in self.urls]
+        self.copy.status = "o"
+        self.copy.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+        self.copy.delete()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_user(self):
+        etag = self.client.get(self.urls[0])["ETag"]
+        self.client.force_login(
+            User.objects.create_user(username="testuser1", password="adamu1234")
+        )
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CATALOG_PAGE_CACHE_SECONDS=300)
+    def test_cached_pages_keep_their_etag(self):
+        etag = self.client.get(self.urls[0])["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.urls[0])
+        self.assertEqual(response["ETag"], etag)
+
+    def test_missing_pages_have_no_etag(self):
+        response = self.client.get(reverse("book-detail", kwargs={"pk": 999}))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
+
 
 class LoanedBookInstanceByUserListViewTest(TestCase):
     def setUp(self):
@@ -367,6 +879,29 @@ class BorrowedListViewTest(TestCase):
         for book_item in response.context["bookinstance_list"]:
             self.assertEqual(book_item.status, "o")
 
+    def test_cursor_pages_with_missing_due_dates(self):
+        login = self.client.login(username="testuser2", password="adamu1234")
+        BookInstance.objects.update(status="o")
+        for book in BookInstance.objects.all()[:7]:
+            book.due_back = None
+            book.save()
+        seen = []
+        url = reverse("borrowed")
+        while url:
+            response = self.client.get(url)
+            seen.extend(response.context["bookinstance_list"])
+            page = response.context["page_obj"]
+            url = page.has_next() and f"{reverse('borrowed')}?cursor={page.next_cursor}"
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len({book.id for book in seen}), 30)
+        due_dates = [book.due_back for book in seen]
+        if connection.features.nulls_order_largest:
+            missing, known = due_dates[23:], due_dates[:23]
+        else:
+            missing, known = due_dates[:7], due_dates[7:]
+        self.assertEqual(missing, [None] * 7)
+        self.assertEqual(known, sorted(known))
+
     def test_pages_ordered_by_due_date(self):
         login = self.client.login(username="testuser2", password="adamu1234")
         books = BookInstance.objects.all()
@@ -387,6 +922,173 @@ class BorrowedListViewTest(TestCase):
                 self.assertTrue(last_date <= book.due_back)
                 last_date = book.due_back
 
+    def test_bulk_renew_selected_loans(self):
+        login = self.client.login(username="testuser2", password="adamu1234")
+        on_loan = list(BookInstance.objects.all()[:5])
+        BookInstance.objects.filter(pk__in=[book.pk for book in on_loan]).update(
+            status="o"
+        )
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        response = self.client.post(
+            reverse("borrowed"),
+            {
+                "due_back": due_back,
+                "book_instances": [str(book.pk) for book in on_loan],
+            },
+            follow=True,
+        )
+        self.assertRedirects(response, reverse("borrowed"))
+        self.assertEqual(BookInstance.objects.filter(due_back=due_back).count(), 5)
+        self.assertContains(response, "Renewed 5 loans")
+
+    def test_bulk_renew_reports_rows_that_fail(self):
+        login = self.client.login(username="testuser2", password="adamu1234")
+        on_loan, in_maintenance = BookInstance.objects.all()[:2]
+        on_loan.status = "o"
+        on_loan.save()
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        response = self.client.post(
+            reverse("borrowed"),
+            {
+                "due_back": due_back,
+                "book_instances": [str(on_loan.pk), str(in_maintenance.pk), "bad"],
+            },
+            follow=True,
+        )
+        on_loan.refresh_from_db()
+        self.assertEqual(on_loan.due_back, due_back)
+        self.assertContains(response, "Renewed 1 loans")
+        self.assertContains(response, f"Not renewed {in_maintenance.pk}")
+        self.assertContains(response, "Not renewed bad")
+
+    def test_bulk_renew_uses_the_renewal_date_rules(self):
+        login = self.client.login(username="testuser2", password="adamu1234")
+        copy = BookInstance.objects.first()
+        copy.status = "o"
+        copy.save()
+        for due_back, error in (
+            (
+                datetime.date.today() - datetime.timedelta(days=1),
+                "Invalid date - renewal date in the past",
+            ),
+            (
+                datetime.date.today() + datetime.timedelta(weeks=5),
+                "Invalid date - renewal date more than 4 weeks away.",
+            ),
+        ):
+            response = self.client.post(
+                reverse("borrowed"),
+                {"due_back": due_back, "book_instances": [str(copy.pk)]},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertFormError(response.context["renew_form"], "due_back", error)
+        copy.refresh_from_db()
+        self.assertNotEqual(copy.due_back, due_back)
+
+    def test_bulk_renew_requires_permission(self):
+        login = self.client.login(username="testuser1", password="adamu1234")
+        response = self.client.post(
+            reverse("borrowed"), {"due_back": datetime.date.today()}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class OverdueListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.borrower = User.objects.create_user(
+            username="testuser1", password="adamu1234"
+        )
+        cls.librarian = User.objects.create_user(
+            username="testuser2", password="adamu1234"
+        )
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename="can_mark_returned")
+        )
+        book = Book.objects.create(
+            title="Cell", summary="See ee el el, Cell", isbn="9780000000019"
+        )
+        today = datetime.date.today()
+        for days, status in ((-3, "o"), (-1, "o"), (2, "o"), (-5, "m")):
+            BookInstance.objects.create(
+                book=book,
+                imprint="Disney",
+                status=status,
+                due_back=today + datetime.timedelta(days=days),
+                borrower=cls.borrower,
+            )
+
+    def test_requires_permission(self):
+        self.client.force_login(self.borrower)
+        self.assertEqual(self.client.get(reverse("overdue")).status_code, 403)
+
+    def test_lists_only_overdue_loans_oldest_first(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse("overdue"))
+        self.assertTemplateUsed(response, "catalog/overdue_list.html")
+        due_dates = [copy.due_back for copy in response.context["bookinstance_list"]]
+        today = datetime.date.today()
+        self.assertEqual(
+            due_dates,
+            [today - datetime.timedelta(days=3), today - datetime.timedelta(days=1)],
+        )
+
+    def test_admin_filter(self):
+        self.client.force_login(
+            User.objects.create_superuser(username="admin", password="adamu1234")
+        )
+        url = reverse("admin:catalog_bookinstance_changelist")
+        response = self.client.get(url, {"overdue": "yes"})
+        self.assertEqual(response.context["cl"].result_count, 2)
+        response = self.client.get(url, {"overdue": "no"})
+        self.assertEqual(response.context["cl"].result_count, 2)
+
+
+class ExportCatalogViewTest(TestCase):
+    def setUp(self):
+        author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="123sdf123asd7",
+            author=author,
+        )
+        BookInstance.objects.create(book=book, imprint="Disney", status="a")
+        self.staff = User.objects.create_user(
+            username="librarian", password="1X<ISRUkw+tuK", is_staff=True
+        )
+
+    def test_requires_staff(self):
+        response = self.client.get(reverse("export-catalog"))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(
+            User.objects.create_user(username="testuser1", password="adamu1234")
+        )
+        response = self.client.get(reverse("export-catalog"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_streams_csv(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export-catalog"), {"format": "csv"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,title,isbn,author"))
+        self.assertIn('Cell,123sdf123asd7,"Obeng, Kenneth"', lines[1])
+
+    def test_streams_json_lines(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export-catalog"))
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["table"] for line in lines], ["books", "book_instances"]
+        )
+
+    def test_rejects_unknown_format(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export-catalog"), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
 
 class RenewBookInstancesViewTest(TestCase):
     def setUp(self):
@@ -698,6 +1400,70 @@ class AuthorDeleteViewTest(TestCase):
 
 
 #########################
+class ISBNLookupViewTest(TestCase):
+    def setUp(self):
+        ISBN_LOOKUPS.clear()
+        author = Author.objects.create(first_name="Kenneth", last_name="Obeng")
+        self.book = Book.objects.create(
+            title="Cell",
+            summary="See ee el el, Cell",
+            isbn="9780306406157",
+            author=author,
+        )
+        BookInstance.objects.create(book=self.book, imprint="Disney", status="a")
+        BookInstance.objects.create(book=self.book, imprint="Disney", status="m")
+
+    def lookup(self, isbn):
+        return self.client.get(reverse("isbn-lookup", args=[isbn]))
+
+    def test_finds_a_book_by_isbn10_or_isbn13(self):
+        for isbn in ("978-0-306-40615-7", "0306406152"):
+            with self.subTest(isbn=isbn):
+                response = self.lookup(isbn)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(data["isbn"], "9780306406157")
+                self.assertEqual(data["book"]["title"], "Cell")
+                self.assertEqual(data["book"]["author"], "Obeng, Kenneth")
+                self.assertEqual(data["book"]["copies"], 2)
+                self.assertEqual(data["book"]["available"], 1)
+                self.assertEqual(
+                    data["book"]["url"], reverse("book-detail", args=[self.book.pk])
+                )
+
+    def test_unknown_and_invalid_isbns(self):
+        response = self.lookup("9780804429573")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"isbn": "9780804429573", "found": False})
+        response = self.lookup("9780306406158")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("check digit", response.json()["error"])
+
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_repeat_lookups_skip_the_database_until_the_book_changes(self):
+        with self.assertNumQueries(1):
+            self.lookup("9780306406157")
+        with self.assertNumQueries(0):
+            self.lookup("9780306406157")
+        BookInstance.objects.filter(status="m").get().delete()
+        with self.assertNumQueries(1):
+            response = self.lookup("9780306406157")
+        self.assertEqual(response.json()["book"]["copies"], 1)
+
+    @override_settings(CATALOG_SHARED_CACHE=True)
+    def test_misses_expire_when_a_book_is_added(self):
+        self.assertEqual(self.lookup("9780804429573").status_code, 404)
+        Book.objects.create(title="Dust", summary="Dust", isbn="9780804429573")
+        self.assertEqual(self.lookup("9780804429573").status_code, 200)
+
+    def test_lookups_query_every_time_without_a_shared_cache(self):
+        with self.assertNumQueries(1):
+            self.lookup("9780804429573")
+        with self.assertNumQueries(1):
+            self.lookup("9780804429573")
+        self.assertIsNone(ISBN_LOOKUPS.get("9780804429573"))
+
+
 class BookCreateViewTest(TestCase):
     def setUp(self):
 
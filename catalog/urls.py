@@ -3,15 +3,76 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("search/", views.search, name="search"),
     path("books/", views.BookListView.as_view(), name="books"),
     path("books/<int:pk>", views.BookDetailView.as_view(), name="book-detail"),
     path("authors/", views.AuthorListView.as_view(), name="authors"),
     path("authors/<int:pk>", views.AuthorDetailView.as_view(), name="author-detail"),
     path("mybooks/", views.LoanedBooksByUserListView.as_view(), name="my-borrowed"),
     path("borrowed/", views.BorrowedListView.as_view(), name="borrowed"),
+    path("overdue/", views.OverdueListView.as_view(), name="overdue"),
+    path("books/<int:pk>/reserve", views.reserve_book, name="book-reserve"),
+    path(
+        "myreservations/",
+        views.ReservationListView.as_view(),
+        name="my-reservations",
+    ),
+    path(
+        "reservations/<int:pk>/cancel",
+        views.cancel_reservation,
+        name="reservation-cancel",
+    ),
     path(
         "book/<uuid:pk>/renew/", views.renew_book_labrarian, name="renew-book-librarian"
     ),
+    path("isbn/<str:isbn>", views.isbn_lookup, name="isbn-lookup"),
+    path("circulation/", views.circulate_books, name="circulation"),
+    path("export/", views.export_catalog, name="export-catalog"),
+    path("api/books/", views.api_list, {"resource": "books"}, name="api-books"),
+    path(
+        "api/books/<int:pk>",
+        views.api_detail,
+        {"resource": "books"},
+        name="api-book-detail",
+    ),
+    path("api/authors/", views.api_list, {"resource": "authors"}, name="api-authors"),
+    path(
+        "api/authors/<int:pk>",
+        views.api_detail,
+        {"resource": "authors"},
+        name="api-author-detail",
+    ),
+    path(
+        "api/bookinstances/",
+        views.api_list,
+        {"resource": "book-instances"},
+        name="api-book-instances",
+    ),
+    path(
+        "api/bookinstances/<uuid:pk>",
+        views.api_detail,
+        {"resource": "book-instances"},
+        name="api-book-instance-detail",
+    ),
+    path("api/genres/", views.api_list, {"resource": "genres"}, name="api-genres"),
+    path(
+        "api/genres/<int:pk>",
+        views.api_detail,
+        {"resource": "genres"},
+        name="api-genre-detail",
+    ),
+    path(
+        "api/languages/",
+        views.api_list,
+        {"resource": "languages"},
+        name="api-languages",
+    ),
+    path(
+        "api/languages/<int:pk>",
+        views.api_detail,
+        {"resource": "languages"},
+        name="api-language-detail",
+    ),
     path("author/create/", views.AuthorCreate.as_view(), name="author-create"),
     path("author/<int:pk>/update/", views.AuthorUpdate.as_view(), name="author-update"),
     path("author/<int:pk>/delete/", views.AuthorDelete.as_view(), name="author-delete"),
@@ -1,63 +1,173 @@
 import datetime
+import json
+import uuid
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
 from django.shortcuts import render, get_object_or_404
 from django.views import generic
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import HttpResponseRedirect
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.urls import reverse, reverse_lazy
 
 from django_countries.widgets import CountrySelectWidget
 
-from .models import Book, BookInstance, Author
-from .forms import RenewBookModelForm
+from . import circulation
+from .api import RESOURCES, InvalidQuery, page_size
+from .cache import (
+    CachedPageMixin,
+    ConditionalGetMixin,
+    FragmentCacheMixin,
+    VersionedLRUCache,
+    attach_versions,
+    author_version,
+    book_version,
+)
+from .export import TABLES, export_lines
+from .models import Book, BookInstance, Author, CatalogStats, Reservation
+from .isbn import InvalidISBN, to_isbn10, to_isbn13
+from .forms import BookForm, BulkRenewForm, RenewBookModelForm
+from .pagination import CursorPaginationMixin, CursorPaginator, InvalidCursor
+from .search import search_catalog
+from .visits import record_visit, remember_visits, visits_of
 
 
 def index(request):
     """Returns the counts of books, book instances and authors."""
-    number_of_books = Book.objects.all().count()
-    number_of_book_instances = BookInstance.objects.all().count()
-    number_of_available_book_instances = BookInstance.objects.filter(
-        status__exact="a"
-    ).count()
-    number_of_authors = Author.objects.all().count()
-    books_containing_of = Book.objects.filter(title__icontains="of").count()
-    number_of_visits = request.session.get("number_of_visits", 0)
-    request.session["number_of_visits"] = number_of_visits + 1
+    # Counted in a cookie and in batches, so browsing writes no session rows.
+    number_of_visits = visits_of(request)
+    record_visit()
+    stats = CatalogStats.load()
 
     context = {
-        "number_of_books": number_of_books,
-        "number_of_book_instances": number_of_book_instances,
-        "number_of_available_book_instances": number_of_available_book_instances,
-        "number_of_authors": number_of_authors,
-        "books_containing_of": books_containing_of,
+        "number_of_books": stats.number_of_books,
+        "number_of_book_instances": stats.number_of_book_instances,
+        "number_of_available_book_instances": stats.number_of_available_book_instances,
+        "number_of_authors": stats.number_of_authors,
+        "books_containing_of": stats.books_containing_of,
         "number_of_visits": number_of_visits,
     }
 
-    return render(request, "catalog/index.html", context)
+    response = render(request, "catalog/index.html", context)
+    remember_visits(response, number_of_visits + 1, secure=request.is_secure())
+    return response
 
 
-class BookListView(generic.ListView):
+def search(request):
+    """Returns books and authors ranked by how well they match the query."""
+    query = request.GET.get("q", "").strip()
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    book_list, has_next, author_list = search_catalog(query, page=page)
+
+    context = {
+        "query": query,
+        "book_list": book_list,
+        "author_list": author_list if page == 1 else [],
+        "page": page,
+        "has_previous": page > 1,
+        "has_next": has_next,
+    }
+
+    return render(request, "catalog/search.html", context)
+
+
+class BookListView(
+    CachedPageMixin, FragmentCacheMixin, CursorPaginationMixin, generic.ListView
+):
     model = Book
     paginate_by = 10
 
+    def get_cache_versions(self):
+        return ["books"]
+
+    def get_queryset(self):
+        return Book.objects.all()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_versions(context["book_list"], book_version)
+        return context
 
-class BookDetailView(generic.DetailView):
+
+class BookDetailView(
+    ConditionalGetMixin, CachedPageMixin, FragmentCacheMixin, generic.DetailView
+):
     model = Book
     paginate_by = 10
 
+    def get_cache_versions(self):
+        return [book_version(self.kwargs["pk"]), "genres", "languages"]
+
+    def get_page_state(self):
+        state = Book.objects.filter(pk=self.kwargs["pk"]).aggregate(
+            book=Max("updated_at"),
+            author=Max("author__updated_at"),
+            copies=Max("bookinstance__updated_at"),
+            copy_count=Count("bookinstance"),
+        )
+        return state if state["book"] else None
+
+    def get_queryset(self):
+        # Copies are loaded by the template, inside the fragment that caches them.
+        return Book.objects.select_related("author", "language").prefetch_related(
+            "genre"
+        )
+
+    def get_context_data(self, **kwargs):
+        attach_versions([self.object], book_version)
+        return super().get_context_data(**kwargs)
+
 
-class AuthorListView(generic.ListView):
+class AuthorListView(CachedPageMixin, CursorPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
 
+    def get_cache_versions(self):
+        return ["authors"]
 
-class AuthorDetailView(generic.DetailView):
+
+class AuthorDetailView(
+    ConditionalGetMixin, CachedPageMixin, FragmentCacheMixin, generic.DetailView
+):
     model = Author
 
+    def get_cache_versions(self):
+        return [author_version(self.kwargs["pk"])]
+
+    def get_page_state(self):
+        state = Author.objects.filter(pk=self.kwargs["pk"]).aggregate(
+            author=Max("updated_at"),
+            books=Max("book__updated_at"),
+            copies=Max("book__bookinstance__updated_at"),
+            book_count=Count("book", distinct=True),
+            copy_count=Count("book__bookinstance"),
+        )
+        return state if state["author"] else None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["book_list"] = attach_versions(self.object.book_set.all(), book_version)
+        return context
+
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(
+    LoginRequiredMixin, CursorPaginationMixin, generic.ListView
+):
     """View to display books loaded to user"""
 
     model = BookInstance
@@ -68,24 +178,138 @@ class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
         return (
             BookInstance.objects.filter(borrower=self.request.user)
             .filter(status__exact="o")
+            .with_overdue_flag()
+            .select_related("book")
             .order_by("due_back")
         )
 
 
-class BorrowedListView(PermissionRequiredMixin, generic.ListView):
+class ReservationListView(LoginRequiredMixin, CursorPaginationMixin, generic.ListView):
+    """The holds a patron is waiting on or can collect."""
+
+    model = Reservation
+    template_name = "catalog/reservation_list.html"
+    paginate_by = 10
+
+    def get_queryset(self):
+        return (
+            Reservation.objects.filter(
+                patron=self.request.user, status__in=Reservation.ACTIVE_STATUSES
+            )
+            .select_related("book")
+            .order_by("created_at", "id")
+        )
+
+
+@login_required
+@require_POST
+def reserve_book(request, pk):
+    book = get_object_or_404(Book.objects.only("id", "title"), pk=pk)
+    try:
+        reservation = circulation.place_hold(book.pk, request.user)
+    except ValidationError as error:
+        messages.error(request, " ".join(error.messages))
+    else:
+        if reservation.status == Reservation.READY:
+            messages.success(
+                request,
+                f"A copy of {book.title} is set aside for you until "
+                f"{reservation.expires_on:%B %d, %Y}.",
+            )
+        else:
+            messages.success(request, f"You are on the waiting list for {book.title}.")
+    return HttpResponseRedirect(reverse("my-reservations"))
+
+
+@login_required
+@require_POST
+def cancel_reservation(request, pk):
+    try:
+        circulation.cancel_hold(pk, patron=request.user)
+    except ValidationError as error:
+        messages.error(request, " ".join(error.messages))
+    else:
+        messages.success(request, "Your hold was cancelled.")
+    return HttpResponseRedirect(reverse("my-reservations"))
+
+
+class BorrowedListView(
+    PermissionRequiredMixin, CursorPaginationMixin, generic.ListView
+):
     permission_required = "catalog.can_mark_returned"
     model = BookInstance
     template_name = "catalog/all_borrowed_list.html"
     paginate_by = 10
 
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact="o").order_by("due_back")
+        return (
+            BookInstance.objects.filter(status__exact="o")
+            .with_overdue_flag()
+            .select_related("book")
+            .order_by("due_back")
+        )
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault(
+            "renew_form",
+            BulkRenewForm(
+                initial={
+                    "due_back": datetime.date.today() + datetime.timedelta(weeks=3)
+                }
+            ),
+        )
+        return super().get_context_data(**kwargs)
+
+    def post(self, request, *args, **kwargs):
+        """Renew every selected loan to one new due date, reporting rows that fail."""
+        form = BulkRenewForm(request.POST)
+        if not form.is_valid():
+            self.object_list = self.get_queryset()
+            return self.render_to_response(self.get_context_data(renew_form=form))
+
+        instance_ids, errors = [], {}
+        for value in request.POST.getlist("book_instances"):
+            try:
+                instance_ids.append(uuid.UUID(value))
+            except ValueError:
+                errors[value] = ["No copy with this id."]
+        due_back = form.cleaned_data["due_back"]
+        renewed, failures = circulation.renew(instance_ids, due_back)
+        errors.update(failures)
+
+        if renewed:
+            messages.success(
+                request, f"Renewed {len(renewed)} loans until {due_back:%B %d, %Y}."
+            )
+        for instance_id, problems in errors.items():
+            messages.error(request, f"Not renewed {instance_id}: {' '.join(problems)}")
+        if not instance_ids and not errors:
+            messages.warning(request, "Select the loans to renew.")
+        return HttpResponseRedirect(request.get_full_path())
+
+
+class OverdueListView(PermissionRequiredMixin, CursorPaginationMixin, generic.ListView):
+    """Loans past their due date, oldest first, read from the status index."""
+
+    permission_required = "catalog.can_mark_returned"
+    model = BookInstance
+    template_name = "catalog/overdue_list.html"
+    paginate_by = 20
+
+    def get_queryset(self):
+        return (
+            BookInstance.objects.overdue()
+            .select_related("book", "borrower")
+            .order_by("due_back")
+        )
 
 
 @login_required
 @permission_required("catalog.can_mark_returned", raise_exception=True)
 def renew_book_labrarian(request, pk):
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(
+        BookInstance.objects.select_related("book", "borrower"), pk=pk
+    )
 
     if request.method == "POST":
         form = RenewBookModelForm(request.POST)
@@ -104,6 +328,208 @@ def renew_book_labrarian(request, pk):
     return render(request, "catalog/book_renew_librarian.html", context)
 
 
+@login_required
+@permission_required("catalog.can_mark_returned", raise_exception=True)
+@require_POST
+def circulate_books(request):
+    """Check a cart of copies out to a borrower, or back in, as one batch.
+
+    Takes a JSON body such as {"action": "check-out", "book_instances":
+    [<uuid>, ...], "borrower": <user id>, "due_back": "YYYY-MM-DD"}; check-in
+    needs only the action and the copies.
+    """
+    try:
+        payload = json.loads(request.body)
+        action = payload["action"]
+        instance_ids = [uuid.UUID(str(value)) for value in payload["book_instances"]]
+        due_back = payload.get("due_back")
+        due_back = datetime.date.fromisoformat(due_back) if due_back else None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"errors": {"__all__": ["Malformed request."]}}, status=400)
+
+    try:
+        if action == "check-out":
+            borrower = User.objects.filter(pk=payload.get("borrower")).first()
+            if borrower is None:
+                raise ValidationError({"borrower": ["No such borrower."]})
+            copies = circulation.check_out(instance_ids, borrower, due_back)
+        elif action == "check-in":
+            copies = circulation.check_in(instance_ids)
+        else:
+            raise ValidationError({"action": ["Use check-out or check-in."]})
+    except ValidationError as error:
+        errors = (
+            error.message_dict
+            if hasattr(error, "error_dict")
+            else {"__all__": error.messages}
+        )
+        return JsonResponse({"errors": errors}, status=400)
+
+    return JsonResponse(
+        {
+            "action": action,
+            "book_instances": [
+                {
+                    "id": copy.id,
+                    "status": copy.status,
+                    "borrower": copy.borrower_id,
+                    "due_back": copy.due_back,
+                }
+                for copy in copies
+            ],
+        }
+    )
+
+
+ISBN_LOOKUPS = VersionedLRUCache(maxsize=2048)
+
+
+def find_isbn(isbn):
+    """The lookup payload for a normalised ISBN-13, read with one query."""
+    book = (
+        Book.objects.filter(isbn__in=[isbn, to_isbn10(isbn)])
+        .values(
+            "id",
+            "isbn",
+            "title",
+            "author__first_name",
+            "author__last_name",
+            "language__name",
+            "copy_count",
+            "available_count",
+            "next_due_back",
+        )
+        .first()
+    )
+    if book is None:
+        return None
+    return {
+        "id": book["id"],
+        "isbn": book["isbn"],
+        "title": book["title"],
+        "author": (
+            f"{book['author__last_name']}, {book['author__first_name']}"
+            if book["author__last_name"] is not None
+            else None
+        ),
+        "language": book["language__name"],
+        "url": reverse("book-detail", args=[book["id"]]),
+        "copies": book["copy_count"],
+        "available": book["available_count"],
+        "next_due_back": book["next_due_back"],
+    }
+
+
+@require_GET
+def isbn_lookup(request, isbn):
+    """Tell a barcode scanner whether the library holds an ISBN, as JSON.
+
+    Answers cost a single query on the unique ISBN index. With a shared cache
+    they come from an in-process LRU that expires with the book's cache
+    version; a per-process cache would never see other processes' writes.
+    """
+    try:
+        isbn = to_isbn13(isbn)
+    except InvalidISBN as error:
+        return JsonResponse({"isbn": isbn, "error": str(error)}, status=400)
+
+    if not getattr(settings, "CATALOG_SHARED_CACHE", False):
+        book = find_isbn(isbn)
+    else:
+        book = ISBN_LOOKUPS.get(isbn)
+        if book is None:
+            book = find_isbn(isbn) or {}
+            # A miss stays valid until any book is added; a hit until that
+            # book, its copies, its author or the language names change.
+            versions = [book_version(book["id"]), "languages"] if book else ["books"]
+            ISBN_LOOKUPS.set(isbn, book, versions)
+    if not book:
+        return JsonResponse({"isbn": isbn, "found": False}, status=404)
+    return JsonResponse({"isbn": isbn, "found": True, "book": book})
+
+
+def api_etag(request, resource, pk=None):
+    """ETag from the version tokens of the rows shown; needs no query.
+
+    Only sent with a shared cache: per-process tokens never see other
+    processes' writes, so their ETags could answer 304 for stale data.
+    """
+    if not getattr(settings, "CATALOG_SHARED_CACHE", False):
+        return None
+    try:
+        fields, _ = RESOURCES[resource].select(request.GET)
+    except InvalidQuery:
+        return None
+    return RESOURCES[resource].etag(request.get_full_path(), fields, pk)
+
+
+@require_GET
+@condition(etag_func=api_etag)
+def api_list(request, resource):
+    """A page of a catalog resource as JSON, with `fields`, `embed`, `limit` and `cursor`."""
+    resource = RESOURCES[resource]
+    try:
+        fields, embeds = resource.select(request.GET)
+        paginator = CursorPaginator(
+            resource.queryset(fields, embeds),
+            resource.ordering,
+            page_size(request.GET),
+        )
+        page = paginator.page(cursor=request.GET.get("cursor"))
+    except (InvalidQuery, InvalidCursor, ValidationError) as error:
+        return JsonResponse({"error": str(error) or "Invalid cursor."}, status=400)
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query["cursor"] = cursor
+        return f"{request.path}?{query.urlencode()}"
+
+    return JsonResponse(
+        {
+            "results": [resource.render(obj, fields, embeds) for obj in page],
+            "next": link(page.next_cursor),
+            "previous": link(page.previous_cursor),
+        }
+    )
+
+
+@require_GET
+@condition(etag_func=api_etag)
+def api_detail(request, resource, pk):
+    """One catalog resource as JSON, with `fields` and `embed`."""
+    resource = RESOURCES[resource]
+    try:
+        fields, embeds = resource.select(request.GET)
+    except InvalidQuery as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    obj = resource.queryset(fields, embeds).filter(pk=pk).first()
+    if obj is None:
+        return JsonResponse({"error": "Not found."}, status=404)
+    return JsonResponse(resource.render(obj, fields, embeds))
+
+
+@staff_member_required
+def export_catalog(request):
+    """Stream the catalog as a CSV (`?format=csv&table=books`) or JSON lines download."""
+    export_format = request.GET.get("format", "ndjson")
+    tables = request.GET.getlist("table") or (
+        ["books"] if export_format == "csv" else list(TABLES)
+    )
+    try:
+        lines = export_lines(export_format, tables)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    if export_format == "csv":
+        content_type, filename = "text/csv", f"catalog-{tables[0]}.csv"
+    else:
+        content_type, filename = "application/x-ndjson", "catalog.ndjson"
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
 class AuthorCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     permission_required = "catalog.can_mark_returned"
     model = Author
@@ -133,13 +559,13 @@ class AuthorDelete(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
 class BookCreate(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     permission_required = "catalog.can_add_book"
     model = Book
-    fields = "__all__"
+    form_class = BookForm
 
 
 class BookUpdate(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     permission_required = "catalog.can_add_book"
     model = Book
-    fields = "__all__"
+    form_class = BookForm
 
 
 class BookDelete(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
@@ -0,0 +1,134 @@
+"""Visit counting that keeps home page views off the database.
+
+Each visitor's own count travels in a signed cookie, so it needs neither a
+session row nor a cache entry. The site-wide total is written to
+`CatalogStats` in batches, so a burst of page views costs one UPDATE per
+batch rather than one per view:
+
+- With a cache shared by every process (`CATALOG_SHARED_CACHE`), visits are
+  added up in the cache and moved once `FLUSH_EVERY` are pending, or by
+  `manage.py flush_visits`.
+- Otherwise each process adds up its own visits and writes them once
+  `FLUSH_EVERY` are pending or `FLUSH_SECONDS` have passed. A process that
+  stops loses at most that many.
+"""
+
+import datetime
+import threading
+import time
+
+from django.conf import settings
+from django.core.signing import BadSignature
+
+from .cache import get_cache
+from .models import CatalogStats
+
+VISITS_COOKIE = "catalog_visits"
+VISITS_COOKIE_SALT = "catalog.visits"
+VISITS_COOKIE_MAX_AGE = datetime.timedelta(days=365)
+
+PENDING_KEY = "catalog:visits:pending"
+FLUSH_LOCK_KEY = "catalog:visits:flushing"
+FLUSH_EVERY = 100
+FLUSH_SECONDS = 60
+
+
+def visits_of(request):
+    """How many times this visitor has seen the page before."""
+    try:
+        return int(request.get_signed_cookie(VISITS_COOKIE, 0, salt=VISITS_COOKIE_SALT))
+    except (BadSignature, ValueError):
+        return 0
+
+
+def remember_visits(response, visits, secure=False):
+    response.set_signed_cookie(
+        VISITS_COOKIE,
+        str(visits),
+        salt=VISITS_COOKIE_SALT,
+        max_age=VISITS_COOKIE_MAX_AGE,
+        secure=secure,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+class LocalBatch:
+    """Visits counted by this process, for when the cache is not shared."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.flushed_at = time.monotonic()
+
+    def add(self):
+        """Count one visit; return the visits to write if the batch is due."""
+        with self.lock:
+            self.pending += 1
+            if (
+                self.pending < FLUSH_EVERY
+                and time.monotonic() - self.flushed_at < FLUSH_SECONDS
+            ):
+                return 0
+            return self._take()
+
+    def take(self):
+        with self.lock:
+            return self._take()
+
+    def _take(self):
+        pending, self.pending = self.pending, 0
+        self.flushed_at = time.monotonic()
+        return pending
+
+
+local_batch = LocalBatch()
+
+
+def batches_in_cache():
+    return getattr(settings, "CATALOG_SHARED_CACHE", False)
+
+
+def record_visit():
+    """Count one visit, writing the batch to `CatalogStats` when it is due."""
+    if not batches_in_cache():
+        CatalogStats.bump(number_of_visits=local_batch.add())
+        return
+    cache = get_cache()
+    cache.add(PENDING_KEY, 0, timeout=None)
+    try:
+        pending = cache.incr(PENDING_KEY)
+    except ValueError:
+        # Evicted between the add and the incr: start the batch again.
+        cache.set(PENDING_KEY, 1, timeout=None)
+        pending = 1
+    if pending >= FLUSH_EVERY:
+        flush_visits()
+
+
+def flush_visits():
+    """Move the pending visits into `CatalogStats`; return how many were moved.
+
+    Without a shared cache, only this process's own visits are moved.
+    """
+    if not batches_in_cache():
+        pending = local_batch.take()
+        CatalogStats.bump(number_of_visits=pending)
+        return pending
+    cache = get_cache()
+    # One flusher at a time, so a batch is never added twice.
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=30):
+        return 0
+    try:
+        pending = cache.get(PENDING_KEY) or 0
+        if pending:
+            # Stored first, so a failed write leaves the batch pending.
+            CatalogStats.bump(number_of_visits=pending)
+            try:
+                cache.decr(PENDING_KEY, pending)
+            except ValueError:
+                # Evicted meanwhile; the visits counted since are lost anyway.
+                pass
+        return pending
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)